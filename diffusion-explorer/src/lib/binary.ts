@@ -0,0 +1,115 @@
+/*
+*  Loader for the compact binary arrays written by `src/python/binary_format.py`.
+*
+*  Layout: the magic `DXA1`, a little-endian uint32 header length, a JSON
+*  header with the `dtype` and `shape` (plus per-channel `min` and `scale`
+*  for the quantized uint16/uint8 variants), then the raw little-endian data.
+*/
+
+const MAGIC = "DXA1";
+
+export interface BinaryArray {
+    data: Float32Array;
+    shape: number[];
+}
+
+interface BinaryHeader {
+    dtype: "float32" | "float16" | "uint16" | "uint8";
+    shape: number[];
+    min?: number[];
+    scale?: number[];
+}
+
+export function isBinaryArray(buffer: ArrayBuffer): boolean {
+    if (buffer.byteLength < 8) {
+        return false;
+    }
+    const magic = new Uint8Array(buffer, 0, 4);
+    return String.fromCharCode(...magic) === MAGIC;
+}
+
+// IEEE 754 half to single precision
+function halfToFloat(half: number): number {
+    const sign = half & 0x8000 ? -1 : 1;
+    const exponent = (half >> 10) & 0x1f;
+    const fraction = half & 0x03ff;
+    if (exponent === 0) {
+        return sign * Math.pow(2, -14) * (fraction / 1024);
+    }
+    if (exponent === 0x1f) {
+        return fraction ? NaN : sign * Infinity;
+    }
+    return sign * Math.pow(2, exponent - 15) * (1 + fraction / 1024);
+}
+
+export function decodeBinaryArray(buffer: ArrayBuffer): BinaryArray {
+    if (!isBinaryArray(buffer)) {
+        throw new Error("Not a binary array file");
+    }
+    const view = new DataView(buffer);
+    const headerLength = view.getUint32(4, true);
+    const headerBytes = new Uint8Array(buffer, 8, headerLength);
+    const header: BinaryHeader = JSON.parse(new TextDecoder().decode(headerBytes));
+    const offset = 8 + headerLength;
+    const size = header.shape.reduce((a, b) => a * b, 1);
+    let data: Float32Array;
+    if (header.dtype === "float32") {
+        // The header is padded so the data can be viewed without copying
+        data = new Float32Array(buffer, offset, size);
+    } else {
+        const raw = header.dtype === "uint8"
+            ? new Uint8Array(buffer, offset, size)
+            : new Uint16Array(buffer, offset, size);
+        data = new Float32Array(size);
+        if (header.dtype === "float16") {
+            for (let i = 0; i < size; i++) {
+                data[i] = halfToFloat(raw[i]);
+            }
+        } else {
+            // Dequantize per channel of the last axis
+            const channels = header.shape[header.shape.length - 1];
+            const min = header.min as number[];
+            const scale = header.scale as number[];
+            for (let i = 0; i < size; i++) {
+                const channel = i % channels;
+                data[i] = min[channel] + raw[i] * scale[channel];
+            }
+        }
+    }
+    return { data, shape: header.shape };
+}
+
+/*
+* Converts a flat array into nested arrays of the given shape,
+* for the parts of the UI that work with number[][]...
+*/
+export function toNestedArray(data: Float32Array, shape: number[]): any {
+    function build(dimension: number, start: number): any {
+        const length = shape[dimension];
+        if (dimension === shape.length - 1) {
+            return Array.from(data.subarray(start, start + length));
+        }
+        const stride = shape.slice(dimension + 1).reduce((a, b) => a * b, 1);
+        const nested = new Array(length);
+        for (let i = 0; i < length; i++) {
+            nested[i] = build(dimension + 1, start + i * stride);
+        }
+        return nested;
+    }
+    return build(0, 0);
+}
+
+/*
+* Fetches an array stored either in the binary format or as JSON
+* (a plain nested array or a `{"points": ...}` dataset).
+*/
+export async function fetchArray(path: string): Promise<any> {
+    const response = await fetch(path);
+    const buffer = await response.arrayBuffer();
+    if (isBinaryArray(buffer)) {
+        const { data, shape } = decodeBinaryArray(buffer);
+        return toNestedArray(data, shape);
+    }
+    const json = JSON.parse(new TextDecoder().decode(buffer));
+    return Array.isArray(json) ? json : json.points;
+}
@@ -1,24 +1,54 @@
 import * as tf from '@tensorflow/tfjs';
 import { Model } from './interfaces';
 
+/**
+ * Table of the PyTorch `SinusoidalPositionalEmbedding`
+ * @returns tf.Tensor2D of shape [maxLength, dim]
+ */
+function sinusoidalEmbeddingTable(dim: number, maxLength: number): tf.Tensor2D {
+    const table = new Float32Array(maxLength * dim);
+    for (let position = 0; position < maxLength; position++) {
+        for (let i = 0; i < dim; i += 2) {
+            const angle = position * Math.exp(-i * Math.log(10000.0) / dim);
+            table[position * dim + i] = Math.sin(angle);
+            if (i + 1 < dim) {
+                table[position * dim + i + 1] = Math.cos(angle);
+            }
+        }
+    }
+    return tf.tensor2d(table, [maxLength, dim]);
+}
+
 export class DiffusionModel extends Model {
-    readonly T: number;
-    readonly betas: tf.Tensor1D;
-    readonly alphas: tf.Tensor1D;
-    readonly alphasCumprod: tf.Tensor1D;
-    readonly alphasCumprodPrev: tf.Tensor1D;
-    readonly sqrtAlphasCumprod: tf.Tensor1D;
-    readonly sqrtOneMinusAlphasCumprod: tf.Tensor1D;
-    readonly sqrtInvAlphasCumprod: tf.Tensor1D;
-    readonly sqrtInvAlphasCumprodMinusOne: tf.Tensor1D;
-    readonly variance: tf.Tensor1D;
-    readonly posteriorCoef1: tf.Tensor1D;
-    readonly posteriorCoef2: tf.Tensor1D;
+    // The schedule tables are rebuilt when a model with its own schedule is loaded
+    T!: number;
+    betas!: tf.Tensor1D;
+    alphas!: tf.Tensor1D;
+    alphasCumprod!: tf.Tensor1D;
+    alphasCumprodPrev!: tf.Tensor1D;
+    sqrtAlphasCumprod!: tf.Tensor1D;
+    sqrtOneMinusAlphasCumprod!: tf.Tensor1D;
+    sqrtInvAlphasCumprod!: tf.Tensor1D;
+    sqrtInvAlphasCumprodMinusOne!: tf.Tensor1D;
+    variance!: tf.Tensor1D;
+    posteriorCoef1!: tf.Tensor1D;
+    posteriorCoef2!: tf.Tensor1D;
+    // Sinusoidal time embedding table of models exported from PyTorch, null for t / T conditioning
+    private timeEmbeddingTable: tf.Tensor2D | null = null;
 
     constructor(dim = 2, hidden = 128, T = 1000, betaStart = 1e-4, betaEnd = 2e-2) {
         super(dim, hidden);
+        this.setSchedule(tf.linspace(betaStart, betaEnd, T) as tf.Tensor1D);
+    }
+
+    /**
+     * Compute the schedule tables from the noise schedule
+     * @param betas tf.Tensor1D of shape [T]
+     */
+    private setSchedule(betas: tf.Tensor1D) {
+        const T = betas.shape[0];
         this.T = T;
-        this.betas = tf.linspace(betaStart, betaEnd, T);
+        this.betas = betas;
         this.alphas = tf.sub(1, this.betas);
         this.alphasCumprod = tf.cumprod(this.alphas);
         this.sqrtAlphasCumprod = tf.sqrt(this.alphasCumprod);
@@ -36,6 +66,15 @@ export class DiffusionModel extends Model {
         );
     }
 
+    private disposeSchedule() {
+        tf.dispose([
+            this.betas, this.alphas, this.alphasCumprod, this.alphasCumprodPrev,
+            this.sqrtAlphasCumprod, this.sqrtOneMinusAlphasCumprod,
+            this.sqrtInvAlphasCumprod, this.sqrtInvAlphasCumprodMinusOne,
+            this.variance, this.posteriorCoef1, this.posteriorCoef2,
+        ]);
+    }
+
     /**
      * Train the diffusion model with denoising score matching
      * @param data tf.Tensor2D of shape [num_samples, dim]
@@ -114,8 +153,35 @@ export class DiffusionModel extends Model {
         });
     }
 
+    setModel(model: tf.Sequential) {
+        super.setModel(model);
+        // Models exported by src/python/export_tfjs_model.py describe their time embedding in the metadata
+        const metadata = model.getUserDefinedMetadata() as any;
+        const embedding = metadata ? metadata.timeEmbedding : undefined;
+        if (this.timeEmbeddingTable !== null) {
+            this.timeEmbeddingTable.dispose();
+        }
+        this.timeEmbeddingTable = embedding && embedding.type === 'sinusoidal'
+            ? sinusoidalEmbeddingTable(embedding.dim, embedding.maxLength)
+            : null;
+        // The model was trained with its own noise schedule, sample with the same one
+        const schedule = metadata ? metadata.schedule : undefined;
+        if (schedule && (schedule.type === 'linear' || schedule.type === 'custom')) {
+            this.disposeSchedule();
+            this.setSchedule(schedule.type === 'custom'
+                ? tf.tensor1d(schedule.betas)
+                : tf.linspace(schedule.betaStart, schedule.betaEnd, schedule.T) as tf.Tensor1D);
+        }
+    }
+
     forward(x_t: tf.Tensor2D, t: tf.Tensor1D | tf.Tensor2D): tf.Tensor2D {
         return tf.tidy(() => {
+            if (this.timeEmbeddingTable !== null) {
+                // Same input layout as the PyTorch ScoreNetwork: [x, embedding(t)]
+                const tInt = t.reshape([x_t.shape[0]]).toInt();
+                const embedding = tf.gather(this.timeEmbeddingTable, tInt);
+                return this.model.predict(tf.concat([x_t, embedding], 1)) as tf.Tensor2D;
+            }
             const t_expanded = t.reshape([x_t.shape[0], 1]); // Use very simple time conditioning, no sinusoidal embedding
             const t_scaled = t_expanded.div(this.T);
             const input = tf.concat([x_t, t_scaled], 1); // shape [batch, dim+1]
@@ -8,11 +8,18 @@ setWasmPaths('/tfjs-backend-wasm/');
 import '@tensorflow/tfjs-backend-wasm'; // Import the WebGL backend for TensorFlow.js
 
 import { backend, trainingObjectiveToModelClass } from '$lib/settings';
+import { decodeBinaryArray, isBinaryArray } from '$lib/binary';
 
 async function loadDataset(path: string) {
     return fetch(path)
-        .then(response => response.json())
-        .then(data => {
+        .then(response => response.arrayBuffer())
+        .then(buffer => {
+            // Binary datasets go straight into a tensor, brushed ones are JSON
+            if (isBinaryArray(buffer)) {
+                const { data, shape } = decodeBinaryArray(buffer);
+                return tf.tensor(data, shape);
+            }
+            const data = JSON.parse(new TextDecoder().decode(buffer));
             // Convert the data to a tensor
             const pointsTensor = tf.tensor(data.points);
             return pointsTensor;
@@ -65,8 +65,8 @@ export const cachedSamplesPaths: Record<string, Record<string, string>> = {
 
 export const cachedGridSamplesPaths: Record<string, Record<string, string>> = {
     "Flow Matching": {
-        "Three Modes": "/cached_samples/flow_matching_euler_three_modes_grid.json",
-        "Smiley Face": "/cached_samples/flow_matching_euler_smiley_face_grid.json",
+        "Three Modes": "/cached_samples/flow_matching_euler_three_modes_grid.bin",
+        "Smiley Face": "/cached_samples/flow_matching_euler_smiley_face_grid.bin",
     },
 }
 
@@ -102,9 +102,9 @@ export const trainingConfig: {
 };
 
 export const datasetNameToPath: Record<string, string> = {
-    "Smiley Face": "/datasets/smiley_face.json",
-    "Three Modes": "/datasets/three_modes.json",
-    // "Concentric Circles": "/datasets/concentric_circles.json",
+    "Smiley Face": "/datasets/smiley_face.bin",
+    "Three Modes": "/datasets/three_modes.bin",
+    // "Concentric Circles": "/datasets/concentric_circles.bin",
 };
 
 export const miniDistributionSettings: {
@@ -7,6 +7,7 @@ import { base } from '$app/paths';
 import { get } from 'svelte/store';
 
 import { downloadJSON } from '$lib/utils'; 
+import { fetchArray } from '$lib/binary';
 import * as tf from '@tensorflow/tfjs';
 
 // Explicit state imports
@@ -51,11 +52,8 @@ export async function loadDatasets() {
     // Helper function to load a dataset
     function loadDataset(path: string) {
         path = base + path;
-        return fetch(path)
-            .then(response => response.json())
-            .then(data => {
-                return data.points;
-            });
+        // Binary or JSON points, decoded to a nested array
+        return fetchArray(path);
     }
     // Loop through and load the datasets
     const datasets = {};
@@ -152,15 +150,13 @@ export async function handleDatasetChange() {
     ) {
         // Load the cached samples
         const cachedSamplesPath = base + settings.cachedSamplesPaths[trainingObjectiveVal][datasetNameVal];
-        fetch(cachedSamplesPath)
-            .then(response => response.json())
+        fetchArray(cachedSamplesPath)
             .then(data => {
                 // Update the UI state with the cached samples
                 allTimeSamples.set(data);
                 // Load the cached grid samples
                 const cachedGridSamplesPath = base + settings.cachedGridSamplesPaths[trainingObjectiveVal][datasetNameVal];
-                fetch(cachedGridSamplesPath)
-                    .then(response => response.json())
+                fetchArray(cachedGridSamplesPath)
                     .then(data => {
                         // Update the UI state with the cached samples
                         allTimeGridSamples.set(data);
@@ -0,0 +1,104 @@
+"""
+    Compact binary export of the explorer's static arrays (datasets and
+    cached sample trajectories), read back by `src/lib/binary.ts`.
+
+    Layout of a `.bin` file:
+
+        bytes 0-3   magic `DXA1`
+        bytes 4-7   little-endian uint32 length of the JSON header
+        header      UTF-8 JSON, space padded so the data starts on a
+                    multiple of 8 bytes
+        data        the flattened array, little-endian, row-major
+
+    The header holds the `dtype` (float32, float16, uint16 or uint8) and the
+    `shape`. The integer dtypes are quantized per channel of the last axis,
+    value = min + q * scale, with `min` and `scale` stored in the header.
+
+    Converting existing JSON files:
+
+        python binary_format.py ../../static/datasets/*.json --dtype float16
+        python binary_format.py ../../static/cached_samples/*_grid.json --dtype uint16
+"""
+import argparse
+import json
+import os
+import struct
+import numpy as np
+
+MAGIC = b'DXA1'
+DTYPES = {'float32': '<f4', 'float16': '<f2', 'uint16': '<u2', 'uint8': 'u1'}
+
+def encode_array(array, dtype='float32'):
+    """
+        Bytes of the binary format for an array (or nested lists)
+    """
+    array = np.asarray(array, dtype=np.float64)
+    header = {'dtype': dtype, 'shape': list(array.shape)}
+    if dtype in ('uint16', 'uint8'):
+        levels = np.iinfo(DTYPES[dtype]).max
+        # Per-channel range of the last axis
+        channels = array.reshape(-1, array.shape[-1])
+        minimum = channels.min(axis=0)
+        scale = (channels.max(axis=0) - minimum) / levels
+        scale[scale == 0] = 1.0
+        array = np.round((array - minimum) / scale)
+        header['min'] = minimum.tolist()
+        header['scale'] = scale.tolist()
+    elif dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype: {dtype}")
+    data = np.ascontiguousarray(array.astype(DTYPES[dtype])).tobytes()
+    header = json.dumps(header, separators=(',', ':')).encode()
+    # Pad the header so the data is aligned for typed array views
+    padding = -(len(MAGIC) + 4 + len(header)) % 8
+    header += b' ' * padding
+    return MAGIC + struct.pack('<I', len(header)) + header + data
+
+def decode_array(buffer):
+    """
+        Float32 array of bytes written by `encode_array`
+    """
+    if buffer[:4] != MAGIC:
+        raise ValueError("Not a binary array file")
+    header_length, = struct.unpack('<I', buffer[4:8])
+    header = json.loads(buffer[8:8 + header_length])
+    data = np.frombuffer(buffer, dtype=DTYPES[header['dtype']], offset=8 + header_length)
+    array = data.astype(np.float32).reshape(header['shape'])
+    if 'scale' in header:
+        array = np.float32(header['min']) + array * np.float32(header['scale'])
+    return array
+
+def write_array(path, array, dtype='float32'):
+    with open(path, 'wb') as file:
+        file.write(encode_array(array, dtype))
+
+def read_array(path):
+    with open(path, 'rb') as file:
+        return decode_array(file.read())
+
+def convert_json(path, dtype='float32'):
+    """
+        Writes `<name>.bin` next to a JSON array (or `{"points": ...}`
+        dataset) and returns its path
+    """
+    with open(path) as file:
+        data = json.load(file)
+    if isinstance(data, dict):
+        data = data['points']
+    output_path = os.path.splitext(path)[0] + '.bin'
+    write_array(output_path, data, dtype)
+    return output_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert explorer JSON arrays to the binary format")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--dtype', default='float32', choices=list(DTYPES))
+    args = parser.parse_args()
+
+    for path in args.paths:
+        output_path = convert_json(path, args.dtype)
+        with open(path) as file:
+            data = json.load(file)
+        original = np.asarray(data['points'] if isinstance(data, dict) else data)
+        error = np.abs(read_array(output_path) - original).max()
+        print(f"{path}: {os.path.getsize(path)} -> {os.path.getsize(output_path)} bytes "
+              f"({os.path.getsize(path) / os.path.getsize(output_path):.1f}x), max error {error:.2g}")
@@ -0,0 +1,200 @@
+"""
+    Converts a trained PyTorch `ScoreNetwork` checkpoint (e.g.
+    `other-visualizations/visualizations/ddpm/models/spiral_model.pth`) into
+    the TF.js layers format the explorer loads (`model.json` and
+    `model.weights.bin`), without needing TensorFlow.
+
+    The MLP becomes a Sequential model of Dense layers over the
+    concatenated [x, time embedding] input. The sinusoidal embedding has no
+    weights, so its configuration is stored in the model's
+    `userDefinedMetadata`, from which the explorer rebuilds the table.
+
+    Weights can be stored as float16 or affine-quantized uint8/uint16,
+    using the TF.js weights-manifest quantization fields. After export the
+    files are read back and compared against the PyTorch network on a probe
+    batch. The check against the PyTorch `ScoreNetwork` itself needs the
+    `visualizations` package from other-visualizations to be importable,
+    and is skipped otherwise.
+
+        PYTHONPATH=../../../other-visualizations python export_tfjs_model.py ../../../other-visualizations/visualizations/ddpm/models/spiral_model.pth ../../static/models/diffusion_spiral --quantization float16
+"""
+import argparse
+import json
+import os
+import numpy as np
+import torch
+
+from generate_cached_grids import QUANTIZED_DTYPES, load_layers_model, mlp_forward
+
+# Largest acceptable relative RMS probe error for each weight storage type
+PARITY_TOLERANCES = {'float32': 1e-5, 'float16': 1e-2, 'uint16': 1e-2, 'uint8': 0.1}
+
+def sinusoidal_table(embedding_dim, max_length):
+    """
+        The table of `SinusoidalPositionalEmbedding`, in numpy
+    """
+    position = np.arange(max_length, dtype=np.float32)[:, None]
+    div_term = np.exp(np.arange(0, embedding_dim, 2, dtype=np.float32) * (-np.log(10000.0) / embedding_dim))
+    table = np.zeros((max_length, embedding_dim), dtype=np.float32)
+    table[:, 0::2] = np.sin(position * div_term)
+    table[:, 1::2] = np.cos(position * div_term)
+    return table
+
+def score_network_layers(state_dict):
+    """
+        (kernel, bias, activation) of each linear layer of a ScoreNetwork
+        state dict, with ReLUs between them like `ScoreNetwork.network`
+    """
+    prefix = 'score_network.network.' if any(name.startswith('score_network.') for name in state_dict) else 'network.'
+    indices = sorted({int(name[len(prefix):].split('.')[0]) for name in state_dict if name.startswith(prefix)})
+    layers = []
+    for position, index in enumerate(indices):
+        kernel = state_dict[f'{prefix}{index}.weight'].detach().cpu().numpy().T
+        bias = state_dict[f'{prefix}{index}.bias'].detach().cpu().numpy()
+        activation = 'linear' if position == len(indices) - 1 else 'relu'
+        layers.append((np.ascontiguousarray(kernel, dtype=np.float32), bias.astype(np.float32), activation))
+    return layers
+
+def _quantize(values, dtype):
+    """
+        Stored bytes and TF.js quantization entry of a float32 weight
+    """
+    if dtype == 'float32':
+        return values.astype('<f4').tobytes(), None
+    if dtype == 'float16':
+        return values.astype('<f2').tobytes(), {'dtype': 'float16'}
+    levels = np.iinfo(QUANTIZED_DTYPES[dtype]).max
+    minimum = float(values.min())
+    scale = float(values.max() - minimum) / levels or 1.0
+    quantized = np.round((values - minimum) / scale).astype(QUANTIZED_DTYPES[dtype])
+    return quantized.tobytes(), {'dtype': dtype, 'min': minimum, 'scale': scale}
+
+def export_layers(layers, output_dir, quantization='float32', metadata=None):
+    """
+        Writes dense layers as a TF.js Sequential layers model
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    topology_layers = []
+    manifest = []
+    buffers = []
+    for index, (kernel, bias, activation) in enumerate(layers, start=1):
+        name = f'dense_Dense{index}'
+        config = {
+            'units': int(kernel.shape[1]),
+            'activation': activation,
+            'use_bias': True,
+            'name': name,
+            'trainable': True,
+        }
+        if index == 1:
+            config['batch_input_shape'] = [None, int(kernel.shape[0])]
+            config['dtype'] = 'float32'
+        topology_layers.append({'class_name': 'Dense', 'config': config})
+        for weight_name, values in [('kernel', kernel), ('bias', bias)]:
+            data, quantization_entry = _quantize(values, quantization)
+            entry = {'name': f'{name}/{weight_name}', 'shape': list(values.shape), 'dtype': 'float32'}
+            if quantization_entry is not None:
+                entry['quantization'] = quantization_entry
+            manifest.append(entry)
+            buffers.append(data)
+    model = {
+        'modelTopology': {
+            'class_name': 'Sequential',
+            'config': {'name': 'sequential_1', 'layers': topology_layers},
+            'keras_version': 'tfjs-layers 4.22.0',
+            'backend': 'tensor_flow.js',
+        },
+        'format': 'layers-model',
+        'generatedBy': 'export_tfjs_model.py',
+        'convertedBy': None,
+        'weightsManifest': [{'paths': ['./model.weights.bin'], 'weights': manifest}],
+    }
+    if metadata is not None:
+        model['userDefinedMetadata'] = metadata
+    with open(os.path.join(output_dir, 'model.json'), 'w') as file:
+        json.dump(model, file)
+    with open(os.path.join(output_dir, 'model.weights.bin'), 'wb') as file:
+        file.write(b''.join(buffers))
+
+def export_checkpoint(checkpoint_path, output_dir, quantization='float32', total_timesteps=1000, beta_start=0.0001, beta_end=0.02):
+    """
+        Exports the ScoreNetwork of a `DiffusionModel` checkpoint and returns
+        its layers and metadata
+    """
+    state_dict = torch.load(checkpoint_path, map_location='cpu')
+    layers = score_network_layers(state_dict)
+    data_dim = layers[-1][0].shape[1]
+    metadata = {
+        'timeEmbedding': {
+            'type': 'sinusoidal',
+            'dim': int(layers[0][0].shape[0] - data_dim),
+            'maxLength': total_timesteps,
+        },
+        'schedule': {'type': 'linear', 'T': total_timesteps, 'betaStart': beta_start, 'betaEnd': beta_end},
+        'source': os.path.basename(checkpoint_path),
+    }
+    # Newer checkpoints carry their schedule tables, which may not be linear
+    if 'schedule.betas' in state_dict:
+        betas = state_dict['schedule.betas'].double().numpy()
+        if not np.allclose(betas, np.linspace(beta_start, beta_end, total_timesteps), rtol=1e-5):
+            metadata['schedule'] = {'type': 'custom', 'T': len(betas), 'betas': betas.tolist()}
+    export_layers(layers, output_dir, quantization=quantization, metadata=metadata)
+    return layers, metadata
+
+def check_parity(layers, metadata, output_dir, num_probes=4096, seed=0):
+    """
+        Relative RMS difference between the original layers and the
+        exported model (as read back from disk) on a random probe batch
+    """
+    rng = np.random.default_rng(seed)
+    embedding = metadata['timeEmbedding']
+    table = sinusoidal_table(embedding['dim'], embedding['maxLength'])
+    x = rng.normal(size=(num_probes, layers[-1][0].shape[1])).astype(np.float32) * 2
+    time = rng.integers(0, embedding['maxLength'], size=num_probes)
+    inputs = np.concatenate([x, table[time]], axis=1)
+    reference = mlp_forward(layers, inputs)
+    exported = mlp_forward(load_layers_model(os.path.join(output_dir, 'model.json')), inputs)
+    return float(np.sqrt(np.mean((reference - exported) ** 2) / np.mean(reference ** 2)))
+
+def torch_parity(checkpoint_path, layers, metadata, num_probes=4096, seed=0):
+    """
+        Largest difference between the numpy layers and the PyTorch
+        ScoreNetwork itself, which checks the embedding and layer mapping.
+        None when the `visualizations` package is not importable.
+    """
+    try:
+        from visualizations.ddpm.train import DiffusionModel
+    except ImportError:
+        return None
+
+    model = DiffusionModel(time_dim=metadata['timeEmbedding']['dim'])
+    model.load_state_dict(torch.load(checkpoint_path, map_location='cpu'))
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(num_probes, model.score_network.data_dim, generator=generator) * 2
+    time = torch.randint(0, metadata['timeEmbedding']['maxLength'], (num_probes,), generator=generator)
+    with torch.no_grad():
+        reference = model.predict_noise(x, time).numpy()
+    table = sinusoidal_table(metadata['timeEmbedding']['dim'], metadata['timeEmbedding']['maxLength'])
+    inputs = np.concatenate([x.numpy(), table[time.numpy()]], axis=1)
+    return float(np.abs(reference - mlp_forward(layers, inputs)).max())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a ScoreNetwork checkpoint to the TF.js layers format")
+    parser.add_argument('checkpoint')
+    parser.add_argument('output_dir')
+    parser.add_argument('--quantization', default='float32', choices=list(QUANTIZED_DTYPES))
+    parser.add_argument('--num-probes', type=int, default=4096)
+    args = parser.parse_args()
+
+    layers, metadata = export_checkpoint(args.checkpoint, args.output_dir, quantization=args.quantization)
+    mapping_error = torch_parity(args.checkpoint, layers, metadata, num_probes=args.num_probes)
+    export_error = check_parity(layers, metadata, args.output_dir, num_probes=args.num_probes)
+    size = sum(os.path.getsize(os.path.join(args.output_dir, name)) for name in os.listdir(args.output_dir))
+    print(f"Wrote {args.output_dir} ({size} bytes, {args.quantization})")
+    if mapping_error is None:
+        print("visualizations is not on PYTHONPATH, skipped the check against PyTorch")
+    else:
+        print(f"Max probe error vs PyTorch: {mapping_error:.2e}")
+    print(f"Relative error from quantization: {export_error:.2e}")
+    if (mapping_error is not None and mapping_error > 1e-4) or export_error > PARITY_TOLERANCES[args.quantization]:
+        raise SystemExit("Parity check failed")
@@ -0,0 +1,227 @@
+"""
+    Precomputes the explorer's cached grid trajectories
+    (`static/cached_samples/<objective>_<sampler>_<dataset>_grid.bin`) from
+    the trained TF.js flow models in `static/models`.
+
+    The layers model is evaluated in numpy, so no TensorFlow is needed. All
+    grid points are integrated together in one batch per step, the jobs
+    (one per model) are spread over a process pool, and a manifest of the
+    inputs each output was generated from means only outputs whose model,
+    solver or settings changed are regenerated.
+
+    The defaults mirror `src/lib/settings.ts`. The explorer's "Euler"
+    sampler runs `FlowModel.step`, which is a midpoint step, so that is
+    the default solver.
+
+        python generate_cached_grids.py
+        python generate_cached_grids.py --resolution 14 --num-steps 400
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import binary_format
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'static')
+MANIFEST = 'grid_manifest.json'
+# Storage types of the weights in a TF.js weights manifest
+QUANTIZED_DTYPES = {'float32': '<f4', 'float16': '<f2', 'uint16': '<u2', 'uint8': 'u1'}
+
+def load_layers_model(model_json_path):
+    """
+        (kernel, bias, activation) of each dense layer of a TF.js
+        Sequential layers model
+    """
+    with open(model_json_path) as file:
+        model = json.load(file)
+    directory = os.path.dirname(model_json_path)
+    weights = {}
+    for group in model['weightsManifest']:
+        buffer = b''.join(open(os.path.join(directory, path), 'rb').read() for path in group['paths'])
+        offset = 0
+        for spec in group['weights']:
+            if spec['dtype'] != 'float32':
+                raise ValueError(f"Unsupported weight dtype: {spec['dtype']}")
+            size = int(np.prod(spec['shape']))
+            # Quantized weights are stored as float16, or as uint8/uint16 with an affine scale
+            quantization = spec.get('quantization', {'dtype': 'float32'})
+            stored_dtype = QUANTIZED_DTYPES[quantization['dtype']]
+            values = np.frombuffer(buffer, dtype=stored_dtype, count=size, offset=offset).astype(np.float32)
+            if 'scale' in quantization:
+                values = values * np.float32(quantization['scale']) + np.float32(quantization['min'])
+            weights[spec['name']] = values.reshape(spec['shape'])
+            offset += size * np.dtype(stored_dtype).itemsize
+    layers = []
+    for index, layer in enumerate(model['modelTopology']['config']['layers'], start=1):
+        if layer['class_name'] != 'Dense':
+            raise ValueError(f"Unsupported layer: {layer['class_name']}")
+        # Weights are named after the layer's position, e.g. dense_Dense1/kernel
+        name = layer['config']['name']
+        prefix = name if f"{name}/kernel" in weights else f"dense_Dense{index}"
+        layers.append((weights[f"{prefix}/kernel"], weights[f"{prefix}/bias"], layer['config']['activation']))
+    return layers
+
+def mlp_forward(layers, inputs):
+    """
+        Runs the (N, D) inputs through the dense layers in float32
+    """
+    outputs = inputs.astype(np.float32)
+    for kernel, bias, activation in layers:
+        outputs = outputs @ kernel + bias
+        if activation == 'elu':
+            outputs = np.where(outputs > 0, outputs, np.expm1(np.minimum(outputs, 0)))
+        elif activation == 'relu':
+            outputs = np.maximum(outputs, 0)
+        elif activation != 'linear':
+            raise ValueError(f"Unsupported activation: {activation}")
+    return outputs
+
+def velocity(layers, x, t):
+    """
+        The flow model's vector field, with t appended as a third input
+    """
+    return mlp_forward(layers, np.concatenate([x, np.full((len(x), 1), t, dtype=np.float32)], axis=1))
+
+def euler_step(layers, x, t0, t1):
+    return x + velocity(layers, x, t0) * (t1 - t0)
+
+def midpoint_step(layers, x, t0, t1):
+    dt = t1 - t0
+    mid_point = x + velocity(layers, x, t0) * dt / 2
+    return x + velocity(layers, mid_point, t0 + dt / 2) * dt
+
+def rk4_step(layers, x, t0, t1):
+    dt = t1 - t0
+    k1 = velocity(layers, x, t0)
+    k2 = velocity(layers, x + k1 * dt / 2, t0 + dt / 2)
+    k3 = velocity(layers, x + k2 * dt / 2, t0 + dt / 2)
+    k4 = velocity(layers, x + k3 * dt, t1)
+    return x + (k1 + 2 * k2 + 2 * k3 + k4) * dt / 6
+
+SOLVERS = {'euler': euler_step, 'midpoint': midpoint_step, 'rk4': rk4_step}
+
+def grid_start_points(resolution, domain):
+    """
+        (resolution * resolution, 2) points of `tf.meshgrid(x, y)`, i.e.
+        with x varying fastest
+    """
+    x = np.linspace(domain['xMin'], domain['xMax'], resolution, dtype=np.float32)
+    y = np.linspace(domain['yMin'], domain['yMax'], resolution, dtype=np.float32)
+    return np.stack(np.meshgrid(x, y), axis=2).reshape(-1, 2)
+
+def integrate(layers, points, num_steps, solver='midpoint'):
+    """
+        (num_steps, N, 2) positions after each step from t = 0 to 1
+    """
+    step = SOLVERS[solver]
+    times = np.linspace(0, 1, num_steps + 1, dtype=np.float32)
+    trajectory = np.empty((num_steps, len(points), points.shape[1]), dtype=np.float32)
+    x = points.astype(np.float32)
+    for i in range(num_steps):
+        x = step(layers, x, times[i], times[i + 1])
+        trajectory[i] = x
+    return trajectory
+
+def to_display_frame(trajectory, domain, distribution_width, display_area_width):
+    """
+        Same transform as `convertDataToDisplayCoordinateFrame` in
+        `src/lib/diffusion/workers/utils.ts`
+    """
+    minimum = np.array([domain['xMin'], domain['yMin']], dtype=np.float32)
+    extent = np.array([domain['xMax'] - domain['xMin'], domain['yMax'] - domain['yMin']], dtype=np.float32)
+    offset = np.array([display_area_width - distribution_width, 0], dtype=np.float32)
+    time = np.linspace(0, 1, len(trajectory), dtype=np.float32)[:, None, None]
+    return (trajectory - minimum) / extent * distribution_width + time * offset
+
+def job_key(job):
+    """
+        Hash of everything an output depends on
+    """
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(job['model']), '*'))):
+        digest.update(open(path, 'rb').read())
+    settings = {name: value for name, value in job.items() if name not in ('model', 'output')}
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+def run_job(job):
+    layers = load_layers_model(job['model'])
+    points = grid_start_points(job['resolution'], job['domain'])
+    trajectory = integrate(layers, points, job['num_steps'], job['solver'])
+    trajectory = to_display_frame(trajectory, job['domain'], job['distribution_width'], job['display_area_width'])
+    trajectory = trajectory.reshape(job['num_steps'], job['resolution'], job['resolution'], 2)
+    if job['output'].endswith('.json'):
+        with open(job['output'], 'w') as file:
+            json.dump(trajectory.tolist(), file)
+    else:
+        binary_format.write_array(job['output'], trajectory, dtype=job['dtype'])
+    return job['output']
+
+def make_jobs(args):
+    jobs = []
+    for model_path in sorted(glob.glob(os.path.join(args.models, 'flow_matching_*', 'model.json'))):
+        dataset = os.path.basename(os.path.dirname(model_path))[len('flow_matching_'):]
+        if args.datasets and dataset not in args.datasets:
+            continue
+        name = f"flow_matching_{args.sampler_name}_{dataset}_grid.{'json' if args.json else 'bin'}"
+        jobs.append({
+            'model': model_path,
+            'output': os.path.join(args.output, name),
+            'solver': args.solver,
+            'num_steps': args.num_steps,
+            'resolution': args.resolution,
+            'domain': {'xMin': -args.extent, 'xMax': args.extent, 'yMin': -args.extent, 'yMax': args.extent},
+            'distribution_width': args.distribution_width,
+            'display_area_width': args.display_area_width,
+            'dtype': args.dtype,
+        })
+    return jobs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the explorer's cached grid trajectories")
+    parser.add_argument('--models', default=os.path.join(STATIC_DIR, 'models'))
+    parser.add_argument('--output', default=os.path.join(STATIC_DIR, 'cached_samples'))
+    parser.add_argument('--datasets', nargs='*', help="only these datasets, e.g. smiley_face")
+    parser.add_argument('--solver', default='midpoint', choices=list(SOLVERS))
+    parser.add_argument('--sampler-name', default='euler', help="sampler label used in the file names")
+    parser.add_argument('--num-steps', type=int, default=200)
+    parser.add_argument('--resolution', type=int, default=7)
+    parser.add_argument('--extent', type=float, default=3.5)
+    parser.add_argument('--distribution-width', type=float, default=500)
+    parser.add_argument('--display-area-width', type=float, default=1300)
+    parser.add_argument('--dtype', default='uint16', choices=list(binary_format.DTYPES))
+    parser.add_argument('--json', action='store_true', help="write the legacy nested JSON instead")
+    parser.add_argument('--force', action='store_true', help="regenerate even if nothing changed")
+    parser.add_argument('--num-workers', type=int, default=None)
+    args = parser.parse_args()
+
+    manifest_path = os.path.join(args.output, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    # Only the outputs whose inputs changed are regenerated
+    jobs = make_jobs(args)
+    keys = {job['output']: job_key(job) for job in jobs}
+    stale = [
+        job for job in jobs
+        if args.force or not os.path.exists(job['output'])
+        or manifest.get(os.path.basename(job['output'])) != keys[job['output']]
+    ]
+    print(f"{len(stale)} of {len(jobs)} grids to regenerate")
+
+    num_workers = args.num_workers if args.num_workers is not None else os.cpu_count()
+    if num_workers <= 1 or len(stale) <= 1:
+        outputs = list(map(run_job, stale))
+    else:
+        with ProcessPoolExecutor(min(num_workers, len(stale))) as executor:
+            outputs = list(executor.map(run_job, stale))
+    for output in outputs:
+        manifest[os.path.basename(output)] = keys[output]
+        print(f"Wrote {output}")
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
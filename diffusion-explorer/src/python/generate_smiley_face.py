@@ -1,47 +1,42 @@
 import numpy as np
 import json
 
-def generate_smiley_face(points_per_eye=50, points_per_mouth=200, eye_std=0.1, mouth_std=0.08, seed=42):
-    np.random.seed(seed)
+import toy_datasets
+import binary_format
 
-    points = []
+def generate_smiley_face(points_per_eye=50, points_per_mouth=200, eye_std=0.1, mouth_std=0.08, seed=42):
+    rng = toy_datasets.make_rng(seed)
 
     # Eyes: two Gaussian blobs
     eye_y = 1.0
     eye_x_offset = 1.0
-    left_eye_center = [-eye_x_offset, eye_y]
-    right_eye_center = [eye_x_offset, eye_y]
-
-    for cx, cy in [left_eye_center, right_eye_center]:
-        samples = np.random.normal(loc=[cx, cy], scale=eye_std, size=(points_per_eye, 2))
-        points.extend(samples.tolist())
+    eye_centers = [[-eye_x_offset, eye_y], [eye_x_offset, eye_y]]
+    eyes = toy_datasets.gaussian_clusters(eye_centers, eye_std ** 2, points_per_eye, seed=rng)
 
     # Mouth: arc-shaped Gaussians
     mouth_radius = 1.5
     mouth_y_shift = -2.5  # Move mouth further below the eyes
     mouth_angle_range = np.linspace(np.pi / 6, 5 * np.pi / 6, points_per_mouth)
-    mouth_points = []
-    for angle in mouth_angle_range:
-        cx = mouth_radius * np.cos(angle)
-        cy = mouth_y_shift + mouth_radius * np.sin(angle)
-        sample = np.random.normal(loc=[cx, cy], scale=mouth_std, size=(1, 2))
-        mouth_points.extend(sample.tolist())
+    mouth = toy_datasets.arc(mouth_angle_range, center=(0.0, mouth_y_shift), radius=mouth_radius, std=mouth_std, seed=rng)
 
     # Flip the mouth points about the center of them 
-    mouth_y_mean = np.mean([y for _, y in mouth_points])
-    mouth_points = [[x, 2 * mouth_y_mean - y] for x, y in mouth_points]
-    points.extend(mouth_points)
-    # Round for JSON readability
-    points = [[round(x, 2), round(y, 2)] for x, y in points]
+    mouth[:, 1] = 2 * mouth[:, 1].mean() - mouth[:, 1]
+    points = np.concatenate([eyes, mouth])
     # Flip the points along the y-axis for a more natural smiley face orientation
-    points = [[x, -y] for x, y in points]
+    points[:, 1] = -points[:, 1]
 
-    return {"points": points}
+    # Round for JSON readability
+    return {"points": np.round(points, 2).tolist()}
 
 def save_to_json(data, filename="smiley_face.json"):
     with open(filename, "w") as f:
         json.dump(data, f, indent=2)
 
+def save_to_binary(data, filename="smiley_face.bin"):
+    # Half precision is plenty for points rounded to two decimals
+    binary_format.write_array(filename, data["points"], dtype="float16")
+
 if __name__ == "__main__":
     data = generate_smiley_face()
     save_to_json(data)
+    save_to_binary(data)
@@ -1,6 +1,9 @@
 import numpy as np
 import json
 
+import toy_datasets
+import binary_format
+
 def generate_three_mode_gaussian_mixture(
     num_modes=3,
     points_per_mode=200,
@@ -8,26 +11,25 @@ def generate_three_mode_gaussian_mixture(
     std=0.2,
     seed=42
 ):
-    np.random.seed(seed)
-    points = []
-
     # Compute equally spaced mode centers on a circle
     angles = np.linspace(0, 2 * np.pi, num_modes, endpoint=False)
-    centers = [(radius * np.cos(a), radius * np.sin(a)) for a in angles]
+    centers = toy_datasets.arc(angles, radius=radius)
 
-    for cx, cy in centers:
-        # Sample points around each center
-        samples = np.random.normal(loc=[cx, cy], scale=std, size=(points_per_mode, 2))
-        points.extend(samples.tolist())
+    # Sample points around each center
+    points = toy_datasets.gaussian_clusters(centers, std ** 2, points_per_mode, seed=seed)
 
     # Round for JSON readability
-    points = [[round(x, 2), round(y, 2)] for x, y in points]
-    return {"points": points}
+    return {"points": np.round(points, 2).tolist()}
 
 def save_to_json(data, filename="three_mode_gmm.json"):
     with open(filename, "w") as f:
         json.dump(data, f, indent=2)
 
+def save_to_binary(data, filename="three_mode_gmm.bin"):
+    # Half precision is plenty for points rounded to two decimals
+    binary_format.write_array(filename, data["points"], dtype="float16")
+
 if __name__ == "__main__":
     data = generate_three_mode_gaussian_mixture()
     save_to_json(data)
+    save_to_binary(data)
@@ -0,0 +1,59 @@
+"""
+    Vectorized generators for the explorer's 2D datasets.
+
+    Every generator draws all of its points with a handful of array
+    operations. Each one takes a `seed`, which is an int, an existing
+    `np.random.Generator` (so composite datasets can share one stream) or
+    None for fresh entropy, and returns a float64 array of shape (N, 2).
+"""
+import numpy as np
+
+def make_rng(seed=None):
+    """
+        A `np.random.Generator` from a seed. Generators are passed through.
+    """
+    return np.random.default_rng(seed)
+
+def gaussian_clusters(means, covariances, points_per_cluster, seed=None):
+    """
+        `points_per_cluster` points from each Gaussian, cluster by cluster.
+
+        Args:
+            means: (K, D) cluster centers
+            covariances: a shared variance, (K,) per-cluster variances or
+                (K, D, D) full covariance matrices
+    """
+    rng = make_rng(seed)
+    means = np.asarray(means, dtype=np.float64)
+    num_clusters, dim = means.shape
+    covariances = np.asarray(covariances, dtype=np.float64)
+    noise = rng.standard_normal((num_clusters, points_per_cluster, dim))
+    if covariances.ndim <= 1:
+        # Isotropic, scale by the standard deviations
+        stds = np.broadcast_to(np.sqrt(covariances), (num_clusters,))
+        noise *= stds[:, None, None]
+    else:
+        # Full covariance, color the noise with the Cholesky factors
+        noise = noise @ np.linalg.cholesky(covariances).transpose(0, 2, 1)
+    return (means[:, None, :] + noise).reshape(-1, dim)
+
+def arc(angles, center=(0.0, 0.0), radius=1.0, std=0.0, seed=None):
+    """
+        Points on a circle of `radius` around `center` at the given angles,
+        with isotropic Gaussian noise of `std`
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    points = np.asarray(center) + radius * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    if std > 0:
+        points += make_rng(seed).normal(0.0, std, points.shape)
+    return points
+
+def disk(num_points, center=(0.0, 0.0), radius=1.0, seed=None):
+    """
+        Points uniformly distributed over a filled disk
+    """
+    rng = make_rng(seed)
+    # The square root makes the density uniform in area
+    radii = radius * np.sqrt(rng.random(num_points))
+    angles = 2 * np.pi * rng.random(num_points)
+    return np.asarray(center) + radii[:, None] * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
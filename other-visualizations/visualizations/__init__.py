@@ -0,0 +1,11 @@
+"""
+    Diffusion model visualizations. Each subpackage is importable on its
+    own and its scripts run as modules from `other-visualizations`, e.g.
+
+        python -m visualizations.ddpm.make_score_spiral_video
+        python -m visualizations.langevin_monte_carlo.smiley_face_sampling
+
+    Matplotlib, seaborn, pandas and scipy are only imported by the
+    plotting code that uses them, `benchmark_imports.py` checks that the
+    models and samplers stay free of them.
+"""
@@ -0,0 +1,105 @@
+"""
+    Cold-start regression check of the import graph.
+
+    Each module is imported by a fresh interpreter under `python -X
+    importtime`, after numpy and torch (the dependencies every model needs
+    anyway) are already loaded. What the module adds on top of them is
+    summed from the importtime report, and the run fails if that goes over
+    the budget or any plotting or dataframe library is pulled in.
+
+        python -m visualizations.benchmark_imports
+        python -m visualizations.benchmark_imports --budget-ms 50 --repeats 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Libraries only the plotting and data loading functions may import
+HEAVY = ['matplotlib', 'seaborn', 'pandas', 'scipy', 'PIL', 'imageio']
+# Module -> libraries imported before it is timed
+MODULES = {
+    'visualizations.ddpm.train': ['numpy', 'torch'],
+    'visualizations.ddpm.sampling': ['numpy', 'torch'],
+    'visualizations.ddpm.solvers': ['numpy', 'torch'],
+    'visualizations.ddpm.parallel_sampling': ['numpy', 'torch'],
+    'visualizations.ddpm.schedules': ['numpy', 'torch'],
+    'visualizations.ddpm.fused_network': ['numpy', 'torch'],
+    'visualizations.ddpm.training': ['numpy', 'torch'],
+    'visualizations.ddpm.distributions': ['numpy', 'torch'],
+    'visualizations.ddpm.score_field': ['numpy', 'torch'],
+    'visualizations.ddpm.density_cube': ['numpy', 'torch'],
+    'visualizations.ddpm_vs_ddim.train': ['numpy', 'torch'],
+    'visualizations.langevin_monte_carlo.langevin': ['numpy', 'torch'],
+    'visualizations.langevin_monte_carlo.smiley_face_sampling': ['numpy', 'torch'],
+    # The exported-model runtime must not need torch either
+    'visualizations.ddpm.inference': ['numpy'],
+}
+MARKER = 'benchmark_imports: timed imports start here'
+# Directory the `visualizations` package is imported from
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(report):
+    """
+        Total cumulative time in seconds of the top-level imports after the
+        marker, and the names of every module they loaded
+    """
+    lines = report.splitlines()
+    lines = lines[lines.index(MARKER) + 1:]
+    total, modules = 0, []
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules.append(name.strip())
+        # Nested imports are indented by two spaces per level
+        if not name[1:].startswith(' '):
+            total += int(cumulative) * 1e-6
+    return total, modules
+
+def time_import(module, preloaded, repeats=3):
+    """
+        Best import time of `module` over `repeats` fresh interpreters, and
+        the modules it loaded
+    """
+    code = (
+        f"import {', '.join(preloaded)}\n"
+        "import sys\n"
+        f"sys.stderr.write({MARKER!r} + '\\n')\n"
+        f"import {module}\n"
+    )
+    best = None
+    for _ in range(repeats):
+        report = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        total, modules = parse_importtime(report)
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modules', nargs='+', default=list(MODULES), choices=list(MODULES))
+    parser.add_argument('--budget-ms', type=float, default=150.0, help="import time allowed on top of numpy and torch")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':>56} | {'import (ms)':>11} | heavy imports")
+    for module in args.modules:
+        preloaded = MODULES[module]
+        forbidden = HEAVY + (['torch'] if 'torch' not in preloaded else [])
+        total, modules = time_import(module, preloaded, args.repeats)
+        heavy = sorted({name.split('.')[0] for name in modules} & set(forbidden))
+        print(f"{module:>56} | {total * 1e3:>11.1f} | {', '.join(heavy) or '-'}")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)}")
+        if total * 1e3 > args.budget_ms:
+            failures.append(f"{module} takes {total * 1e3:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if failures:
+        raise SystemExit('\n'.join(failures))
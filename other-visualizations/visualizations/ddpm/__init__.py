@@ -0,0 +1,41 @@
+"""
+    DDPM on 2D toy datasets: the models, samplers, solvers and training
+    loop, and the scripts that render the visualizations.
+
+    Scripts run as modules from `other-visualizations`, e.g.
+
+        python -m visualizations.ddpm.make_score_spiral_video
+
+    and read and write their checkpoints and plots next to this file
+    whatever the working directory. Importing the package is cheap, the
+    names below are imported from their submodules on first access.
+"""
+import importlib
+import os
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(PACKAGE_DIR, 'models')
+PLOTS_DIR = os.path.join(PACKAGE_DIR, 'plots')
+
+# Public name -> submodule it is imported from on first access
+_LAZY_NAMES = {
+    'DiffusionModel': 'train',
+    'DDPMSampler': 'sampling',
+    'DDIMSampler': 'sampling',
+    'make_solver': 'solvers',
+    'NoiseSchedule': 'schedules',
+    'FusedScoreNetwork': 'fused_network',
+    'train_fast': 'training',
+    'parallel_sample': 'parallel_sampling',
+    'cached_sample': 'parallel_sampling',
+    'ArtifactCache': 'artifact_cache',
+    'ExportedModel': 'inference',
+}
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        return getattr(importlib.import_module(f'.{_LAZY_NAMES[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_NAMES))
@@ -0,0 +1,178 @@
+"""
+    Shared render path for the FuncAnimation videos.
+
+    Rebuilding the axes every frame (`ax.clear()` followed by fresh
+    `imshow`, `quiver` and styling calls) dominates the cost of the long
+    videos. Here the artists are created once and each frame only swaps
+    their data with `set_data`, `set_UVC` and `set_offsets`. The update
+    functions return the changed artists, so the same code also supports
+    blitting for interactive playback.
+"""
+from collections import deque
+
+import numpy as np
+from matplotlib.animation import FuncAnimation
+
+def clean_axes(ax):
+    """
+        Removes the ticks and spines of an axis
+    """
+    ax.set_xticks([])
+    ax.set_yticks([])
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+class DensityQuiverFrame():
+    """
+        A density heatmap with a quiver field drawn over it, updated in place.
+
+        Args:
+            ax: axis to draw on
+            extent: (xmin, xmax, ymin, ymax) of the heatmap
+            positions: (N, 2) arrow tails, or None for no quiver
+            cmap: colormap of the heatmap
+            autoscale: rescale the colormap to each new density, like a
+                fresh `imshow` would
+            quiver_kwargs: styling passed to `ax.quiver`
+    """
+
+    def __init__(self, ax, extent, positions=None, cmap='viridis', autoscale=True, quiver_kwargs=None):
+        self.ax = ax
+        self.autoscale = autoscale
+        self.image = ax.imshow(np.zeros((2, 2)), cmap=cmap, extent=extent, animated=True)
+        self.quiver = None
+        if positions is not None:
+            positions = np.asarray(positions)
+            zeros = np.zeros(len(positions))
+            self.quiver = ax.quiver(positions[:, 0], positions[:, 1], zeros, zeros, animated=True, **(quiver_kwargs or {}))
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+
+    @property
+    def artists(self):
+        return [artist for artist in [self.image, self.quiver] if artist is not None]
+
+    def update(self, density=None, vectors=None):
+        """
+            Swaps in a new (H, W) density, in `imshow` row order, and new
+            (N, 2) arrow vectors. Either can be None to keep the current one.
+        """
+        if density is not None:
+            self.image.set_data(density)
+            if self.autoscale:
+                self.image.set_clim(np.min(density), np.max(density))
+        if vectors is not None:
+            vectors = np.asarray(vectors)
+            self.quiver.set_UVC(vectors[:, 0], vectors[:, 1])
+        return self.artists
+
+def make_animation(fig, update, frames, artists, blit=True, interval=20):
+    """
+        `FuncAnimation` over artists that were created once up front.
+
+        Args:
+            update: function of the frame returning the changed artists
+            artists: every animated artist, drawn as the initial frame
+    """
+    return FuncAnimation(fig, update, frames=frames, init_func=lambda: artists, blit=blit, interval=interval)
+
+class RunningHistogram():
+    """
+        2D histogram of a growing stream of samples, updated incrementally.
+
+        Each `add` only bins the new points, so animating the density of the
+        first i samples over n frames costs O(n) binning instead of O(n^2).
+        Optionally older samples fade out (`decay`, applied once per `add`)
+        or drop out (`window`, the number of most recent samples kept).
+
+        Args:
+            bins: number of bins along each axis
+            range: [[xmin, xmax], [ymin, ymax]]
+            decay: factor the existing counts are multiplied by on each add
+            window: only the last `window` samples are counted
+            density: normalize like `np.histogram2d(..., density=True)`
+    """
+
+    def __init__(self, bins=100, range=((-3, 3), (-3, 3)), decay=None, window=None, density=True):
+        if decay is not None and window is not None:
+            raise ValueError("Use either a decay or a window, not both")
+        self.bins = bins
+        self.range = np.asarray(range, dtype=np.float64)
+        self.decay = decay
+        self.window = window
+        self.density = density
+        self.bin_area = np.prod((self.range[:, 1] - self.range[:, 0]) / bins)
+        self.reset()
+
+    def reset(self):
+        self.counts = np.zeros(self.bins * self.bins)
+        self.num_added = 0
+        # Batches of samples still inside the window, oldest first
+        self._history = deque()
+        self._history_length = 0
+
+    def _bin_indices(self, points):
+        scaled = (points - self.range[:, 0]) / (self.range[:, 1] - self.range[:, 0]) * self.bins
+        indices = np.floor(scaled).astype(np.int64)
+        # The upper edge belongs to the last bin, like np.histogram2d
+        indices[scaled == self.bins] = self.bins - 1
+        inside = np.all((indices >= 0) & (indices < self.bins), axis=1)
+        # Row-major over (y, x), so the counts reshape to an image
+        return indices[inside, 1] * self.bins + indices[inside, 0]
+
+    def add(self, points):
+        """
+            Adds an (N, 2) batch of samples
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        indices = self._bin_indices(points)
+        if self.decay is not None:
+            self.counts *= self.decay
+        self.counts += np.bincount(indices, minlength=len(self.counts))
+        self.num_added += len(points)
+        if self.window is not None:
+            # Out-of-range points still occupy a place in the window
+            self._history.append(points)
+            self._history_length += len(points)
+            self._evict()
+
+    def _evict(self):
+        while self._history_length > self.window:
+            points = self._history.popleft()
+            excess = self._history_length - self.window
+            if excess < len(points):
+                # Drop only the oldest part of this batch
+                self._history.appendleft(points[excess:])
+                points = points[:excess]
+            self.counts -= np.bincount(self._bin_indices(points), minlength=len(self.counts))
+            self._history_length -= len(points)
+
+    def advance_to(self, samples, i):
+        """
+            Brings the histogram to the first `i` rows of `samples`, adding
+            only the rows since the last call. Going backwards starts over.
+        """
+        if i < self.num_added:
+            self.reset()
+        self.add(samples[self.num_added:i])
+
+    @property
+    def values(self):
+        """
+            (bins, bins) histogram with y along the rows, for
+            `imshow(..., origin='lower')`
+        """
+        values = self.counts.reshape(self.bins, self.bins)
+        total = values.sum()
+        if self.density and total > 0:
+            values = values / (total * self.bin_area)
+        return values
+
+    def update_image(self, image):
+        """
+            Swaps the histogram into an image artist and rescales its colors
+        """
+        values = self.values
+        image.set_data(values)
+        image.set_clim(0, max(values.max(), np.finfo(np.float64).tiny))
+        return image
@@ -0,0 +1,289 @@
+"""
+    Persistent, content-addressed cache for the artifacts the visualization
+    scripts derive from a trained checkpoint.
+
+    Sampled trajectories, final samples, density cubes and score fields are
+    stored as `.npy` files in one directory per entry, so they can be
+    memory-mapped straight back. An entry is addressed by a hash of its kind
+    and the fields that determine it (the checkpoint's content hash, the
+    sampler, the number of steps and samples, the seed, ...), so changing
+    any of them, or retraining the model, never reads a stale result.
+
+    Reads refresh an entry's access time, and whenever the cache grows past
+    `max_bytes` the least recently used entries are evicted.
+
+    The cache can be inspected and pruned from the command line:
+
+        python -m visualizations.ddpm.artifact_cache list
+        python -m visualizations.ddpm.artifact_cache prune --max-size 2G
+        python -m visualizations.ddpm.artifact_cache prune --kind trajectories --older-than 7
+        python -m visualizations.ddpm.artifact_cache clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+# Outside the source tree, the cache can grow to many gigabytes
+DEFAULT_ROOT = os.environ.get(
+    'DIFFUSION_CACHE_DIR',
+    os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'diffusion-visualizations'),
+)
+DEFAULT_MAX_BYTES = 16 * 2 ** 30
+_METADATA = 'entry.json'
+
+def model_hash(model):
+    """
+        Short content hash of a model's parameters and buffers
+    """
+    digest = hashlib.sha256()
+    for name, tensor in sorted(model.state_dict().items()):
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+def _canonical(value):
+    """
+        JSON-friendly form of a key field. Arrays are replaced by a hash of
+        their contents, ranges and tuples become lists.
+    """
+    if isinstance(value, dict):
+        return {str(name): _canonical(item) for name, item in value.items()}
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest = hashlib.sha256(value.tobytes()).hexdigest()[:16]
+        return {'array': digest, 'shape': list(value.shape), 'dtype': str(value.dtype)}
+    if isinstance(value, (list, tuple, range)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (type, np.dtype)):
+        return np.dtype(value).name
+    return value
+
+def _parse_size(text):
+    """
+        Parses sizes like `500M` or `2G` into bytes
+    """
+    units = {'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def _format_size(num_bytes):
+    for unit in ['B', 'K', 'M', 'G']:
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f}T"
+
+class ArtifactCache():
+    """
+        Directory of cached artifacts, one sub-directory per entry.
+
+        Args:
+            root: cache directory (`$DIFFUSION_CACHE_DIR`, or
+                `~/.cache/diffusion-visualizations` by default)
+            max_bytes: total size the cache is pruned back to after each new
+                entry, least recently used first (None for no limit)
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def key(self, kind, fields):
+        """
+            Content address of an entry
+        """
+        canonical = json.dumps({'kind': kind, 'fields': _canonical(fields)}, sort_keys=True)
+        return hashlib.sha256(canonical.encode()).hexdigest()[:24]
+
+    def path(self, kind, fields):
+        return os.path.join(self.root, kind, self.key(kind, fields))
+
+    def lookup(self, kind, fields):
+        """
+            Directory of the entry, or None when it is not cached
+        """
+        directory = self.path(kind, fields)
+        metadata = os.path.join(directory, _METADATA)
+        if not os.path.exists(metadata):
+            return None
+        # Mark as recently used
+        os.utime(metadata)
+        return directory
+
+    def get_or_create(self, kind, fields, build):
+        """
+            Directory of the entry, calling `build(directory)` to write its
+            files first when it is not cached yet.
+
+            The files are built in a temporary directory that is renamed into
+            place once complete, so an interrupted run never leaves a partial
+            entry behind.
+        """
+        directory = self.lookup(kind, fields)
+        if directory is not None:
+            return directory
+        directory = self.path(kind, fields)
+        temporary = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        try:
+            build(temporary)
+            files = {}
+            for name in sorted(os.listdir(temporary)):
+                file_path = os.path.join(temporary, name)
+                entry = {'bytes': os.path.getsize(file_path)}
+                if name.endswith('.npy'):
+                    array = np.load(file_path, mmap_mode='r')
+                    entry.update(shape=list(array.shape), dtype=str(array.dtype))
+                    del array
+                files[name] = entry
+            metadata = {
+                'kind': kind,
+                'key': os.path.basename(directory),
+                'fields': _canonical(fields),
+                'files': files,
+                'bytes': sum(entry['bytes'] for entry in files.values()),
+                'created': time.time(),
+            }
+            with open(os.path.join(temporary, _METADATA), 'w') as file:
+                json.dump(metadata, file, indent=2)
+            os.rename(temporary, directory)
+        except OSError:
+            # Another process created the same entry first
+            if not os.path.exists(os.path.join(directory, _METADATA)):
+                raise
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
+        if self.max_bytes is not None:
+            self.prune(max_bytes=self.max_bytes, keep=[directory])
+        return directory
+
+    def entry_key(self, path):
+        """
+            `<kind>/<key>` of the entry a cached file belongs to
+        """
+        parts = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root)).split(os.sep)
+        if len(parts) < 3 or parts[0] == os.pardir:
+            raise ValueError(f"{path} is not inside the cache at {self.root}")
+        return f"{parts[0]}/{parts[1]}"
+
+    def entries(self):
+        """
+            Metadata of every entry, least recently used first, each with
+            its `path` and `last_access` time added
+        """
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for kind in sorted(os.listdir(self.root)):
+            kind_directory = os.path.join(self.root, kind)
+            if not os.path.isdir(kind_directory):
+                continue
+            for key in os.listdir(kind_directory):
+                metadata_path = os.path.join(kind_directory, key, _METADATA)
+                if not os.path.exists(metadata_path):
+                    continue
+                with open(metadata_path) as file:
+                    metadata = json.load(file)
+                metadata['path'] = os.path.join(kind_directory, key)
+                metadata['last_access'] = os.path.getmtime(metadata_path)
+                entries.append(metadata)
+        return sorted(entries, key=lambda entry: entry['last_access'])
+
+    @property
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self.entries())
+
+    def remove(self, entry):
+        shutil.rmtree(entry['path'], ignore_errors=True)
+
+    def prune(self, max_bytes=None, kinds=None, older_than=None, keep=()):
+        """
+            Removes entries and returns the removed ones.
+
+            Args:
+                max_bytes: evict least recently used entries until the cache
+                    is at most this large
+                kinds: only consider entries of these kinds
+                older_than: remove entries last used more than this many
+                    seconds ago
+                keep: entry directories that are never removed
+        """
+        keep = {os.path.abspath(path) for path in keep}
+        entries = self.entries()
+        total = sum(entry['bytes'] for entry in entries)
+        now = time.time()
+        removed = []
+        for entry in entries:
+            if os.path.abspath(entry['path']) in keep:
+                continue
+            if kinds is not None and entry['kind'] not in kinds:
+                continue
+            expired = older_than is not None and now - entry['last_access'] > older_than
+            over_budget = max_bytes is not None and total > max_bytes
+            if expired or over_budget:
+                self.remove(entry)
+                total -= entry['bytes']
+                removed.append(entry)
+        return removed
+
+    def clear(self, kinds=None):
+        return self.prune(max_bytes=0, kinds=kinds)
+
+def _describe_fields(fields):
+    """
+        One-line summary of an entry's fields, with long lists shortened
+    """
+    parts = []
+    for name, value in fields.items():
+        if isinstance(value, list) and len(value) > 4:
+            value = f"[{value[0]}..{value[-1]}] ({len(value)})"
+        elif isinstance(value, dict) and 'array' in value:
+            value = f"array{tuple(value['shape'])}"
+        parts.append(f"{name}={value}")
+    return ', '.join(parts)
+
+def _print_entries(entries):
+    now = time.time()
+    print(f"{'kind':>14} | {'key':>24} | {'size':>8} | {'last used':>10} | fields")
+    for entry in entries:
+        age = (now - entry['last_access']) / 3600
+        print(f"{entry['kind']:>14} | {entry['key']:>24} | {_format_size(entry['bytes']):>8} | {age:>9.1f}h | {_describe_fields(entry['fields'])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and prune the artifact cache")
+    parser.add_argument('--root', default=DEFAULT_ROOT)
+    commands = parser.add_subparsers(dest='command', required=True)
+    list_parser = commands.add_parser('list', help="show every entry, least recently used first")
+    list_parser.add_argument('--kind', action='append')
+    prune_parser = commands.add_parser('prune', help="evict least recently used or stale entries")
+    prune_parser.add_argument('--max-size', type=_parse_size, help="e.g. 500M or 2G")
+    prune_parser.add_argument('--older-than', type=float, help="days since last use")
+    prune_parser.add_argument('--kind', action='append')
+    clear_parser = commands.add_parser('clear', help="remove every entry")
+    clear_parser.add_argument('--kind', action='append')
+    args = parser.parse_args()
+
+    cache = ArtifactCache(args.root, max_bytes=None)
+    if args.command == 'list':
+        entries = [entry for entry in cache.entries() if args.kind is None or entry['kind'] in args.kind]
+        _print_entries(entries)
+        print(f"{len(entries)} entries, {_format_size(sum(entry['bytes'] for entry in entries))} in {args.root}")
+    else:
+        if args.command == 'prune':
+            if args.max_size is None and args.older_than is None:
+                parser.error("prune needs --max-size and/or --older-than")
+            older_than = args.older_than * 24 * 3600 if args.older_than is not None else None
+            removed = cache.prune(max_bytes=args.max_size, kinds=args.kind, older_than=older_than)
+        else:
+            removed = cache.clear(kinds=args.kind)
+        _print_entries(removed)
+        print(f"Removed {len(removed)} entries, freed {_format_size(sum(entry['bytes'] for entry in removed))}")
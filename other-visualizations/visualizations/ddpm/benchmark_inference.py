@@ -0,0 +1,90 @@
+"""
+    Cold-start benchmark of a batch sampling job: a fresh interpreter that
+    imports the code, loads the model and draws samples. Compares importing
+    `train.py` against the exported model in `inference.py` with each
+    backend.
+
+        python -m visualizations.ddpm.export_model visualizations/ddpm/models/spiral_model.pth exported/spiral
+        python -m visualizations.ddpm.benchmark_inference exported/spiral
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from . import PACKAGE_DIR, MODELS_DIR
+
+# Each job prints its import, load and sampling times as JSON
+TRAIN_JOB = """
+import json
+import time
+start = time.perf_counter()
+import torch
+from visualizations.ddpm.train import DiffusionModel
+from visualizations.ddpm.sampling import DDIMSampler
+imported = time.perf_counter()
+torch.set_num_threads(1)
+model = DiffusionModel()
+model.load_state_dict(torch.load({checkpoint!r}))
+loaded = time.perf_counter()
+DDIMSampler(model, num_inference_timesteps={num_steps}).sample({num_samples})
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'load': loaded - imported, 'sample': done - loaded}}))
+"""
+
+INFERENCE_JOB = """
+import json
+import time
+start = time.perf_counter()
+from visualizations.ddpm.inference import ExportedModel
+imported = time.perf_counter()
+model = ExportedModel({directory!r}, backend={backend!r})
+loaded = time.perf_counter()
+model.sample({num_samples}, sampler='ddim', num_steps={num_steps})
+done = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'load': loaded - imported, 'sample': done - loaded}}))
+"""
+
+def run_job(code, repeats=1):
+    """
+        Best wall time of the job, and the phases of that run
+    """
+    best = None
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            # The root the `visualizations` package is imported from
+            cwd=os.path.dirname(os.path.dirname(PACKAGE_DIR)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        phases = json.loads(output.strip().splitlines()[-1])
+        if best is None or sum(phases.values()) < sum(best.values()):
+            best = phases
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', help="output directory of export_model.py")
+    parser.add_argument('--checkpoint', default=os.path.join(MODELS_DIR, 'spiral_model.pth'))
+    parser.add_argument('--num-samples', type=int, default=10000)
+    parser.add_argument('--num-steps', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(os.path.join(args.directory, 'manifest.json')) as file:
+        backends = ['numpy'] + [name for name in json.load(file)['files'] if name != 'numpy']
+    jobs = {'train.py': TRAIN_JOB.format(checkpoint=os.path.abspath(args.checkpoint), num_steps=args.num_steps, num_samples=args.num_samples)}
+    for backend in backends:
+        jobs[f'inference.py, {backend}'] = INFERENCE_JOB.format(
+            directory=os.path.abspath(args.directory), backend=backend, num_steps=args.num_steps, num_samples=args.num_samples
+        )
+    print(f"{'job':>24} | {'import (s)':>10} | {'load (s)':>8} | {'sample (s)':>10} | {'total (s)':>9}")
+    for label, code in jobs.items():
+        phases = run_job(code, args.repeats)
+        print(
+            f"{label:>24} | {phases['import']:>10.3f} | {phases['load']:>8.3f} | "
+            f"{phases['sample']:>10.3f} | {sum(phases.values()):>9.3f}"
+        )
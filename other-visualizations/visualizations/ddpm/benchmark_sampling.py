@@ -0,0 +1,122 @@
+"""
+    Benchmarks the precomputed-coefficient DDPM sampler against the
+    original per-step sampling loop built on `DiffusionModel.step`, the
+    scaling of the chunked multi-process front-end and the fused inference
+    network in each precision.
+"""
+import os
+import argparse
+import time
+import numpy as np
+import torch
+
+from .train import DiffusionModel
+from .sampling import DDPMSampler
+from .parallel_sampling import parallel_sample
+from .trajectory import TrajectoryRecorder
+from .metrics import sliced_wasserstein
+from . import MODELS_DIR
+
+def legacy_sample(model, num_samples=1000):
+    """
+        The original sampling loop, kept as the reference implementation
+    """
+    sample = torch.randn(num_samples, 2)
+    timesteps = list(range(model.total_timesteps))[::-1]
+    for t in timesteps:
+        t = torch.from_numpy(np.repeat(t, num_samples)).long()
+        with torch.no_grad():
+            residual = model.predict_noise(sample, t)
+        sample = model.step(residual, t[0], sample)
+
+    return sample
+
+def time_call(function, repeats=1):
+    """
+        Returns the best wall time of a few calls
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 50000, 500000])
+    parser.add_argument('--checkpoint', default=os.path.join(MODELS_DIR, 'spiral_model.pth'))
+    parser.add_argument('--compile', action='store_true')
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--workers', type=int, nargs='*', default=[])
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    # bfloat16 is accepted but left out by default, over 1000 steps it drifts to a different sample set
+    parser.add_argument('--fused-dtypes', nargs='*', default=['float32', 'float16'])
+    parser.add_argument('--swd-tolerance', type=float, default=5e-3, help="largest sliced Wasserstein distance to the unfused samples")
+    args = parser.parse_args()
+    # Load the trained model
+    model = DiffusionModel()
+    model.load_state_dict(torch.load(args.checkpoint))
+    model.eval()
+    sampler = DDPMSampler(model, compile=args.compile)
+    # Check both paths draw the same samples for the same seed
+    torch.manual_seed(0)
+    reference = legacy_sample(model, num_samples=100)
+    torch.manual_seed(0)
+    fast, _ = sampler.sample(num_samples=100)
+    print(f"Max abs difference vs legacy loop: {(reference - fast).abs().max().item():.2e}")
+    # Check the recorder keeps the requested steps and rejects ones the chain never reaches
+    torch.manual_seed(0)
+    _, recorded = sampler.sample(num_samples=100, recorder=TrajectoryRecorder(steps=[0, model.total_timesteps - 1]))
+    if not torch.equal(recorded[-1], fast):
+        raise SystemExit("The recorded last step differs from the final samples")
+    for steps in ([-1], [model.total_timesteps]):
+        try:
+            sampler.sample(num_samples=10, recorder=TrajectoryRecorder(steps=steps))
+        except ValueError:
+            continue
+        raise SystemExit(f"TrajectoryRecorder accepted out-of-range steps {steps}")
+
+    print(f"{'samples':>10} {'legacy (s)':>12} {'fast (s)':>10} {'speedup':>8}")
+    for num_samples in args.sizes:
+        legacy_time = time_call(lambda: legacy_sample(model, num_samples), args.repeats)
+        fast_time = time_call(lambda: sampler.sample(num_samples), args.repeats)
+        print(f"{num_samples:>10} {legacy_time:>12.3f} {fast_time:>10.3f} {legacy_time / fast_time:>7.2f}x")
+    # The fused network against the unfused fast sampler, same seed for the error
+    # Accuracy is measured once per dtype on a fixed seed: the largest drift of
+    # a single chain, and the sliced Wasserstein distance to the unfused samples
+    inaccurate = []
+    if args.fused_dtypes:
+        torch.manual_seed(0)
+        unfused_samples, _ = sampler.sample(num_samples=5000)
+        accuracy = {}
+        for dtype in args.fused_dtypes:
+            model.fuse(getattr(torch, dtype))
+            torch.manual_seed(0)
+            fused_samples, _ = sampler.sample(num_samples=5000)
+            accuracy[dtype] = (
+                (fused_samples - unfused_samples).abs().max().item(),
+                sliced_wasserstein(fused_samples, unfused_samples),
+            )
+            if accuracy[dtype][1] > args.swd_tolerance:
+                inaccurate.append(dtype)
+        model.fused_network = None
+        print(f"{'samples':>10} {'fused dtype':>12} {'time (s)':>10} {'speedup':>8} {'max error':>10} {'SWD':>9}")
+        for num_samples in args.sizes:
+            unfused_time = time_call(lambda: sampler.sample(num_samples), args.repeats)
+            for dtype in args.fused_dtypes:
+                model.fuse(getattr(torch, dtype))
+                fused_time = time_call(lambda: sampler.sample(num_samples), args.repeats)
+                model.fused_network = None
+                error, swd = accuracy[dtype]
+                flag = '  over tolerance' if dtype in inaccurate else ''
+                print(f"{num_samples:>10} {dtype:>12} {fused_time:>10.3f} {unfused_time / fused_time:>7.2f}x {error:>10.2e} {swd:>9.2e}{flag}")
+    # Throughput of the multi-process front-end at the largest size
+    if args.workers:
+        num_samples = max(args.sizes)
+        print(f"{'workers':>10} {'time (s)':>12} {'samples/s':>10}")
+        for num_workers in args.workers:
+            elapsed = time_call(lambda: parallel_sample(model, num_samples, chunk_size=args.chunk_size, num_workers=num_workers), args.repeats)
+            print(f"{num_workers:>10} {elapsed:>12.3f} {num_samples / elapsed:>10.0f}")
+    if inaccurate:
+        raise SystemExit(f"Fused {', '.join(inaccurate)} samples are further than {args.swd_tolerance:.0e} SWD from float32")
@@ -0,0 +1,91 @@
+"""
+    Benchmarks training throughput (iterations per second) of the original
+    `DataLoader` loop against `train_fast`, on the spiral and dino datasets.
+"""
+import argparse
+import itertools
+import shutil
+import tempfile
+import time
+import torch
+import torch.nn as nn
+
+from .train import DiffusionModel, load_datasaurus
+from .distributions import make_spiral_data
+from .training import train_fast
+
+def legacy_train(model, data, num_iterations=1000, batch_size=32, learning_rate=1e-4):
+    """
+        The original training loop without its plotting, kept as the
+        reference implementation
+    """
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    loss_fn = nn.MSELoss()
+    data_loader = torch.utils.data.DataLoader(data, batch_size=batch_size, shuffle=True)
+    cyclic_data_iterator = itertools.cycle(data_loader)
+    losses = []
+    for i in range(num_iterations):
+        optimizer.zero_grad()
+        noise_free_data = next(cyclic_data_iterator)
+        time_steps = torch.randint(0, model.total_timesteps, (noise_free_data.shape[0],))
+        noise = torch.randn(noise_free_data.shape)
+        noisy_data = model.add_noise(noise_free_data, noise, time_steps)
+        predicted_noise = model.predict_noise(noisy_data, time_steps)
+        loss = loss_fn(predicted_noise, noise)
+        losses.append(loss.item())
+        loss.backward()
+        optimizer.step()
+    return losses
+
+def iterations_per_second(function, num_iterations, repeats=1):
+    """
+        Returns the best rate of a few calls
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return num_iterations / best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datasets', nargs='+', default=['spiral', 'dino'])
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--eval-every', type=int, default=2500, help="plot interval of the eval runs")
+    args = parser.parse_args()
+    # The eval plots are only there to be timed, keep them out of the source tree
+    plot_dir = tempfile.mkdtemp(prefix='benchmark_training_')
+    datasets = {
+        'spiral': lambda: make_spiral_data(num_examples=1000, std=0.0, rescale_factor=0.3),
+        'dino': load_datasaurus,
+    }
+    print(f"{'dataset':>8} | {'loop':>22} | {'it/s':>8} | {'speedup':>7}")
+    for name in args.datasets:
+        data = datasets[name]()
+        runs = {
+            'legacy DataLoader': lambda: legacy_train(
+                DiffusionModel(), data, args.iterations, args.batch_size
+            ),
+            'train_fast': lambda: train_fast(
+                DiffusionModel(), data, args.iterations, args.batch_size, progress=False
+            ),
+            'train_fast, sync eval': lambda: train_fast(
+                DiffusionModel(), data, args.iterations, args.batch_size, progress=False,
+                eval_every=args.eval_every, plot_dir=plot_dir, async_eval=False
+            ),
+            'train_fast, async eval': lambda: train_fast(
+                DiffusionModel(), data, args.iterations, args.batch_size, progress=False,
+                eval_every=args.eval_every, plot_dir=plot_dir
+            ),
+        }
+        # Warm up the allocator and kernels before timing
+        legacy_train(DiffusionModel(), data, 200, args.batch_size)
+        baseline = None
+        for label, run in runs.items():
+            rate = iterations_per_second(run, args.iterations, args.repeats)
+            baseline = baseline or rate
+            print(f"{name:>8} | {label:>22} | {rate:>8.0f} | {rate / baseline:>6.2f}x")
+    shutil.rmtree(plot_dir, ignore_errors=True)
@@ -0,0 +1,198 @@
+"""
+    Vectorized analytic densities for the Gaussian mixture datasets.
+
+    Log-densities and scores are evaluated for arbitrary (N, D) point
+    arrays at once, in chunks of points so that the (points x components)
+    intermediates stay bounded, and combined over components with a
+    logsumexp for numerical stability.
+"""
+import numpy as np
+
+# Upper bound on the number of (point, component) pairs held at once
+max_chunk_elements = 2 ** 22
+
+def logsumexp(a, axis=-1):
+    """
+        Numerically stable log(sum(exp(a))) along an axis
+    """
+    a_max = np.max(a, axis=axis, keepdims=True)
+    a_max = np.where(np.isfinite(a_max), a_max, 0.0)
+    return np.log(np.sum(np.exp(a - a_max), axis=axis)) + np.squeeze(a_max, axis=axis)
+
+class GaussianMixture():
+    """
+        Mixture of Gaussians with isotropic or full covariances.
+
+        Args:
+            means: (K, D) component means
+            covariances: (K,) per-component variances for isotropic
+                components, or (K, D, D) full covariance matrices
+            weights: (K,) component weights. They are not required to sum
+                to one, unnormalized weights give an unnormalized density.
+    """
+
+    def __init__(self, means, covariances, weights=None):
+        self.means = np.asarray(means, dtype=np.float64)
+        num_components, dim = self.means.shape
+        covariances = np.asarray(covariances, dtype=np.float64)
+        if weights is None:
+            weights = np.full(num_components, 1.0 / num_components)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.isotropic = covariances.ndim == 1
+        if self.isotropic:
+            self.variances = covariances
+            log_det = dim * np.log(covariances)
+        else:
+            self.covariances = covariances
+            self.precisions = np.linalg.inv(covariances)
+            log_det = np.linalg.slogdet(covariances)[1]
+        # Everything in the log density that does not depend on x
+        self.log_constants = np.log(self.weights) - 0.5 * (dim * np.log(2 * np.pi) + log_det)
+
+    def _component_terms(self, x):
+        """
+            Per-component log densities (N, K) and score directions
+        """
+        if self.isotropic:
+            # |x - mu|^2 expanded so the cross term is a single matmul
+            squared_distances = (
+                np.sum(x ** 2, axis=1)[:, None]
+                - 2 * x @ self.means.T
+                + np.sum(self.means ** 2, axis=1)[None, :]
+            )
+            log_probs = self.log_constants - 0.5 * np.maximum(squared_distances, 0.0) / self.variances
+            return log_probs, None
+        differences = x[:, None, :] - self.means[None, :, :]
+        # -P_k (x - mu_k) for every point and component
+        directions = -np.einsum('kde,nke->nkd', self.precisions, differences)
+        log_probs = self.log_constants + 0.5 * np.einsum('nkd,nkd->nk', differences, directions)
+        return log_probs, directions
+
+    def _chunks(self, x):
+        chunk_size = max(1, max_chunk_elements // (len(self.weights) * x.shape[1]))
+        for start in range(0, len(x), chunk_size):
+            yield start, x[start:start + chunk_size]
+
+    def log_prob(self, x):
+        """
+            Log density at each of the (N, D) points
+        """
+        x = np.asarray(x, dtype=np.float64)
+        log_prob = np.empty(len(x))
+        for start, chunk in self._chunks(x):
+            log_probs, _ = self._component_terms(chunk)
+            log_prob[start:start + len(chunk)] = logsumexp(log_probs, axis=1)
+        return log_prob
+
+    def prob(self, x):
+        """
+            Density at each of the (N, D) points
+        """
+        return np.exp(self.log_prob(x))
+
+    def log_prob_grid(self, x_values, y_values):
+        """
+            Log density on the meshgrid of `x_values` and `y_values`, laid
+            out like `np.meshgrid(x_values, y_values)`.
+
+            Isotropic 2D Gaussians factor over the two axes, so the grid is
+            one (H, K) x (K, W) matrix product of per-axis factors instead of
+            H * W * K exponentials.
+        """
+        x_values = np.asarray(x_values, dtype=np.float64)
+        y_values = np.asarray(y_values, dtype=np.float64)
+        xx, yy = np.meshgrid(x_values, y_values)
+        if not self.isotropic or self.means.shape[1] != 2:
+            return self.log_prob(np.stack([xx.ravel(), yy.ravel()], axis=-1)).reshape(xx.shape)
+        # Per-axis log factors, shifted so each column peaks at one
+        log_factors_x = -0.5 * (x_values[None, :] - self.means[:, :1]) ** 2 / self.variances[:, None]
+        log_factors_y = -0.5 * (y_values[None, :] - self.means[:, 1:]) ** 2 / self.variances[:, None]
+        log_factors_y = log_factors_y + self.log_constants[:, None]
+        shift_x = log_factors_x.max(axis=0)
+        shift_y = log_factors_y.max(axis=0)
+        grid = np.exp(log_factors_y - shift_y).T @ np.exp(log_factors_x - shift_x)
+        with np.errstate(divide='ignore'):
+            log_prob = np.log(grid) + shift_y[:, None] + shift_x[None, :]
+        # Redo any points where the product underflowed with the exact path
+        underflowed = grid < 1e-250
+        if np.any(underflowed):
+            points = np.stack([xx[underflowed], yy[underflowed]], axis=-1)
+            log_prob[underflowed] = self.log_prob(points)
+        return log_prob
+
+    def prob_grid(self, x_values, y_values):
+        """
+            Density on the meshgrid of `x_values` and `y_values`
+        """
+        return np.exp(self.log_prob_grid(x_values, y_values))
+
+    def score(self, x):
+        """
+            Gradient of the log density at each of the (N, D) points
+        """
+        return self.log_prob_and_score(x)[1]
+
+    def log_prob_and_score(self, x):
+        """
+            Log density (N,) and its gradient (N, D) in a single pass
+        """
+        x = np.asarray(x, dtype=np.float64)
+        log_prob = np.empty(len(x))
+        score = np.empty(x.shape)
+        for start, chunk in self._chunks(x):
+            log_probs, directions = self._component_terms(chunk)
+            chunk_log_prob = logsumexp(log_probs, axis=1)
+            # Posterior responsibility of each component
+            responsibilities = np.exp(log_probs - chunk_log_prob[:, None])
+            if self.isotropic:
+                scaled = responsibilities / self.variances
+                chunk_score = scaled @ self.means - np.sum(scaled, axis=1)[:, None] * chunk
+            else:
+                chunk_score = np.einsum('nk,nkd->nd', responsibilities, directions)
+            log_prob[start:start + len(chunk)] = chunk_log_prob
+            score[start:start + len(chunk)] = chunk_score
+        return log_prob, score
+
+def evaluate_on_grid(function, x_range, y_range, resolution=200):
+    """
+        Evaluates a function of (N, 2) points on a meshgrid.
+
+        Returns:
+            xx, yy and the values, all of shape (resolution, resolution)
+            laid out like `np.meshgrid(x, y)`. Trailing dimensions of the
+            function output (e.g. score vectors) are kept.
+    """
+    x = np.linspace(x_range[0], x_range[1], resolution)
+    y = np.linspace(y_range[0], y_range[1], resolution)
+    xx, yy = np.meshgrid(x, y)
+    values = function(np.stack([xx.ravel(), yy.ravel()], axis=-1))
+    return xx, yy, values.reshape(xx.shape + values.shape[1:])
+
+def spiral_mixture(num_gaussians=1000, std=0.3, rescale_factor=0.3):
+    """
+        Equal-weight isotropic Gaussians centered along the spiral
+    """
+    angles = np.linspace(0, 4 * np.pi, num_gaussians)
+    means = rescale_factor * angles[:, None] * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    return GaussianMixture(means, np.full(num_gaussians, std ** 2))
+
+def three_mode_mixture(scale=0.5):
+    """
+        The three Gaussians of `make_gaussian_mixture`, whose samples are
+        scaled by `scale` (one half by default)
+    """
+    means = np.array([[2.2, 1.5], [-2.5, 2.5], [0.0, -2.0]]) * scale
+    variances = np.array([0.4, 0.5, 0.7]) * scale ** 2
+    return GaussianMixture(means, variances)
+
+def star_mixture():
+    """
+        The three elongated zero-mean Gaussians, rotated by 0, 60 and 120
+        degrees, that `generate_star_samples` draws from
+    """
+    covariance = np.array([[1.0, 0.0], [0.0, 0.1]])
+    covariances = []
+    for angle in [0.0, np.pi / 3, 2 * np.pi / 3]:
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        covariances.append(rotation @ covariance @ rotation.T)
+    return GaussianMixture(np.zeros((3, 2)), np.stack(covariances))
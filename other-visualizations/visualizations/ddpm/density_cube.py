@@ -0,0 +1,169 @@
+"""
+    Precomputed per-frame density images for the score-over-time videos.
+
+    All T smoothed sample-density images are computed in one pass ahead of
+    rendering and stored as a compact (T, H, W) cube in a `.npy` memmap, so
+    a re-render with different styling only reads images back.
+
+    Samples are binned straight at the target resolution, a whole chunk of
+    timesteps with a single `np.bincount`, and smoothed with separable 1D
+    Gaussian filters along both image axes. Each frame is stored scaled to
+    a peak of one (the videos normalize each frame's colormap anyway), as
+    float16 or uint8, with the per-frame scales kept next to the cube in
+    `<name>_scales.npy`.
+
+    `cached_density_cube` keeps the cube in the artifact cache, next to the
+    sampled trajectories it was binned from.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from .artifact_cache import ArtifactCache
+
+def _scales_path(path):
+    return os.path.splitext(path)[0] + '_scales.npy'
+
+def bin_frames(frames, bins, range):
+    """
+        Histograms (T, H, W) of a (T, N, 2) block of frames, with y along
+        the rows (row 0 at the bottom of `range`)
+    """
+    num_frames = len(frames)
+    range = np.asarray(range, dtype=np.float64)
+    scaled = (frames - range[:, 0]) / (range[:, 1] - range[:, 0]) * bins
+    indices = np.floor(scaled).astype(np.int64)
+    # The upper edge belongs to the last bin, like np.histogram2d
+    indices[scaled == bins] = bins - 1
+    inside = np.all((indices >= 0) & (indices < bins), axis=2)
+    # One flat (frame, y, x) index per sample, counted all at once
+    frame_indices = np.broadcast_to(np.arange(num_frames)[:, None], inside.shape)
+    flat = (frame_indices[inside] * bins + indices[..., 1][inside]) * bins + indices[..., 0][inside]
+    return np.bincount(flat, minlength=num_frames * bins * bins).reshape(num_frames, bins, bins).astype(np.float32)
+
+def smooth_frames(images, sigma):
+    """
+        Separable Gaussian smoothing of each (H, W) image, sigma in bins
+    """
+    if not sigma:
+        return images
+    from scipy.ndimage import gaussian_filter1d
+
+    images = gaussian_filter1d(images, sigma, axis=1, mode='constant')
+    return gaussian_filter1d(images, sigma, axis=2, mode='constant')
+
+def _quantize(images, dtype):
+    scales = images.reshape(len(images), -1).max(axis=1)
+    normalized = images / np.where(scales > 0, scales, 1.0)[:, None, None]
+    if np.dtype(dtype) == np.uint8:
+        return np.round(normalized * 255).astype(np.uint8), scales
+    return normalized.astype(dtype), scales
+
+def _build_chunk(task):
+    trajectories, start, stop, bins, range, sigma, dtype, path = task
+    if isinstance(trajectories, str):
+        trajectories = np.load(trajectories, mmap_mode='r')
+    images = smooth_frames(bin_frames(np.asarray(trajectories[start:stop]), bins, range), sigma)
+    images, scales = _quantize(images, dtype)
+    cube = np.load(path, mmap_mode='r+')
+    cube[start:stop] = images
+    cube.flush()
+    return start, stop, scales
+
+def build_density_cube(
+        trajectories,
+        path,
+        bins=100,
+        range=((-3, 3), (-3, 3)),
+        sigma=1.0,
+        dtype=np.float16,
+        frames_per_chunk=16,
+        num_workers=None,
+    ):
+    """
+        Bins and smooths every frame of a frame-major trajectory into a
+        (T, bins, bins) cube on disk.
+
+        Args:
+            trajectories: (T, N, 2) array, or the path of a `.npy` file
+                holding one (as written by `parallel_sample` or
+                `MemmapTrajectoryRecorder`), which lets the frames be split
+                over worker processes
+            path: output `.npy` file for the cube
+            range: [[xmin, xmax], [ymin, ymax]] covered by the bins
+            sigma: Gaussian smoothing width in output bins (0 for none)
+            dtype: np.float16 or np.uint8
+            frames_per_chunk: frames binned together, bounds the memory use
+            num_workers: number of processes (defaults to all CPU cores,
+                only used when `trajectories` is a path)
+
+        Returns:
+            The cube as a read-only memmap and the (T,) per-frame scales
+    """
+    num_frames = len(np.load(trajectories, mmap_mode='r')) if isinstance(trajectories, str) else len(trajectories)
+    np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(num_frames, bins, bins))
+    scales = np.empty(num_frames, dtype=np.float32)
+    tasks = [
+        (trajectories, start, min(start + frames_per_chunk, num_frames), bins, range, sigma, dtype, path)
+        for start in np.arange(0, num_frames, frames_per_chunk).tolist()
+    ]
+
+    def merge(results):
+        for start, stop, chunk_scales in results:
+            scales[start:stop] = chunk_scales
+
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    if num_workers <= 1 or not isinstance(trajectories, str):
+        # In-memory frames are binned in this process
+        merge(map(_build_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(num_workers) as executor:
+            merge(executor.map(_build_chunk, tasks))
+    np.save(_scales_path(path), scales)
+    return load_density_cube(path)
+
+def load_density_cube(path):
+    """
+        The cube written by `build_density_cube`, as a read-only memmap,
+        and its (T,) per-frame scales
+    """
+    return np.load(path, mmap_mode='r'), np.load(_scales_path(path))
+
+def cached_density_cube(
+        trajectories,
+        bins=100,
+        range=((-3, 3), (-3, 3)),
+        sigma=1.0,
+        dtype=np.float16,
+        num_workers=None,
+        cache=None,
+    ):
+    """
+        `build_density_cube` through the artifact cache.
+
+        Args:
+            trajectories: trajectories memmap returned by `cached_sample`,
+                the cube is keyed by the cache entry it belongs to
+            cache: the `ArtifactCache` holding the trajectories
+
+        Returns:
+            The cube as a read-only memmap and the (T,) per-frame scales
+    """
+    cache = cache if cache is not None else ArtifactCache()
+    fields = dict(
+        trajectories=cache.entry_key(trajectories.filename),
+        bins=bins,
+        range=range,
+        sigma=sigma,
+        dtype=dtype,
+    )
+
+    def build(directory):
+        build_density_cube(
+            trajectories.filename, os.path.join(directory, 'cube.npy'),
+            bins=bins, range=range, sigma=sigma, dtype=dtype, num_workers=num_workers
+        )
+
+    directory = cache.get_or_create('density_cube', fields, build)
+    return load_density_cube(os.path.join(directory, 'cube.npy'))
@@ -0,0 +1,133 @@
+"""
+    Exports a trained `DiffusionModel` checkpoint for the lightweight
+    runtime in `inference.py`.
+
+    The output directory holds
+
+        manifest.json   shapes, timesteps and the files written
+        model.npz       the fused network weights (see `fused_network.py`)
+                        and the schedule tables, used by every backend
+        model.pt        TorchScript trace of the fused network, with the
+                        schedule tables as buffers
+        model.onnx      ONNX graph of the fused network
+
+    The network takes x of shape (N, data_dim) and int64 timesteps of
+    shape (N,) or (1,), the latter being broadcast over the batch. After
+    export each backend is loaded back through `inference.py` and compared
+    against the PyTorch model on a probe batch.
+
+        python -m visualizations.ddpm.export_model visualizations/ddpm/models/spiral_model.pth exported/spiral
+        python -m visualizations.ddpm.export_model visualizations/ddpm/models/dino_model.pth exported/dino --formats torchscript
+"""
+import argparse
+import importlib.util
+import json
+import os
+import warnings
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .train import DiffusionModel
+from .fused_network import FusedScoreNetwork
+from .artifact_cache import model_hash
+from .inference import SCHEDULE_TABLES, ExportedModel
+
+FORMATS = {'torchscript': 'model.pt', 'onnx': 'model.onnx'}
+
+class ExportedNetwork(nn.Module):
+    """
+        The fused network with the schedule tables attached as buffers, so
+        the TorchScript file is self-contained
+    """
+
+    def __init__(self, model):
+        super(ExportedNetwork, self).__init__()
+        self.network = FusedScoreNetwork(model.score_network, torch.float32)
+        for name in SCHEDULE_TABLES:
+            self.register_buffer(name, getattr(model.schedule, name).float().clone())
+
+    def forward(self, x, time):
+        return self.network(x, time)
+
+def export_model(model, output_dir, formats=('torchscript', 'onnx'), opset_version=17, source=None):
+    """
+        Writes the model in each format and returns the manifest. ONNX is
+        skipped with a warning when the `onnx` package is not installed,
+        the manifest lists the formats actually written.
+    """
+    formats = list(formats)
+    if 'onnx' in formats and importlib.util.find_spec('onnx') is None:
+        warnings.warn("The onnx package is not installed, skipping the ONNX export")
+        formats.remove('onnx')
+    os.makedirs(output_dir, exist_ok=True)
+    model = model.cpu().float().eval()
+    module = ExportedNetwork(model).eval()
+    data_dim = model.score_network.data_dim
+    # Weights and tables as plain arrays, for the numpy backend and the samplers
+    arrays = {name: buffer.numpy() for name, buffer in module.network.named_buffers()}
+    arrays.update({name: getattr(module, name).numpy() for name in SCHEDULE_TABLES})
+    np.savez(os.path.join(output_dir, 'model.npz'), **arrays)
+    example = (torch.randn(8, data_dim), torch.randint(0, model.total_timesteps, (8,)))
+    with torch.no_grad():
+        if 'torchscript' in formats:
+            traced = torch.jit.trace(module, example)
+            traced.save(os.path.join(output_dir, FORMATS['torchscript']))
+        if 'onnx' in formats:
+            torch.onnx.export(
+                module,
+                example,
+                os.path.join(output_dir, FORMATS['onnx']),
+                input_names=['x', 'time'],
+                output_names=['noise'],
+                # The timesteps have their own batch axis so one can be broadcast
+                dynamic_axes={'x': {0: 'batch'}, 'time': {0: 'time_batch'}, 'noise': {0: 'batch'}},
+                opset_version=opset_version,
+                dynamo=False,
+            )
+    manifest = {
+        'data_dim': data_dim,
+        'total_timesteps': model.total_timesteps,
+        'num_layers': module.network.num_layers,
+        'files': {'numpy': 'model.npz', **{name: FORMATS[name] for name in formats}},
+        'model_hash': model_hash(model),
+        'source': source,
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+def check_parity(model, output_dir, backends, num_probes=4096, seed=0):
+    """
+        Largest difference between each exported backend and the PyTorch
+        model on a random probe batch
+    """
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(num_probes, model.score_network.data_dim, generator=generator) * 2
+    time = torch.randint(0, model.total_timesteps, (num_probes,), generator=generator)
+    with torch.no_grad():
+        reference = model.score_network(x, time).numpy()
+    errors = {}
+    for backend in backends:
+        exported = ExportedModel(output_dir, backend=backend)
+        errors[backend] = float(np.abs(exported.predict_noise(x.numpy(), time.numpy()) - reference).max())
+    return errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a DiffusionModel checkpoint for inference.py")
+    parser.add_argument('checkpoint')
+    parser.add_argument('output_dir')
+    parser.add_argument('--formats', nargs='+', default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument('--time-dim', type=int, default=10)
+    parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+
+    model = DiffusionModel(time_dim=args.time_dim)
+    model.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    manifest = export_model(model, args.output_dir, args.formats, args.opset, source=os.path.basename(args.checkpoint))
+    print(f"Wrote {args.output_dir}: {', '.join(manifest['files'].values())}")
+    errors = check_parity(model, args.output_dir, list(manifest['files']))
+    for backend, error in errors.items():
+        print(f"{backend:>12}: max probe error vs PyTorch {error:.2e}")
+    if max(errors.values()) > 1e-4:
+        raise SystemExit("Parity check failed")
@@ -0,0 +1,75 @@
+"""
+    Inference-only forward pass of a trained `ScoreNetwork`.
+
+    The first layer sees the concatenation [x, embedding(t)], so its output
+    splits into x @ W_x plus a term that only depends on t. That term and
+    the layer's bias are precomputed for every timestep as a (T, hidden)
+    table, and the first layer becomes
+
+        h = relu(x @ W_x + time_bias[t])
+
+    with no embedding lookup or concatenation. Every weight is stored
+    transposed and contiguous so each layer is a single `addmm`, in float32,
+    float16 or bfloat16. float16 reproduces the float32 samples closely,
+    bfloat16's 8-bit mantissa compounds over the 1000 DDPM steps into a
+    visibly different sample set. When a whole batch shares one timestep
+    (as it does on every sampler step) `t` can be a plain int and its bias
+    row is broadcast.
+"""
+import torch
+import torch.nn as nn
+
+class FusedScoreNetwork(nn.Module):
+    """
+        Frozen copy of a `ScoreNetwork` for inference. The tables are
+        non-persistent buffers, so they follow `.to(device)` but are not
+        saved, and they have to be rebuilt whenever the weights change.
+
+        Args:
+            score_network: `ScoreNetwork` with a `positional_embedding` and
+                a `network` of Linear layers with ReLUs between them
+            dtype: dtype of the tables and the matmuls (that of the weights
+                by default)
+    """
+
+    def __init__(self, score_network, dtype=None):
+        super(FusedScoreNetwork, self).__init__()
+        layers = list(score_network.network)
+        linears = layers[0::2]
+        if not all(isinstance(layer, nn.Linear) for layer in linears) or \
+                not all(isinstance(layer, nn.ReLU) for layer in layers[1::2]):
+            raise ValueError("Expected Linear layers with ReLUs between them")
+        first = linears[0]
+        dtype = dtype or first.weight.dtype
+        data_dim = score_network.data_dim
+        self.num_layers = len(linears)
+        with torch.no_grad():
+            # Fold the time embedding's share of the first layer into a per-timestep bias
+            weight = first.weight.double()
+            embedding = score_network.positional_embedding.positional_encodings.double()
+            time_bias = embedding @ weight[:, data_dim:].T + first.bias.double()
+            self.register_buffer('x_weight', weight[:, :data_dim].T.contiguous().to(dtype), persistent=False)
+            self.register_buffer('time_bias', time_bias.contiguous().to(dtype), persistent=False)
+            for i, layer in enumerate(linears[1:], start=1):
+                self.register_buffer(f'weight_{i}', layer.weight.T.contiguous().to(dtype), persistent=False)
+                # Copied, so the tables never alias the trainable parameters
+                self.register_buffer(f'bias_{i}', layer.bias.to(dtype, copy=True), persistent=False)
+
+    @property
+    def dtype(self):
+        return self.x_weight.dtype
+
+    def forward(self, x, time):
+        """
+            Args:
+                x: (N, data_dim) noisy samples
+                time: (N,) integer timesteps, or one int shared by the batch
+
+            Returns:
+                The (N, data_dim) noise prediction, in the dtype of x
+        """
+        output_dtype = x.dtype
+        hidden = torch.addmm(self.time_bias[time], x.to(self.dtype), self.x_weight)
+        for i in range(1, self.num_layers):
+            hidden = torch.addmm(getattr(self, f'bias_{i}'), hidden.relu_(), getattr(self, f'weight_{i}'))
+        return hidden.to(output_dtype)
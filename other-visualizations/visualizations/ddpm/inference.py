@@ -0,0 +1,221 @@
+"""
+    Minimal runtime for models written by `export_model.py`, for batch
+    sampling jobs on small CPU workers.
+
+    Only numpy is imported up front. The network runs through one of three
+    backends:
+
+        numpy        the fused weights in model.npz, no other dependency
+        torchscript  model.pt, imports torch on first use
+        onnx         model.onnx, imports onnxruntime on first use
+
+    The DDPM and DDIM samplers fold the schedule into per-step coefficient
+    tables like `sampling.py`, so each step is a network call and a
+    multiply-add.
+
+        python -m visualizations.ddpm.inference exported/spiral --num-samples 10000 --sampler ddim --num-steps 50 --output samples.npy
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+# Tables of the `NoiseSchedule` stored in model.npz
+SCHEDULE_TABLES = [
+    'betas',
+    'alphas_cumprod',
+    'alphas_cumprod_prev',
+    'sqrt_inv_alphas_cumprod',
+    'sqrt_inv_alphas_cumprod_minus_one',
+    'posterior_mean_coef1',
+    'posterior_mean_coef2',
+    'posterior_variance',
+]
+
+class NumpyBackend():
+    """
+        The fused network (see `fused_network.py`) in float32 numpy
+    """
+
+    def __init__(self, directory, manifest, arrays, num_threads=1):
+        self.x_weight = arrays['x_weight']
+        self.time_bias = arrays['time_bias']
+        self.layers = [(arrays[f'weight_{i}'], arrays[f'bias_{i}']) for i in range(1, manifest['num_layers'])]
+        self.hidden = []
+
+    def __call__(self, x, time):
+        # Hidden activations go to buffers reused while the batch size stays the same
+        if not self.hidden or len(self.hidden[0]) != len(x):
+            self.hidden = [np.empty((len(x), weight.shape[0]), dtype=np.float32) for weight, _ in self.layers]
+        hidden = np.matmul(x, self.x_weight, out=self.hidden[0])
+        hidden += self.time_bias[time]
+        for i, (weight, bias) in enumerate(self.layers):
+            np.maximum(hidden, 0, out=hidden)
+            out = self.hidden[i + 1] if i + 1 < len(self.layers) else None
+            hidden = np.matmul(hidden, weight, out=out)
+            hidden += bias
+        return hidden
+
+class TorchScriptBackend():
+
+    def __init__(self, directory, manifest, arrays, num_threads=1):
+        import torch
+
+        self.torch = torch
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.module = torch.jit.load(os.path.join(directory, manifest['files']['torchscript']))
+
+    def __call__(self, x, time):
+        with self.torch.no_grad():
+            return self.module(
+                self.torch.from_numpy(x),
+                self.torch.from_numpy(np.atleast_1d(time).astype(np.int64))
+            ).numpy()
+
+class ONNXBackend():
+
+    def __init__(self, directory, manifest, arrays, num_threads=1):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(directory, manifest['files']['onnx']),
+            options,
+            providers=['CPUExecutionProvider'],
+        )
+
+    def __call__(self, x, time):
+        return self.session.run(None, {'x': x, 'time': np.atleast_1d(time).astype(np.int64)})[0]
+
+BACKENDS = {'numpy': NumpyBackend, 'torchscript': TorchScriptBackend, 'onnx': ONNXBackend}
+
+class ExportedModel():
+    """
+        An exported diffusion model.
+
+        Args:
+            directory: output directory of `export_model.py`
+            backend: 'numpy', 'torchscript' or 'onnx'
+            num_threads: intra-op threads of the torch and onnx backends,
+                one by default so many workers can share a machine
+    """
+
+    def __init__(self, directory, backend='numpy', num_threads=1):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        with open(os.path.join(directory, 'manifest.json')) as file:
+            self.manifest = json.load(file)
+        if backend != 'numpy' and backend not in self.manifest['files']:
+            raise ValueError(f"{directory} has no {backend} export")
+        with np.load(os.path.join(directory, self.manifest['files']['numpy'])) as arrays:
+            arrays = dict(arrays)
+        self.tables = {name: arrays[name].astype(np.float64) for name in SCHEDULE_TABLES}
+        self.data_dim = self.manifest['data_dim']
+        self.total_timesteps = self.manifest['total_timesteps']
+        self.network = BACKENDS[backend](directory, self.manifest, arrays, num_threads)
+
+    def predict_noise(self, x, time):
+        """
+            Noise prediction at (N, data_dim) points for (N,) integer
+            timesteps, or one int shared by the batch
+        """
+        return self.network(np.ascontiguousarray(x, dtype=np.float32), time)
+
+    def ddpm_coefficients(self):
+        """
+            Timesteps and (x_coef, eps_coef, std) of every step of the
+            ancestral DDPM chain
+        """
+        tables = self.tables
+        timesteps = np.arange(self.total_timesteps - 1, -1, -1)
+        coef1 = tables['posterior_mean_coef1'][timesteps]
+        coef2 = tables['posterior_mean_coef2'][timesteps]
+        x_coef = coef1 * tables['sqrt_inv_alphas_cumprod'][timesteps] + coef2
+        eps_coef = coef1 * tables['sqrt_inv_alphas_cumprod_minus_one'][timesteps]
+        std = tables['posterior_variance'][timesteps] ** 0.5
+        std[timesteps == 0] = 0.0
+        return timesteps, x_coef, eps_coef, std
+
+    def ddim_coefficients(self, num_steps=50, eta=0.0):
+        """
+            Timesteps and (x_coef, eps_coef, std) of `num_steps` strided
+            DDIM steps
+        """
+        step_ratio = self.total_timesteps // num_steps
+        timesteps = (np.arange(num_steps) * step_ratio)[::-1]
+        alphas_cumprod = self.tables['alphas_cumprod']
+        alpha_prod_t = alphas_cumprod[timesteps]
+        alpha_prod_t_prev = np.ones_like(alpha_prod_t)
+        alpha_prod_t_prev[:-1] = alphas_cumprod[timesteps[1:]]
+        beta_prod_t = 1 - alpha_prod_t
+        variance = (1 - alpha_prod_t_prev) / beta_prod_t * (1 - alpha_prod_t / alpha_prod_t_prev)
+        std = eta * variance.clip(0) ** 0.5
+        x_coef = (alpha_prod_t_prev / alpha_prod_t) ** 0.5
+        direction_coef = (1 - alpha_prod_t_prev - std ** 2).clip(0) ** 0.5
+        eps_coef = x_coef * beta_prod_t ** 0.5 - direction_coef
+        return timesteps, x_coef, eps_coef, std
+
+    def sample(self, num_samples=1000, sampler='ddpm', num_steps=50, eta=0.0, seed=None, return_trajectory=False):
+        """
+            Runs the reverse chain for a batch of samples.
+
+            Args:
+                sampler: 'ddpm' (every timestep) or 'ddim' (`num_steps`
+                    strided timesteps)
+
+            Returns:
+                The (num_samples, data_dim) float32 samples and the
+                (num_steps, num_samples, data_dim) trajectory (None unless
+                `return_trajectory`).
+        """
+        if sampler == 'ddpm':
+            timesteps, x_coef, eps_coef, std = self.ddpm_coefficients()
+        elif sampler == 'ddim':
+            timesteps, x_coef, eps_coef, std = self.ddim_coefficients(num_steps, eta)
+        else:
+            raise ValueError(f"Unknown sampler: {sampler}")
+        rng = np.random.default_rng(seed)
+        sample = rng.standard_normal((num_samples, self.data_dim), dtype=np.float32)
+        noise = np.empty_like(sample)
+        trajectory = None
+        if return_trajectory:
+            trajectory = np.empty((len(timesteps), num_samples, self.data_dim), dtype=np.float32)
+        for i, t in enumerate(timesteps.tolist()):
+            residual = self.predict_noise(sample, t)
+            # x_prev = x_coef * x_t - eps_coef * eps + std * z
+            sample *= np.float32(x_coef[i])
+            sample -= np.float32(eps_coef[i]) * residual
+            if std[i] > 0:
+                rng.standard_normal(out=noise, dtype=np.float32)
+                noise *= np.float32(std[i])
+                sample += noise
+            if trajectory is not None:
+                trajectory[i] = sample
+        return sample, trajectory
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample from a model written by export_model.py")
+    parser.add_argument('directory')
+    parser.add_argument('--backend', default='numpy', choices=list(BACKENDS))
+    parser.add_argument('--num-samples', type=int, default=1000)
+    parser.add_argument('--sampler', default='ddpm', choices=['ddpm', 'ddim'])
+    parser.add_argument('--num-steps', type=int, default=50, help="DDIM steps")
+    parser.add_argument('--eta', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--num-threads', type=int, default=1)
+    parser.add_argument('--output', default=None, help=".npy file for the samples")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = ExportedModel(args.directory, backend=args.backend, num_threads=args.num_threads)
+    loaded = time.perf_counter()
+    samples, _ = model.sample(args.num_samples, args.sampler, args.num_steps, args.eta, args.seed)
+    done = time.perf_counter()
+    print(f"Loaded in {loaded - start:.3f} s, drew {args.num_samples} samples in {done - loaded:.3f} s")
+    if args.output is not None:
+        np.save(args.output, samples)
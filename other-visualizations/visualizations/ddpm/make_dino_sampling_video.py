@@ -1,18 +1,20 @@
-from train import DiffusionModel
+import os
+from .train import DiffusionModel
+from .parallel_sampling import cached_sample
 import torch
-from matplotlib.animation import FuncAnimation
+from .video import render_video
 from matplotlib.widgets import Slider
 import matplotlib.pyplot as plt
+from . import MODELS_DIR, PLOTS_DIR
 
 if __name__ == "__main__":
     # Load the dino model
     diffusion_model = DiffusionModel()
-    diffusion_model.load_state_dict(torch.load('models/dino_model.pth'))
+    diffusion_model.load_state_dict(torch.load(os.path.join(MODELS_DIR, 'dino_model.pth')))
     # Draw N samples from it, saving the intermediates
     num_samples = 500
-    _, intermediate_samples = diffusion_model.sample(num_samples=num_samples, num_timesteps=1000)
-    # Truncate the first 30 percent of the samples
-    intermediate_samples = intermediate_samples[:, 900:, :]
+    # Only keep the last 100 steps of each trajectory, sampled once per checkpoint
+    _, intermediate_samples = cached_sample(diffusion_model, num_samples, steps=range(900, 1000), seed=0)
     every_n_steps = 1
     # intermediate_samples = intermediate_samples[:, ::every_n_steps, :]
     # Show all samples moving over time in the video 
@@ -29,7 +31,7 @@ if __name__ == "__main__":
     # Initialize empty line
     line, = ax.plot([], [], lw=2)
     # Initialize scatter plot
-    scatter = ax.scatter(intermediate_samples[:, 0, 0], intermediate_samples[:, 0, 1], color='#67a9cf', alpha=0.5)
+    scatter = ax.scatter(intermediate_samples[0, :, 0], intermediate_samples[0, :, 1], color='#67a9cf', alpha=0.5)
     ax.axis('off')
     # Initialize function to update plot
     def update(t):
@@ -38,7 +40,7 @@ if __name__ == "__main__":
         # line.set_data([t, t], [0, 0])
         ax.set_xlim(-3, 3)
         ax.set_ylim(-3, 3)
-        scatter.set_offsets(intermediate_samples[:, t * every_n_steps, :])
+        scatter.set_offsets(intermediate_samples[t * every_n_steps])
 
     # fig, ax = plt.subplots()
     # plt.subplots_adjust(bottom=0.25)
@@ -70,6 +72,5 @@ if __name__ == "__main__":
         
     # Create animation
     # fig, ax = plt.subplots(figsize=(5, 5))
-    ani = FuncAnimation(fig, update, frames=range(0, 100), interval=50)
-    # Save the animation as a video file
-    ani.save('plots/dino_samples.mp4', writer='ffmpeg', dpi=500)
\ No newline at end of file
+    # Render the frames in parallel and save them as a video file
+    render_video(fig, update, frames=range(0, 100), path=os.path.join(PLOTS_DIR, 'dino_samples.mp4'), fps=20, dpi=500)
\ No newline at end of file
@@ -1,40 +1,34 @@
+import os
 import torch
 # from train import make_spiral_data, DiffusionModel, make_gaussian_mixture
-from train import DiffusionModel
-from distributions import make_gaussian_mixture
+from .train import DiffusionModel
+from .parallel_sampling import cached_sample
+from .densities import three_mode_mixture
+from .marginals import NoisedMixtureMarginals
+from .animation import DensityQuiverFrame
+from .video import render_video
+from .score_field import grid_points
+from .density_cube import cached_density_cube
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import numpy as np
 from tqdm import tqdm
 import seaborn as sns
 import pandas as pd
+from .artifact_cache import DEFAULT_ROOT
+from . import MODELS_DIR, PLOTS_DIR
 
-from scipy import ndimage
 
 # Make a pdf of the gaussian mixture
 def gaussian_mixture_pdf(x):
-    # Define parameters for each Gaussian
-    mean1 = np.array([2.2, 1.5])
-    covariance1 = np.eye(2) * 0.4 # Identity covariance matrix for isotropic distribution
-
-    mean2 = np.array([-2.5, 2.5])
-    covariance2 = np.eye(2) * 0.5
-
-    mean3 = np.array([0, -2])
-    covariance3 = np.eye(2) * 0.7
-    # Compute the pdf of each Gaussian
-    pdf1 = np.exp(-0.5 * (x - mean1).T @ np.linalg.inv(covariance1) @ (x - mean1)) / (2 * np.pi * np.sqrt(np.linalg.det(covariance1)))
-    pdf2 = np.exp(-0.5 * (x - mean2).T @ np.linalg.inv(covariance2) @ (x - mean2)) / (2 * np.pi * np.sqrt(np.linalg.det(covariance2)))
-    pdf3 = np.exp(-0.5 * (x - mean3).T @ np.linalg.inv(covariance3) @ (x - mean3)) / (2 * np.pi * np.sqrt(np.linalg.det(covariance3)))
-    # Return the sum of the pdfs
-    return pdf1 + pdf2 + pdf3
+    """
+        Sum of the three (unscaled) Gaussian pdfs at each of the (N, 2) points
+    """
+    return 3 * three_mode_mixture(scale=1.0).prob(np.atleast_2d(x))
 
 if __name__ == "__main__":
     # Import the trained DM
     diffusion_model = DiffusionModel()
-    diffusion_model.load_state_dict(torch.load('models/gmm_model.pth'))
-    # # Load the spiral training data
-    data = make_gaussian_mixture(num_samples=10000)
+    diffusion_model.load_state_dict(torch.load(os.path.join(MODELS_DIR, 'gmm_model.pth')))
     # Sample the score in linearly spaced intervals in the range of the training data
     # x = torch.linspace(-5.5, 5.5, 15)
     # y = torch.linspace(-5.5, 5.5, 15)
@@ -62,17 +56,11 @@ if __name__ == "__main__":
     # zz = np.flip(zz, axis=0)
     # ax[0].imshow(zz, cmap='viridis', extent=[-6, 6, -6, 6])
     # Plot a 2d histogram of the data samples
-    print(f"Data shape: {data.shape}")
-    data = data.detach().numpy()
     # ax[0].hist2d(data[:, 0], data[:, 1], bins=100, cmap='viridis')
     # Plot the pdf
     # x = np.linspace(-5.5, 5.5, 400)
     # y = np.linspace(-5.5, 5.5, 400)
-    # xx, yy = np.meshgrid(x, y)
-    # zz = np.zeros_like(xx)
-    # for i in tqdm(range(400)):
-    #     for j in range(400):
-    #         zz[i, j] = gaussian_mixture_pdf([xx[i, j], yy[i, j]])
+    # zz = 3 * three_mode_mixture(scale=1.0).prob_grid(x, y)
     # # Flip vertically 
     # zz = np.flip(zz, axis=0)
     # ax.imshow(zz, cmap='viridis', extent=[-5.5, 5.5, -5.5, 5.5])
@@ -95,56 +83,53 @@ if __name__ == "__main__":
     # ax.set_xticks([])
     # ax.set_yticks([])
     # Generate samples and intermediates
-    samples, intermediate_values = diffusion_model.sample(num_samples=500000, num_timesteps=1000)
-    intermediate_values = intermediate_values.detach().numpy()
+    # The noised marginals of the mixture are known in closed form, so the
+    # density can be rendered exactly without running the sampler
+    use_analytic_density = True
+    if use_analytic_density:
+        # Frame i shows the samples after reverse step i, i.e. at alphas_cumprod_prev[999 - i]
+        marginals = NoisedMixtureMarginals(three_mode_mixture(), diffusion_model.schedule.alphas_cumprod_prev.flip(0).numpy())
+        grid = np.linspace(-2.8, 2.8, 100)
+        log_density, _ = marginals.grid(grid, grid)
+        density = np.exp(log_density)
+    else:
+        # Sampling and binning only happen once per checkpoint, re-renders read
+        # the trajectories and density cube back from the artifact cache
+        _, trajectories = cached_sample(diffusion_model, 500000, every=1, seed=0)
+        # Bin at the 100x100 output resolution, 3 of the old 800 bins are 3/8 of an output bin
+        density, _ = cached_density_cube(
+            trajectories, 
+            bins=100, 
+            range=[[-2.8, 2.8], [-2.8, 2.8]], 
+            sigma=3 / 8
+        )
     # Animate the score function over time
     # fig, ax = plt.subplots(1, 1, figsize=(5, 5))
 
+    # Arrows on a fixed 7x7 grid, the heatmap and quiver are created once and updated in place
+    xy = grid_points((-2.8, 2.8), (-2.8, 2.8), 7)
+    # The predicted noise at every arrow for all 1000 timesteps, in batched forward passes
+    noise_field = diffusion_model.score_field(xy, cache_dir=DEFAULT_ROOT)
+    render = DensityQuiverFrame(
+        ax, 
+        extent=[-2.8, 2.8, -2.8, 2.8], 
+        positions=xy.numpy(), 
+        cmap='inferno', 
+        quiver_kwargs=dict(scale=200, headwidth=2, color='white', alpha=0.8, linewidth=1.7)
+    )
+    ax.set_xticks([])
+    ax.set_yticks([])
+
     def update(frame):
-        print(frame)
         frame = 999 - frame
         # Update the score
-        x = torch.linspace(-2.8, 2.8, 7)
-        y = torch.linspace(-2.8, 2.8, 7)
-        xx, yy = torch.meshgrid(x, y)   
-        xy = torch.stack([xx, yy], dim=-1).reshape(-1, 2)
-        time = torch.Tensor([frame]).long().repeat(xy.shape[0])
-        score = diffusion_model.predict_noise(xy, time) * 2
-        score = -1 * score * 5
-        xy = xy.detach().numpy()
-        score = score.detach().numpy()
-        # Clear the axis
-        ax.clear()
-        # Plot the pdf
-        # Flip vertically
+        score = -10 * noise_field[frame]
         # Make a heatmap of intermediate examples 
-        # Make hisotgram with numpy
-        hist2d, _, _ = np.histogram2d(intermediate_values[:, 999 - frame, 0], intermediate_values[:, 999 - frame, 1], bins=800, range=[[-2.8, 2.8], [-2.8, 2.8]])
-        # Apply a gaussian filter
-        hist2d = ndimage.gaussian_filter(hist2d, sigma=3)
-        # Average pool
-        hist2d = hist2d[::8, ::8]
-        # Transpose 
-        hist2d = hist2d.T
+        # Rows of the density frames are y, from the bottom up
+        hist2d = density[999 - frame]
         # Flip vertically
         hist2d = np.flip(hist2d, axis=0)
-        # Apply a gaussian filter
-        print(f"Shape of histogram: {hist2d.shape}")
-        ax.imshow(hist2d, cmap='inferno', extent=[-2.8, 2.8, -2.8, 2.8])
-        # ax.hist2d(intermediate_values[:, 999 - frame, 0], intermediate_values[:, 999 - frame, 1], bins=400, cmap='inferno')
-        # Seaborn kde plot
-        # sns.kdeplot(x=intermediate_values[:, 999 - frame, 0], y=intermediate_values[:, 999 - frame, 1], ax=ax, fill=True, levels=100, palette="inferno")
-        ax.set_xlim([-2.8, 2.8])
-        ax.set_ylim([-2.8, 2.8])
-        # Plot the score function
-        ax.quiver(xy[:, 0], xy[:, 1], score[:, 0], score[:, 1], scale=200, headwidth=2, color='white', alpha=0.8, linewidth=1.7)
-        # ax.set_title(f'Evaluating the Score Function at Time: {frame}')
-        ax.set_xticks([])
-        ax.set_yticks([])
-        return ax,  
-
-    # Create the animation
-    ani = FuncAnimation(fig, update, frames=range(1000), interval=20)
-    # Reverse the animation
+        return render.update(hist2d, score)
 
-    ani.save('score_over_time.mp4', writer='ffmpeg', dpi=500)
\ No newline at end of file
+    # Render the frames in parallel and encode them with ffmpeg
+    render_video(fig, update, frames=range(1000), path=os.path.join(PLOTS_DIR, 'score_over_time_gmm.mp4'), fps=50, dpi=500)
\ No newline at end of file
@@ -1,33 +1,18 @@
+import os
 import torch
-from train import make_spiral_data, DiffusionModel
+from .train import DiffusionModel
+from .distributions import make_spiral_data
 
 import matplotlib.pyplot as plt
 import numpy as np
-from tqdm import tqdm
+from .densities import spiral_mixture
+from . import MODELS_DIR, PLOTS_DIR
 
 
-def spiral_distribution_pdf(location, num_gaussians=1000, std=0.25):
-    """
-        This is the probability density function of the spiral distribution
-    """
-    # Add up a bunch of gaussians centered along points on a spiral
-    total_gaussian_pdf = 0.0
-    angles = np.linspace(0, 4 * np.pi, num_gaussians)
-    for i in range(num_gaussians):
-        # Compute the location of the gaussian
-        angle = angles[i]
-        x = 0.3 * angle * np.cos(angle)
-        y = 0.3 * angle * np.sin(angle)
-        # Compute the pdf
-        pdf = np.exp(-((location[0] - x) ** 2 + (location[1] - y) ** 2) / (2 * std ** 2))
-        total_gaussian_pdf += pdf
-        
-    return total_gaussian_pdf
-
 if __name__ == "__main__":
     # Import the trained DM
     diffusion_model = DiffusionModel()
-    diffusion_model.load_state_dict(torch.load('models/spiral_model.pth'))
+    diffusion_model.load_state_dict(torch.load(os.path.join(MODELS_DIR, 'spiral_model.pth')))
     # # Load the spiral training data
     spiral_data = make_spiral_data(num_examples=1000, std=0.0, rescale_factor=0.3)
     # Sample the score in linearly spaced intervals in the range of the training data
@@ -54,11 +39,7 @@ if __name__ == "__main__":
     # Plot a heatmap of the data likelihood
     x = np.linspace(-3.25, 3.9, 200)
     y = np.linspace(-3.75, 3.25, 200)
-    xx, yy = np.meshgrid(x, y)
-    zz = np.zeros_like(xx)
-    for i in tqdm(range(200)):
-        for j in range(200):
-            zz[i, j] = spiral_distribution_pdf([xx[i, j], yy[i, j]])
+    zz = spiral_mixture(std=0.25).prob_grid(x, y)
 
     # Flip vertically 
     zz = np.flip(zz, axis=0)
@@ -81,4 +62,4 @@ if __name__ == "__main__":
     ax[0].set_xticks([])
     ax[0].set_yticks([])
 
-    plt.savefig('plots/score_plot.png', dpi=300)
\ No newline at end of file
+    plt.savefig(os.path.join(PLOTS_DIR, 'score_plot.png'), dpi=300)
\ No newline at end of file
@@ -1,15 +1,17 @@
-from train import make_spiral_data, DiffusionModel
+import os
+from .train import make_spiral_data, DiffusionModel
 from matplotlib.animation import FuncAnimation
 import matplotlib.pyplot as plt
 import numpy as np
 import torch
 import seaborn as sns
 import pandas as pd
+from . import MODELS_DIR, PLOTS_DIR
 
 if __name__ == "__main__":
     # Load the diffusion model
     diffusion_model = DiffusionModel()
-    diffusion_model.load_state_dict(torch.load('models/model.pth'))
+    diffusion_model.load_state_dict(torch.load(os.path.join(MODELS_DIR, 'model.pth')))
     # Load the data
     spiral_data = make_spiral_data(num_examples=500, noise=0.5)
     # Show generation of samples from it using the trained diffusion model
@@ -70,4 +72,4 @@ if __name__ == "__main__":
     # Make the animation
     anim = FuncAnimation(plt.gcf(), animate, frames=num_samples * num_inference_steps // plot_every_n_steps, interval=20)
     # Save the animation
-    anim.save('plots/sample_animation.mp4', writer='ffmpeg', fps=30, dpi=500)
+    anim.save(os.path.join(PLOTS_DIR, 'sample_animation.mp4'), writer='ffmpeg', fps=30, dpi=500)
@@ -0,0 +1,178 @@
+"""
+    Closed-form noised marginals p_t(x) of the mixture datasets.
+
+    Under the forward process x_t = sqrt(a_t) x_0 + sqrt(1 - a_t) eps, with
+    a_t = alphas_cumprod[t], a Gaussian component N(mu, S) of the data
+    becomes N(sqrt(a_t) mu, a_t S + (1 - a_t) I). The marginal at every
+    timestep is therefore again a mixture, and its density and score can be
+    evaluated exactly, for all timesteps at once.
+"""
+import numpy as np
+
+from .densities import GaussianMixture, logsumexp, max_chunk_elements
+
+class NoisedMixtureMarginals():
+    """
+        Exact p_t(x) and grad log p_t(x) of a `GaussianMixture` pushed
+        through the forward process.
+
+        Args:
+            mixture: the clean data distribution
+            alphas_cumprod: (T,) cumulative alphas, one per timestep. Use
+                the model's `alphas_cumprod_prev` to also get the clean data
+                (a = 1) at index 0.
+    """
+
+    def __init__(self, mixture, alphas_cumprod):
+        self.mixture = mixture
+        self.alphas_cumprod = np.asarray(alphas_cumprod, dtype=np.float64)
+        dim = mixture.means.shape[1]
+        alphas = self.alphas_cumprod[:, None]
+        # Scaled means, (T, K, D)
+        self.scales = np.sqrt(self.alphas_cumprod)
+        self.means = self.scales[:, None, None] * mixture.means[None]
+        if mixture.isotropic:
+            # Widened variances, (T, K)
+            self.variances = alphas * mixture.variances[None] + (1 - alphas)
+            log_det = dim * np.log(self.variances)
+        else:
+            # Widened covariances, (T, K, D, D)
+            covariances = alphas[:, :, None, None] * mixture.covariances[None] + (1 - alphas)[:, :, None, None] * np.eye(dim)
+            self.precisions = np.linalg.inv(covariances)
+            log_det = np.linalg.slogdet(covariances)[1]
+        self.log_constants = np.log(mixture.weights)[None] - 0.5 * (dim * np.log(2 * np.pi) + log_det)
+
+    def at(self, t):
+        """
+            The marginal at a single timestep index as a `GaussianMixture`
+        """
+        if self.mixture.isotropic:
+            covariances = self.variances[t]
+        else:
+            covariances = np.linalg.inv(self.precisions[t])
+        return GaussianMixture(self.means[t], covariances, self.mixture.weights)
+
+    def _component_terms(self, x, timesteps):
+        """
+            Per-component log densities (T, N, K) and score directions
+        """
+        means = self.means[timesteps]
+        if self.mixture.isotropic:
+            variances = self.variances[timesteps][:, None, :]
+            # |x - s_t mu|^2 = |x|^2 - 2 s_t x.mu + s_t^2 |mu|^2
+            squared_distances = (
+                np.sum(x ** 2, axis=1)[None, :, None]
+                - 2 * self.scales[timesteps][:, None, None] * (x @ self.mixture.means.T)[None]
+                + np.sum(means ** 2, axis=2)[:, None, :]
+            )
+            log_probs = self.log_constants[timesteps][:, None, :] - 0.5 * np.maximum(squared_distances, 0.0) / variances
+            return log_probs, None
+        differences = x[None, :, None, :] - means[:, None, :, :]
+        # -P (x - mu) summed explicitly over the (tiny) data dimension
+        precisions = self.precisions[timesteps][:, None]
+        directions = -sum(precisions[..., e] * differences[..., e:e + 1] for e in range(differences.shape[-1]))
+        log_probs = self.log_constants[timesteps][:, None, :] + 0.5 * np.sum(differences * directions, axis=-1)
+        return log_probs, directions
+
+    def log_prob_and_score(self, x, timesteps=None):
+        """
+            Log density (T, N) and score (T, N, D) of every point at every
+            requested timestep index (all of them by default)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if timesteps is None:
+            timesteps = np.arange(len(self.alphas_cumprod))
+        timesteps = np.atleast_1d(timesteps)
+        num_points, dim = x.shape
+        num_components = len(self.mixture.weights)
+        log_prob = np.empty((len(timesteps), num_points))
+        score = np.empty((len(timesteps), num_points, dim))
+        # Chunk over points, then over timesteps, to bound the intermediates
+        point_chunk = max(1, min(num_points, max_chunk_elements // (num_components * dim)))
+        time_chunk = max(1, max_chunk_elements // (num_components * dim * point_chunk))
+        for point_start in range(0, num_points, point_chunk):
+            points = x[point_start:point_start + point_chunk]
+            point_slice = slice(point_start, point_start + len(points))
+            for time_start in range(0, len(timesteps), time_chunk):
+                chunk_timesteps = timesteps[time_start:time_start + time_chunk]
+                time_slice = slice(time_start, time_start + len(chunk_timesteps))
+                log_probs, directions = self._component_terms(points, chunk_timesteps)
+                chunk_log_prob = logsumexp(log_probs, axis=2)
+                responsibilities = np.exp(log_probs - chunk_log_prob[..., None])
+                if self.mixture.isotropic:
+                    scaled = responsibilities / self.variances[chunk_timesteps][:, None, :]
+                    chunk_score = (
+                        np.einsum('tnk,tkd->tnd', scaled, self.means[chunk_timesteps])
+                        - np.sum(scaled, axis=2)[..., None] * points[None]
+                    )
+                else:
+                    chunk_score = np.sum(responsibilities[..., None] * directions, axis=2)
+                log_prob[time_slice, point_slice] = chunk_log_prob
+                score[time_slice, point_slice] = chunk_score
+        return log_prob, score
+
+    def log_prob(self, x, timesteps=None):
+        return self.log_prob_and_score(x, timesteps)[0]
+
+    def score(self, x, timesteps=None):
+        return self.log_prob_and_score(x, timesteps)[1]
+
+    def grid(self, x_values, y_values, timesteps=None):
+        """
+            Log density (T, H, W) and score (T, H, W, 2) on the meshgrid of
+            `x_values` and `y_values`, laid out like `np.meshgrid`.
+
+            For isotropic 2D mixtures every component factors over the two
+            axes (see `GaussianMixture.log_prob_grid`), so the density and
+            both score numerators are batched (H, K) x (K, W) matrix
+            products per timestep.
+        """
+        x_values = np.asarray(x_values, dtype=np.float64)
+        y_values = np.asarray(y_values, dtype=np.float64)
+        xx, yy = np.meshgrid(x_values, y_values)
+        points = np.stack([xx.ravel(), yy.ravel()], axis=-1)
+        if not self.mixture.isotropic or self.mixture.means.shape[1] != 2:
+            log_prob, score = self.log_prob_and_score(points, timesteps)
+            return log_prob.reshape(-1, *xx.shape), score.reshape(-1, *xx.shape, 2)
+        if timesteps is None:
+            timesteps = np.arange(len(self.alphas_cumprod))
+        timesteps = np.atleast_1d(timesteps)
+        num_components = len(self.mixture.weights)
+        log_prob = np.empty((len(timesteps),) + xx.shape)
+        score = np.empty((len(timesteps),) + xx.shape + (2,))
+        time_chunk = max(1, max_chunk_elements // max(num_components * (len(x_values) + len(y_values)), xx.size))
+        for time_start in range(0, len(timesteps), time_chunk):
+            chunk_timesteps = timesteps[time_start:time_start + time_chunk]
+            time_slice = slice(time_start, time_start + len(chunk_timesteps))
+            means = self.means[chunk_timesteps]
+            variances = self.variances[chunk_timesteps]
+            # Per-axis log factors (T, K, W) and (T, K, H), shifted to peak at one
+            log_factors_x = -0.5 * (x_values[None, None, :] - means[..., :1]) ** 2 / variances[..., None]
+            log_factors_y = -0.5 * (y_values[None, None, :] - means[..., 1:]) ** 2 / variances[..., None]
+            log_factors_y = log_factors_y + self.log_constants[chunk_timesteps][..., None]
+            shift_x = log_factors_x.max(axis=1)
+            shift_y = log_factors_y.max(axis=1)
+            factors_x = np.exp(log_factors_x - shift_x[:, None, :])
+            factors_y = np.exp(log_factors_y - shift_y[:, None, :]).transpose(0, 2, 1)
+            # Sums over components of f_k, f_k / v_k and f_k * m_k / v_k
+            density = factors_y @ factors_x
+            precision = (factors_y / variances[:, None, :]) @ factors_x
+            weighted_x = (factors_y * (means[..., 0] / variances)[:, None, :]) @ factors_x
+            weighted_y = (factors_y * (means[..., 1] / variances)[:, None, :]) @ factors_x
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_prob[time_slice] = np.log(density) + shift_y[:, :, None] + shift_x[:, None, :]
+                score[time_slice, ..., 0] = (weighted_x - precision * xx) / density
+                score[time_slice, ..., 1] = (weighted_y - precision * yy) / density
+            # Redo any points where the products underflowed with the exact path
+            for i, j, k in zip(*np.nonzero(density < 1e-250)):
+                exact_log_prob, exact_score = self.log_prob_and_score(points[[j * xx.shape[1] + k]], chunk_timesteps[[i]])
+                log_prob[time_start + i, j, k] = exact_log_prob[0, 0]
+                score[time_start + i, j, k] = exact_score[0, 0]
+        return log_prob, score
+
+def noise_from_score(score, alpha_cumprod):
+    """
+        The noise prediction a perfect network would make, eps = -sigma_t * score,
+        for comparing against `predict_noise`
+    """
+    return -np.sqrt(1 - np.asarray(alpha_cumprod))[..., None, None] * score
@@ -0,0 +1,32 @@
+"""
+    Simple sample-quality metrics for comparing 2D sample sets.
+"""
+import torch
+
+def sliced_wasserstein(samples, reference, num_projections=256, seed=0):
+    """
+        Sliced 1-Wasserstein distance between two point clouds, averaged
+        over random projection directions
+    """
+    samples = torch.as_tensor(samples, dtype=torch.float32)
+    reference = torch.as_tensor(reference, dtype=torch.float32)
+    generator = torch.Generator().manual_seed(seed)
+    directions = torch.randn(samples.shape[1], num_projections, generator=generator)
+    directions = directions / directions.norm(dim=0, keepdim=True)
+    # Compare the sorted projections at matching quantiles
+    quantiles = torch.linspace(0, 1, min(len(samples), len(reference)))
+    projected_samples = torch.quantile(samples @ directions, quantiles, dim=0)
+    projected_reference = torch.quantile(reference @ directions, quantiles, dim=0)
+    return (projected_samples - projected_reference).abs().mean().item()
+
+def mmd(samples, reference, bandwidth=0.5):
+    """
+        Squared maximum mean discrepancy with an RBF kernel
+    """
+    samples = torch.as_tensor(samples, dtype=torch.float32)
+    reference = torch.as_tensor(reference, dtype=torch.float32)
+
+    def kernel(a, b):
+        return torch.exp(-torch.cdist(a, b) ** 2 / (2 * bandwidth ** 2)).mean()
+
+    return (kernel(samples, samples) + kernel(reference, reference) - 2 * kernel(samples, reference)).item()
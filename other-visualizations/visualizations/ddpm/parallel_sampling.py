@@ -0,0 +1,216 @@
+"""
+    Chunked, multi-process front-end for the DDPM sampler.
+
+    A large request is split into fixed-size chunks, each seeded from
+    (seed, chunk index) alone, so the output does not depend on how many
+    workers the chunks were spread across.
+
+    `cached_sample` puts the results in the artifact cache, so a video is
+    only sampled once per checkpoint, sampler, step count, sample count
+    and seed.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import torch
+
+from .sampling import DDPMSampler, DDIMSampler
+from .trajectory import TrajectoryRecorder, MemmapTrajectoryRecorder, NullRecorder
+from .artifact_cache import ArtifactCache, model_hash
+
+# Sampler owned by each worker process
+_worker_sampler = None
+
+def _init_worker(model):
+    global _worker_sampler
+    # One intra-op thread per process, the pool provides the parallelism
+    torch.set_num_threads(1)
+    _worker_sampler = DDPMSampler(model)
+
+def chunk_seed(seed, chunk_index):
+    """
+        Deterministic seed for a single chunk
+    """
+    return int(np.random.SeedSequence([seed, chunk_index]).generate_state(1)[0])
+
+def _sample_chunk(task):
+    start, stop, seed, steps, output_dir = task
+    generator = torch.Generator().manual_seed(seed)
+    recorder = TrajectoryRecorder(steps=steps) if steps else None
+    samples, trajectories = _worker_sampler.sample(stop - start, recorder=recorder, generator=generator)
+    samples = samples.numpy()
+    trajectories = trajectories.numpy() if trajectories is not None else None
+    if output_dir is None:
+        return start, stop, samples, trajectories
+    # Write the chunk straight into the shared on-disk arrays
+    stored_samples = np.load(os.path.join(output_dir, 'samples.npy'), mmap_mode='r+')
+    stored_samples[start:stop] = samples
+    stored_samples.flush()
+    if trajectories is not None:
+        stored_trajectories = np.load(os.path.join(output_dir, 'trajectories.npy'), mmap_mode='r+')
+        stored_trajectories[:, start:stop] = trajectories
+        stored_trajectories.flush()
+    return start, stop, None, None
+
+def parallel_sample(
+        model,
+        num_samples,
+        chunk_size=50000,
+        num_workers=None,
+        seed=0,
+        every=None,
+        steps=None,
+        output_dir=None,
+        dtype=np.float32,
+    ):
+    """
+        Draws `num_samples` samples in memory-bounded chunks spread over a
+        process pool.
+
+        Args:
+            model: a `DiffusionModel` or `DDPMDiffusionModel`
+            chunk_size: number of samples drawn by one worker at a time
+            num_workers: number of processes (defaults to all CPU cores)
+            seed: base seed, each chunk derives its own from it
+            every / steps: which reverse steps of the trajectories to keep
+                (nothing is kept when both are None)
+            output_dir: if given, results are written to `samples.npy` and
+                `trajectories.npy` memmaps in this directory
+            dtype: storage type of the on-disk arrays (e.g. np.float16)
+
+        Returns:
+            The (num_samples, data_dim) samples and the frame-major
+            (num_steps, num_samples, data_dim) trajectories (or None).
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    data_dim = model.score_network.data_dim
+    # Resolve the recorded steps up front so every chunk keeps the same ones
+    if steps is None and every is not None:
+        steps = range(0, model.total_timesteps, every)
+    steps = list(steps) if steps is not None else []
+    # Allocate the merged output
+    if output_dir is None:
+        samples = np.empty((num_samples, data_dim), dtype=np.float32)
+        trajectories = np.empty((len(steps), num_samples, data_dim), dtype=np.float32) if steps else None
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        samples = np.lib.format.open_memmap(
+            os.path.join(output_dir, 'samples.npy'), mode='w+', dtype=dtype, shape=(num_samples, data_dim)
+        )
+        trajectories = None
+        if steps:
+            trajectories = np.lib.format.open_memmap(
+                os.path.join(output_dir, 'trajectories.npy'), mode='w+', dtype=dtype,
+                shape=(len(steps), num_samples, data_dim)
+            )
+    # Split the request into chunks
+    tasks = []
+    for chunk_index, start in enumerate(range(0, num_samples, chunk_size)):
+        stop = min(start + chunk_size, num_samples)
+        tasks.append((start, stop, chunk_seed(seed, chunk_index), steps, output_dir))
+
+    def merge(results):
+        for start, stop, chunk_samples, chunk_trajectories in results:
+            if chunk_samples is None:
+                continue
+            samples[start:stop] = chunk_samples
+            if chunk_trajectories is not None:
+                trajectories[:, start:stop] = chunk_trajectories
+
+    if num_workers <= 1:
+        # Run in this process, without the pool
+        num_threads = torch.get_num_threads()
+        _init_worker(model)
+        torch.set_num_threads(num_threads)
+        merge(map(_sample_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(num_workers, initializer=_init_worker, initargs=(model,)) as executor:
+            merge(executor.map(_sample_chunk, tasks))
+
+    if output_dir is not None:
+        # Reopen read-only to pick up what the workers wrote
+        samples = np.load(os.path.join(output_dir, 'samples.npy'), mmap_mode='r')
+        if steps:
+            trajectories = np.load(os.path.join(output_dir, 'trajectories.npy'), mmap_mode='r')
+
+    return samples, trajectories
+
+def cached_sample(
+        model,
+        num_samples,
+        sampler='ddpm',
+        num_steps=None,
+        eta=None,
+        seed=0,
+        every=None,
+        steps=None,
+        dtype=np.float32,
+        chunk_size=50000,
+        num_workers=None,
+        cache=None,
+    ):
+    """
+        Samples like `parallel_sample`, through the artifact cache.
+
+        Args:
+            sampler: `ddpm` (every training timestep, over the process
+                pool) or `ddim` (`num_steps` strided timesteps)
+            num_steps: number of DDIM steps (ignored for `ddpm`)
+            eta: DDIM noise scale (the model's `eta` attribute, or 0, when
+                None; ignored for `ddpm`)
+            every / steps: which reverse steps of the trajectories to keep
+            dtype: storage type of the cached arrays
+            cache: an `ArtifactCache` (the default one when None)
+
+        Returns:
+            The samples and the frame-major trajectories (or None) as
+            read-only memmaps
+    """
+    cache = cache if cache is not None else ArtifactCache()
+    if sampler == 'ddpm':
+        num_steps = model.total_timesteps
+    elif sampler != 'ddim':
+        raise ValueError(f"Unknown sampler: {sampler}")
+    if steps is None and every is not None:
+        steps = range(0, num_steps, every)
+    steps = list(steps) if steps is not None else []
+    fields = dict(
+        checkpoint=model_hash(model),
+        sampler=sampler,
+        num_steps=num_steps,
+        num_samples=num_samples,
+        seed=seed,
+        steps=steps,
+        dtype=dtype,
+    )
+    if sampler == 'ddpm':
+        # The chunk seeds depend on the chunk boundaries
+        fields['chunk_size'] = chunk_size
+    else:
+        # Models with the same weights sample differently for each eta
+        eta = float(eta if eta is not None else getattr(model, 'eta', 0.0))
+        fields['eta'] = eta
+
+    def build(directory):
+        if sampler == 'ddpm':
+            parallel_sample(
+                model, num_samples, chunk_size=chunk_size, num_workers=num_workers,
+                seed=seed, steps=steps, output_dir=directory, dtype=dtype
+            )
+            return
+        ddim_sampler = DDIMSampler(model, num_inference_timesteps=num_steps, eta=eta)
+        if steps:
+            recorder = MemmapTrajectoryRecorder(os.path.join(directory, 'trajectories.npy'), steps=steps, dtype=dtype)
+        else:
+            recorder = NullRecorder()
+        generator = torch.Generator().manual_seed(seed)
+        samples, _ = ddim_sampler.sample(num_samples, recorder=recorder, generator=generator)
+        np.save(os.path.join(directory, 'samples.npy'), samples.numpy().astype(dtype))
+
+    directory = cache.get_or_create('samples', fields, build)
+    samples = np.load(os.path.join(directory, 'samples.npy'), mmap_mode='r')
+    trajectories = None
+    if steps:
+        trajectories = np.load(os.path.join(directory, 'trajectories.npy'), mmap_mode='r')
+    return samples, trajectories
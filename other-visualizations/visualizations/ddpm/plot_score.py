@@ -1,12 +1,14 @@
+import os
 import torch
-from train import make_spiral_data, DiffusionModel
+from .train import make_spiral_data, DiffusionModel
 
 import matplotlib.pyplot as plt
+from . import MODELS_DIR, PLOTS_DIR
 
 if __name__ == "__main__":
     # Import the trained DM
     diffusion_model = DiffusionModel()
-    diffusion_model.load_state_dict(torch.load('models/model.pth'))
+    diffusion_model.load_state_dict(torch.load(os.path.join(MODELS_DIR, 'model.pth')))
     # Load the spiral training data
     spiral_data = make_spiral_data(num_examples=1000, noise=0.0)
     # Sample the score in linearly spaced intervals in the range of the trianing data
@@ -32,4 +34,4 @@ if __name__ == "__main__":
     ax[1].set_xticks([])
     ax[1].set_yticks([])
 
-    plt.savefig('plots/score_plot.png', dpi=300)
\ No newline at end of file
+    plt.savefig(os.path.join(PLOTS_DIR, 'score_plot.png'), dpi=300)
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+    Fast reverse-process samplers for the 2D diffusion models.
+
+    All of the schedule math for the reverse chain is folded into per-step
+    coefficient tables once, so the inner loop is just a network call and a
+    couple of in-place multiply-adds on preallocated buffers.
+"""
+import torch
+
+class StepSampler():
+    """
+        Base class for samplers whose update can be written as
+
+            x_prev = x_coef * x_t - eps_coef * eps + std * z
+
+        Subclasses fill in the visited `timesteps` and the matching
+        coefficient tables, the loop itself is shared.
+    """
+
+    def __init__(self, model, compile=False):
+        self.model = model
+        self.total_timesteps = model.total_timesteps
+        self.data_dim = model.score_network.data_dim
+        timesteps, x_coef, eps_coef, std = self._coefficient_tables(model)
+        self.timesteps = timesteps.tolist()
+        # Plain python floats are the cheapest scalars to broadcast in the loop
+        self.x_coefs = x_coef.tolist()
+        self.eps_coefs = eps_coef.tolist()
+        self.stds = std.tolist()
+        # Optionally compile the network call
+        self.predict_noise = model.predict_noise
+        self.compile = compile
+        if compile:
+            self.predict_noise = torch.compile(model.predict_noise)
+
+    @property
+    def num_function_evaluations(self):
+        return len(self.timesteps)
+
+    def _coefficient_tables(self, model):
+        raise NotImplementedError()
+
+    @torch.no_grad()
+    def sample(self, num_samples=1000, recorder=None, generator=None, device='cpu'):
+        """
+            Runs the full reverse chain for a batch of samples.
+
+            Args:
+                recorder: optional `TrajectoryRecorder` that each step is
+                    streamed into
+
+            Returns:
+                The final samples of shape (num_samples, data_dim) and the
+                recorder's result (None when no recorder is given).
+        """
+        sample = torch.randn(num_samples, self.data_dim, generator=generator, device=device)
+        # Preallocate the buffers reused on every step
+        time_buffer = torch.empty(num_samples, dtype=torch.long, device=device)
+        noise = torch.empty_like(sample)
+        if recorder is not None:
+            recorder.start(num_samples, len(self.timesteps), self.data_dim)
+
+        for i, t in enumerate(self.timesteps):
+            # The whole batch shares the timestep, which the networks broadcast
+            # from an int (a compiled call would specialize on it, so gets a tensor)
+            time = time_buffer.fill_(t) if self.compile else t
+            residual = self.predict_noise(sample, time)
+            # x_prev = x_coef * x_t - eps_coef * eps + std * z
+            sample.mul_(self.x_coefs[i]).sub_(residual, alpha=self.eps_coefs[i])
+            if self.stds[i] > 0:
+                noise.normal_(generator=generator)
+                sample.add_(noise, alpha=self.stds[i])
+            if recorder is not None:
+                recorder.record(i, sample)
+
+        if recorder is None:
+            return sample, None
+        return sample, recorder.finish()
+
+class DDPMSampler(StepSampler):
+    """
+        Ancestral DDPM sampler with precomputed per-step coefficients.
+
+        Works with any model exposing a `NoiseSchedule` as `model.schedule`
+        and `predict_noise`, i.e. `DiffusionModel` and `DDPMDiffusionModel`.
+    """
+
+    def _coefficient_tables(self, model):
+        # Every timestep of the reverse chain, in order
+        timesteps = torch.arange(self.total_timesteps - 1, -1, -1)
+        schedule = model.schedule
+        # Fold the x_0 reconstruction into the posterior mean
+        coef1 = schedule.posterior_mean_coef1[timesteps]
+        coef2 = schedule.posterior_mean_coef2[timesteps]
+        x_coef = coef1 * schedule.sqrt_inv_alphas_cumprod[timesteps] + coef2
+        eps_coef = coef1 * schedule.sqrt_inv_alphas_cumprod_minus_one[timesteps]
+        # Posterior standard deviation, with no noise added on the last step
+        std = schedule.posterior_variance[timesteps] ** 0.5
+        std[timesteps == 0] = 0.0
+        return timesteps, x_coef, eps_coef, std
+
+class DDIMSampler(StepSampler):
+    """
+        DDIM sampler that only visits a strided subsequence of the
+        training timesteps.
+
+        Args:
+            num_inference_timesteps: number of network evaluations
+            eta: 0 gives the deterministic DDIM update, 1 the DDPM-like
+                stochastic one
+    """
+
+    def __init__(self, model, num_inference_timesteps=50, eta=0.0, compile=False):
+        self.num_inference_timesteps = num_inference_timesteps
+        self.eta = eta
+        super(DDIMSampler, self).__init__(model, compile=compile)
+
+    def _coefficient_tables(self, model):
+        # Evenly strided timesteps, from noisiest to cleanest
+        step_ratio = self.total_timesteps // self.num_inference_timesteps
+        timesteps = (torch.arange(self.num_inference_timesteps) * step_ratio).flip(0)
+        # Cumulative alphas at each visited step and the one it jumps to
+        alphas_cumprod = model.schedule.alphas_cumprod.double()
+        alpha_prod_t = alphas_cumprod[timesteps]
+        alpha_prod_t_prev = torch.ones_like(alpha_prod_t)
+        alpha_prod_t_prev[:-1] = alphas_cumprod[timesteps[1:]]
+        beta_prod_t = 1 - alpha_prod_t
+        # sigma_t from the DDIM paper (eq. 16), scaled by eta
+        variance = (1 - alpha_prod_t_prev) / beta_prod_t * (1 - alpha_prod_t / alpha_prod_t_prev)
+        std = self.eta * variance.clip(0) ** 0.5
+        # x_prev = sqrt(a_prev) * x_0 + sqrt(1 - a_prev - std^2) * eps + std * z
+        # with x_0 = (x_t - sqrt(1 - a_t) * eps) / sqrt(a_t)
+        x_coef = (alpha_prod_t_prev / alpha_prod_t) ** 0.5
+        direction_coef = (1 - alpha_prod_t_prev - std ** 2).clip(0) ** 0.5
+        eps_coef = x_coef * beta_prod_t ** 0.5 - direction_coef
+        return timesteps, x_coef, eps_coef, std
@@ -0,0 +1,161 @@
+"""
+    Noise schedules of the forward process and the tables derived from them.
+
+    A schedule is a (T,) array of betas. The linear one is the DDPM default,
+    the cosine one is from "Improved Denoising Diffusion Probabilistic
+    Models" and the sigmoid one from "On the Importance of Noise Scheduling
+    for Diffusion Models". Any other betas can be passed in directly.
+
+    `NoiseSchedule` computes every quantity the models, samplers and
+    solvers read (cumulative alphas, posterior coefficients, log-SNR, ...)
+    once in float64 and keeps them as float32 buffers, so they move with
+    `.to(device)` and are saved with the model's state dict.
+"""
+import numpy as np
+import torch
+import torch.nn as nn
+
+def linear_betas(num_timesteps=1000, beta_start=0.0001, beta_end=0.02):
+    return np.linspace(beta_start, beta_end, num_timesteps, dtype=np.float64)
+
+def cosine_gamma(t, start=0.0, end=1.0, tau=1.0, clip_min=1e-9):
+    """
+        Continuous-time cumulative alpha of the cosine schedule, for t in
+        [0, 1]
+    """
+    t = np.asarray(t, dtype=np.float64)
+    v_start = np.cos(start * np.pi / 2) ** (2 * tau)
+    v_end = np.cos(end * np.pi / 2) ** (2 * tau)
+    output = np.cos((t * (end - start) + start) * np.pi / 2) ** (2 * tau)
+    output = (v_end - output) / (v_end - v_start)
+    return np.clip(output, clip_min, 1.0)
+
+def sigmoid_gamma(t, start=-3.0, end=3.0, tau=1.0, clip_min=1e-9):
+    """
+        Continuous-time cumulative alpha of the sigmoid schedule, for t in
+        [0, 1]
+    """
+    def sigmoid(x):
+        return 1 / (1 + np.exp(-x))
+    t = np.asarray(t, dtype=np.float64)
+    v_start = sigmoid(start / tau)
+    v_end = sigmoid(end / tau)
+    output = sigmoid((t * (end - start) + start) / tau)
+    output = (v_end - output) / (v_end - v_start)
+    return np.clip(output, clip_min, 1.0)
+
+def betas_from_gamma(gamma, num_timesteps=1000, max_beta=0.999):
+    """
+        Discretizes a continuous cumulative alpha into T betas
+    """
+    alphas_cumprod = gamma(np.linspace(0, 1, num_timesteps + 1))
+    return np.clip(1 - alphas_cumprod[1:] / alphas_cumprod[:-1], 0, max_beta)
+
+def cosine_betas(num_timesteps=1000, s=0.008, max_beta=0.999):
+    # The offset s keeps the first betas from being vanishingly small
+    return betas_from_gamma(lambda t: cosine_gamma(t, start=s / (1 + s)), num_timesteps, max_beta)
+
+def sigmoid_betas(num_timesteps=1000, start=-3.0, end=3.0, tau=1.0, max_beta=0.999):
+    return betas_from_gamma(lambda t: sigmoid_gamma(t, start, end, tau), num_timesteps, max_beta)
+
+SCHEDULES = {
+    'linear': linear_betas,
+    'cosine': cosine_betas,
+    'sigmoid': sigmoid_betas,
+}
+
+def make_betas(schedule='linear', num_timesteps=1000, **kwargs):
+    """
+        Betas of a named schedule, or the given betas when `schedule` is
+        already an array
+    """
+    if isinstance(schedule, str):
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown noise schedule: {schedule}")
+        return SCHEDULES[schedule](num_timesteps, **kwargs)
+    betas = np.asarray(schedule, dtype=np.float64)
+    if betas.ndim != 1 or np.any(betas <= 0) or np.any(betas >= 1):
+        raise ValueError("Custom betas must be a 1D array of values in (0, 1)")
+    return betas
+
+class NoiseSchedule(nn.Module):
+    """
+        Precomputed tables of a noise schedule, indexed by timestep
+
+            alphas_cumprod[t] = prod(1 - betas[:t + 1])
+            lambdas[t] = log(sqrt(alphas_cumprod[t]) / sqrt(1 - alphas_cumprod[t]))
+
+        Args:
+            schedule: 'linear', 'cosine', 'sigmoid' or a (T,) array of betas
+            num_timesteps: T of the named schedules
+            **kwargs: parameters of the named schedule, e.g. beta_start
+    """
+
+    def __init__(self, schedule='linear', num_timesteps=1000, **kwargs):
+        super(NoiseSchedule, self).__init__()
+        betas = torch.as_tensor(make_betas(schedule, num_timesteps, **kwargs), dtype=torch.float64)
+        alphas = 1 - betas
+        alphas_cumprod = torch.cumprod(alphas, dim=0)
+        alphas_cumprod_prev = torch.cat([torch.ones(1, dtype=torch.float64), alphas_cumprod[:-1]])
+        tables = {
+            'betas': betas,
+            'alphas': alphas,
+            'alphas_cumprod': alphas_cumprod,
+            'alphas_cumprod_prev': alphas_cumprod_prev,
+            # required for add_noise
+            'sqrt_alphas_cumprod': alphas_cumprod ** 0.5,
+            'sqrt_one_minus_alphas_cumprod': (1 - alphas_cumprod) ** 0.5,
+            # required for reconstructing x_0
+            'sqrt_inv_alphas_cumprod': torch.sqrt(1 / alphas_cumprod),
+            'sqrt_inv_alphas_cumprod_minus_one': torch.sqrt(1 / alphas_cumprod - 1),
+            # required for the posterior q(x_{t-1} | x_t, x_0)
+            'posterior_mean_coef1': betas * torch.sqrt(alphas_cumprod_prev) / (1 - alphas_cumprod),
+            'posterior_mean_coef2': (1 - alphas_cumprod_prev) * torch.sqrt(alphas) / (1 - alphas_cumprod),
+            'posterior_variance': (betas * (1 - alphas_cumprod_prev) / (1 - alphas_cumprod)).clip(1e-20),
+            # Half the log signal-to-noise ratio, used by the solvers
+            'lambdas': 0.5 * torch.log(alphas_cumprod / (1 - alphas_cumprod)),
+        }
+        for name, table in tables.items():
+            self.register_buffer(name, table.float())
+
+    def __len__(self):
+        return len(self.betas)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Checkpoints saved before the schedule was part of the state dict
+        # only hold the network, so they keep the tables built here
+        for name, buffer in self._buffers.items():
+            state_dict.setdefault(prefix + name, buffer)
+        super(NoiseSchedule, self)._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def add_noise(self, x_start, x_noise, timesteps):
+        """
+            Samples q(x_t | x_0) with the given noise
+        """
+        s1 = self.sqrt_alphas_cumprod[timesteps].reshape(-1, 1)
+        s2 = self.sqrt_one_minus_alphas_cumprod[timesteps].reshape(-1, 1)
+        return s1 * x_start + s2 * x_noise
+
+    def interpolate(self, name, timesteps):
+        """
+            Table `name` at fractional timesteps in [0, T - 1], linearly
+            interpolated between the neighbouring integer timesteps
+        """
+        table = getattr(self, name)
+        timesteps = torch.as_tensor(timesteps, dtype=table.dtype, device=table.device)
+        timesteps = timesteps.clamp(0, len(table) - 1)
+        lower = timesteps.floor().long()
+        upper = (lower + 1).clamp(max=len(table) - 1)
+        weight = timesteps - lower
+        return torch.lerp(table[lower], table[upper], weight)
+
+    def at(self, t, name='alphas_cumprod'):
+        """
+            Table `name` at continuous times t in [0, 1], t = 1 being the
+            last timestep. Cumulative alphas are interpolated in log-SNR,
+            where the schedules are smooth.
+        """
+        timesteps = torch.as_tensor(t) * (len(self) - 1)
+        if name == 'alphas_cumprod':
+            return torch.sigmoid(2 * self.interpolate('lambdas', timesteps))
+        return self.interpolate(name, timesteps)
@@ -0,0 +1,84 @@
+"""
+    Batched evaluation of a model's noise prediction (or score) on a fixed
+    set of points for many timesteps at once.
+
+    The (T x G) pairs of timesteps and points are flattened and pushed
+    through the network in fixed-size chunks, instead of one small forward
+    pass per frame. Results can be kept in the artifact cache, keyed by a
+    hash of the model weights, the precision of the fused network (if any),
+    the points, the timesteps and the output kind.
+"""
+import os
+import numpy as np
+import torch
+
+from .artifact_cache import ArtifactCache, model_hash
+
+def grid_points(x_range, y_range, resolution):
+    """
+        (resolution * resolution, 2) points of `torch.meshgrid(x, y)` with
+        the default 'ij' indexing, flattened like the videos do
+    """
+    x = torch.linspace(x_range[0], x_range[1], resolution)
+    y = torch.linspace(y_range[0], y_range[1], resolution)
+    xx, yy = torch.meshgrid(x, y, indexing='ij')
+    return torch.stack([xx, yy], dim=-1).reshape(-1, 2)
+
+@torch.no_grad()
+def evaluate_score_field(model, points, timesteps=None, kind='noise', chunk_size=2 ** 16):
+    """
+        Evaluates the model at every point for every timestep.
+
+        Args:
+            model: a diffusion model with `predict_noise(x, t)`
+            points: (G, 2) evaluation points
+            timesteps: integer timesteps (all of them by default)
+            kind: `noise` for the raw prediction eps, or `score` for
+                -eps / sqrt(1 - alphas_cumprod[t])
+            chunk_size: number of (timestep, point) pairs per forward pass
+
+        Returns:
+            A (T, G, 2) float32 array
+    """
+    points = torch.as_tensor(points, dtype=torch.float32)
+    if timesteps is None:
+        timesteps = range(model.total_timesteps)
+    timesteps = torch.as_tensor(list(timesteps), dtype=torch.long)
+    num_points = len(points)
+    output = np.empty((len(timesteps), num_points, points.shape[1]), dtype=np.float32)
+    flat_output = output.reshape(-1, points.shape[1])
+    # Pair index i is timestep i // G at point i % G
+    total = len(timesteps) * num_points
+    for start in range(0, total, chunk_size):
+        pairs = torch.arange(start, min(start + chunk_size, total))
+        time = timesteps[pairs // num_points]
+        eps = model.predict_noise(points[pairs % num_points], time)
+        if kind == 'score':
+            eps = -eps / model.schedule.sqrt_one_minus_alphas_cumprod[time][:, None]
+        elif kind != 'noise':
+            raise ValueError(f"Unknown score field kind: {kind}")
+        flat_output[start:start + len(pairs)] = eps.numpy()
+    return output
+
+def score_field(model, points, timesteps=None, kind='noise', chunk_size=2 ** 16, cache_dir=None):
+    """
+        `evaluate_score_field`, read from or written to the artifact cache
+        in `cache_dir` when one is given
+    """
+    if cache_dir is None:
+        return evaluate_score_field(model, points, timesteps, kind=kind, chunk_size=chunk_size)
+    points = np.ascontiguousarray(np.asarray(points, dtype=np.float32))
+    if timesteps is None:
+        timesteps = range(model.total_timesteps)
+    timesteps = np.asarray(list(timesteps), dtype=np.int64)
+    # The fused network predicts the noise in its own precision, which the weights alone don't capture
+    fused_network = getattr(model, 'fused_network', None)
+    network = 'unfused' if fused_network is None else str(fused_network.dtype)
+    fields = dict(checkpoint=model_hash(model), network=network, kind=kind, points=points, timesteps=timesteps)
+
+    def build(directory):
+        output = evaluate_score_field(model, points, timesteps, kind=kind, chunk_size=chunk_size)
+        np.save(os.path.join(directory, 'field.npy'), output)
+
+    directory = ArtifactCache(cache_dir).get_or_create('score_field', fields, build)
+    return np.load(os.path.join(directory, 'field.npy'))
@@ -0,0 +1,220 @@
+"""
+    Fast few-step solvers for the reverse process of the 2D diffusion models.
+
+    Every solver works on the noise predictions of a trained `ScoreNetwork`
+    and shares the interface of the samplers in `sampling.py`:
+    `solver.sample(num_samples, recorder, generator)` returns the final
+    samples and the recording, and `solver.num_function_evaluations` is the
+    number of network calls the last run used.
+
+    The network only accepts integer timesteps, so each solver walks a grid
+    of `num_steps` integer timesteps from T - 1 down to 0 (evenly spaced in
+    t or in log-SNR) and finishes with a jump to clean data (alpha = 1,
+    sigma = 0).
+"""
+import math
+import torch
+
+from .sampling import DDPMSampler, DDIMSampler
+
+class Solver():
+    """
+        Base class holding the timestep grid and its schedule values
+
+            alpha_t = sqrt(alphas_cumprod[t])
+            sigma_t = sqrt(1 - alphas_cumprod[t])
+            lambda_t = log(alpha_t / sigma_t)
+    """
+
+    def __init__(self, model, num_steps=20, spacing='linear'):
+        self.model = model
+        self.data_dim = model.score_network.data_dim
+        self.num_function_evaluations = 0
+        timesteps = self._make_timesteps(model, num_steps, spacing)
+        # Snapping can merge grid points, so the grid may be shorter than asked for
+        self.num_steps = len(timesteps)
+        alphas_cumprod = model.schedule.alphas_cumprod.double()[timesteps]
+        self.timesteps = timesteps.tolist()
+        # The final entry is the clean data point the last step jumps to
+        self.alphas = (alphas_cumprod ** 0.5).tolist() + [1.0]
+        self.sigmas = ((1 - alphas_cumprod) ** 0.5).tolist() + [0.0]
+        self.lambdas = [math.log(a / s) if s > 0 else math.inf for a, s in zip(self.alphas, self.sigmas)]
+
+    def _make_timesteps(self, model, num_steps, spacing):
+        """
+            Integer timestep grid, from noisiest to cleanest. `linear` spaces
+            the grid evenly in t, `logsnr` evenly in lambda_t. Grid points
+            that snap to the same timestep are merged, so every step has a
+            nonzero width.
+        """
+        if spacing == 'linear':
+            return torch.linspace(model.total_timesteps - 1, 0, num_steps).round().long().unique_consecutive()
+        if spacing == 'logsnr':
+            lambdas = model.schedule.lambdas.double()
+            targets = torch.linspace(lambdas[-1].item(), lambdas[0].item(), num_steps)
+            # Snap each target to the nearest timestep. Near t = 0 the timesteps
+            # are sparse in lambda, and neighbouring targets can land on the same one
+            return (lambdas[None, :] - targets[:, None]).abs().argmin(dim=1).unique_consecutive()
+        raise ValueError(f"Unknown timestep spacing: {spacing}")
+
+    def predict_noise(self, x, timestep):
+        """
+            Counted network evaluation at a single shared timestep
+        """
+        self.num_function_evaluations += 1
+        # The network broadcasts an int timestep over the batch
+        return self.model.predict_noise(x, timestep)
+
+    def predict_original_sample(self, x, eps, i):
+        """
+            Data prediction x_0 = (x_t - sigma_t * eps) / alpha_t
+        """
+        return (x - self.sigmas[i] * eps) / self.alphas[i]
+
+    @torch.no_grad()
+    def sample(self, num_samples=1000, recorder=None, generator=None, device='cpu'):
+        """
+            Runs the solver for a batch of samples.
+
+            Returns:
+                The final samples of shape (num_samples, data_dim) and the
+                recorder's result (None when no recorder is given).
+        """
+        self.num_function_evaluations = 0
+        self.reset()
+        x = torch.randn(num_samples, self.data_dim, generator=generator, device=device)
+        if recorder is not None:
+            recorder.start(num_samples, self.num_steps, self.data_dim)
+
+        for i in range(self.num_steps):
+            x = self.step(i, x, generator)
+            if recorder is not None:
+                recorder.record(i, x)
+
+        if recorder is None:
+            return x, None
+        return x, recorder.finish()
+
+    def reset(self):
+        """
+            Clears any state carried between steps
+        """
+        pass
+
+    def step(self, i, x, generator):
+        """
+            Moves x from grid point i to grid point i + 1
+        """
+        raise NotImplementedError()
+
+class DPMSolverPlusPlus(Solver):
+    """
+        Multistep DPM-Solver++ (Lu et al. 2022) in data-prediction form.
+
+        Args:
+            order: 1, 2 or 3. Lower orders are used for the first steps
+                while the history fills up and for the last steps, which
+                keeps few-step sampling stable.
+    """
+
+    def __init__(self, model, num_steps=20, order=2, spacing='logsnr'):
+        super(DPMSolverPlusPlus, self).__init__(model, num_steps=num_steps, spacing=spacing)
+        self.order = order
+
+    def reset(self):
+        self.model_outputs = []
+
+    def step(self, i, x, generator):
+        eps = self.predict_noise(x, self.timesteps[i])
+        self.model_outputs = (self.model_outputs + [self.predict_original_sample(x, eps, i)])[-self.order:]
+        # Step order, limited by history and lowered near the end
+        order = min(self.order, len(self.model_outputs), self.num_steps - i)
+        # A zero-width previous step gives no slope information, fall back to lower order
+        if order >= 3 and self.lambdas[i - 1] == self.lambdas[i - 2]:
+            order = 2
+        if order >= 2 and self.lambdas[i] == self.lambdas[i - 1]:
+            order = 1
+        alpha_s, sigma_s, sigma_t = self.alphas[i + 1], self.sigmas[i + 1], self.sigmas[i]
+        if sigma_s == 0:
+            # The jump to clean data is just the data prediction
+            return self.model_outputs[-1]
+        h = self.lambdas[i + 1] - self.lambdas[i]
+        phi_1 = math.expm1(-h)
+        m0 = self.model_outputs[-1]
+        x_next = (sigma_s / sigma_t) * x - (alpha_s * phi_1) * m0
+        if order >= 2:
+            h_0 = self.lambdas[i] - self.lambdas[i - 1]
+            D1_0 = (m0 - self.model_outputs[-2]) * (h / h_0)
+            if order == 2:
+                x_next = x_next - 0.5 * (alpha_s * phi_1) * D1_0
+            else:
+                h_1 = self.lambdas[i - 1] - self.lambdas[i - 2]
+                r0, r1 = h_0 / h, h_1 / h
+                D1_1 = (self.model_outputs[-2] - self.model_outputs[-3]) / r1
+                D1 = D1_0 + (r0 / (r0 + r1)) * (D1_0 - D1_1)
+                D2 = (D1_0 - D1_1) / (r0 + r1)
+                x_next = x_next + (alpha_s * (phi_1 / h + 1.0)) * D1 - (alpha_s * ((phi_1 + h) / h ** 2 - 0.5)) * D2
+        return x_next
+
+class HeunSolver(Solver):
+    """
+        Heun's second order method on the probability flow ODE, written in
+        the DDIM variables y = x / alpha and tau = sigma / alpha where it
+        reads dy / dtau = eps(x, t). Uses two network calls per step except
+        for the first and last, which are plain Euler (DDIM) steps. From
+        t = T - 1 the Euler step lands far from the data the network was
+        trained on, so evaluating the correction there blows up few-step
+        grids instead of refining them.
+    """
+
+    def step(self, i, x, generator):
+        alpha_t, alpha_s = self.alphas[i], self.alphas[i + 1]
+        tau_t, tau_s = self.sigmas[i] / alpha_t, self.sigmas[i + 1] / alpha_s
+        y = x / alpha_t
+        d1 = self.predict_noise(x, self.timesteps[i])
+        y_next = y + (tau_s - tau_t) * d1
+        if 0 < i < self.num_steps - 1:
+            # Heun correction with the slope at the end of the step
+            d2 = self.predict_noise(alpha_s * y_next, self.timesteps[i + 1])
+            y_next = y + (tau_s - tau_t) * 0.5 * (d1 + d2)
+        return alpha_s * y_next
+
+class EulerMaruyamaSolver(Solver):
+    """
+        Euler-Maruyama on the reverse VP-SDE
+
+            dx = [-1/2 beta x - beta score(x, t)] dt + sqrt(beta) dW
+
+        where the integrated beta over a step is log(alphas_cumprod[s] /
+        alphas_cumprod[t]) and score = -eps / sigma_t. The last step
+        returns the denoised data prediction.
+    """
+
+    def step(self, i, x, generator):
+        eps = self.predict_noise(x, self.timesteps[i])
+        if self.sigmas[i + 1] == 0:
+            return self.predict_original_sample(x, eps, i)
+        h = 2 * math.log(self.alphas[i + 1] / self.alphas[i])
+        score = -eps / self.sigmas[i]
+        noise = torch.randn(x.shape, generator=generator, device=x.device)
+        return x + 0.5 * h * x + h * score + math.sqrt(h) * noise
+
+def make_solver(name, model, num_steps=20):
+    """
+        Builds a sampler or solver from its name
+    """
+    if name == 'ddpm':
+        return DDPMSampler(model)
+    if name == 'ddim':
+        return DDIMSampler(model, num_inference_timesteps=num_steps)
+    if name == 'dpm_solver++_2m':
+        return DPMSolverPlusPlus(model, num_steps=num_steps, order=2)
+    if name == 'dpm_solver++_3m':
+        return DPMSolverPlusPlus(model, num_steps=num_steps, order=3)
+    if name == 'heun':
+        # Two evaluations per step but one for the first and last, so a
+        # grid of n points costs 2n - 2
+        return HeunSolver(model, num_steps=num_steps // 2 + 1)
+    if name == 'euler_maruyama':
+        return EulerMaruyamaSolver(model, num_steps=num_steps)
+    raise ValueError(f"Unknown solver: {name}")
@@ -1,4 +1,4 @@
-from distributions import make_smiley_face_distribution
+from .distributions import make_smiley_face_distribution
 import matplotlib.pyplot as plt
 
 # Load the smiley face distribution 
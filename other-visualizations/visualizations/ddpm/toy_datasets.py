@@ -0,0 +1,149 @@
+"""
+    Vectorized generators for the 2D toy datasets.
+
+    Every generator draws all of its points with a handful of array
+    operations, so datasets with millions of points take milliseconds. Each
+    one takes a `seed`, which is an int, an existing `np.random.Generator`
+    (so composite datasets can share one stream) or None for fresh entropy.
+    Generators return float64 NumPy arrays of shape (N, 2); the wrappers in
+    `distributions.py` convert them to torch tensors.
+"""
+import numpy as np
+
+from .densities import three_mode_mixture, star_mixture
+
+def make_rng(seed=None):
+    """
+        A `np.random.Generator` from a seed. Generators are passed through.
+    """
+    return np.random.default_rng(seed)
+
+def spiral(num_samples=1000, std=0.0, rescale_factor=0.3, seed=None):
+    """
+        Points at uniformly drawn angles in [0, 4 pi] along the spiral
+        r = rescale_factor * angle, with isotropic Gaussian noise of `std`
+    """
+    rng = make_rng(seed)
+    angles = rng.uniform(0, 4 * np.pi, num_samples)
+    points = rescale_factor * angles[:, None] * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    if std > 0:
+        points += rng.normal(0.0, std, points.shape)
+    return points
+
+def gaussian_clusters(means, covariances, points_per_cluster, seed=None):
+    """
+        `points_per_cluster` points from each Gaussian, cluster by cluster.
+
+        Args:
+            means: (K, D) cluster centers
+            covariances: a shared variance, (K,) per-cluster variances or
+                (K, D, D) full covariance matrices
+    """
+    rng = make_rng(seed)
+    means = np.asarray(means, dtype=np.float64)
+    num_clusters, dim = means.shape
+    covariances = np.asarray(covariances, dtype=np.float64)
+    noise = rng.standard_normal((num_clusters, points_per_cluster, dim))
+    if covariances.ndim <= 1:
+        # Isotropic, scale by the standard deviations
+        stds = np.broadcast_to(np.sqrt(covariances), (num_clusters,))
+        noise *= stds[:, None, None]
+    else:
+        # Full covariance, color the noise with the Cholesky factors
+        noise = noise @ np.linalg.cholesky(covariances).transpose(0, 2, 1)
+    return (means[:, None, :] + noise).reshape(-1, dim)
+
+def three_modes(points_per_mode=10000, scale=0.5, seed=None):
+    """
+        The three Gaussian modes of the GMM dataset, see
+        `densities.three_mode_mixture`
+    """
+    mixture = three_mode_mixture(scale=scale)
+    return gaussian_clusters(mixture.means, mixture.variances, points_per_mode, seed=seed)
+
+def star(points_per_arm=5000, seed=None):
+    """
+        The three elongated Gaussians of the star distribution, see
+        `densities.star_mixture`
+    """
+    mixture = star_mixture()
+    return gaussian_clusters(mixture.means, mixture.covariances, points_per_arm, seed=seed)
+
+def arc(angles, center=(0.0, 0.0), radius=1.0, std=0.0, seed=None):
+    """
+        Points on a circle of `radius` around `center` at the given angles,
+        with isotropic Gaussian noise of `std`
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    points = np.asarray(center) + radius * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    if std > 0:
+        points += make_rng(seed).normal(0.0, std, points.shape)
+    return points
+
+def disk(num_points, center=(0.0, 0.0), radius=1.0, seed=None):
+    """
+        Points uniformly distributed over a filled disk
+    """
+    rng = make_rng(seed)
+    # The square root makes the density uniform in area
+    radii = radius * np.sqrt(rng.random(num_points))
+    angles = 2 * np.pi * rng.random(num_points)
+    return np.asarray(center) + radii[:, None] * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+
+class GridSampler():
+    """
+        Inverse-CDF sampler for an arbitrary 2D density on a fixed grid.
+
+        The density is evaluated once at the centers of a resolution x
+        resolution grid of cells over `bounds`, and the flattened cell
+        probabilities are turned into a CDF. Each sample then picks a cell
+        with a binary search of that CDF and is placed uniformly within
+        it, so the cost of a draw and the memory held do not depend on
+        the resolution beyond the one-off table.
+
+        Args:
+            pdf: function of (N, 2) points returning (N,) non-negative
+                (possibly unnormalized) densities, as NumPy or torch
+            bounds: (xmin, xmax, ymin, ymax)
+            resolution: number of cells along each axis
+    """
+
+    def __init__(self, pdf, bounds, resolution=512):
+        xmin, xmax, ymin, ymax = bounds
+        self.bounds = (xmin, xmax, ymin, ymax)
+        self.resolution = resolution
+        self.cell_size = np.array([(xmax - xmin) / resolution, (ymax - ymin) / resolution])
+        centers_x = xmin + (np.arange(resolution) + 0.5) * self.cell_size[0]
+        centers_y = ymin + (np.arange(resolution) + 0.5) * self.cell_size[1]
+        xx, yy = np.meshgrid(centers_x, centers_y)
+        densities = np.asarray(pdf(np.stack([xx.ravel(), yy.ravel()], axis=-1)), dtype=np.float64)
+        self.cdf = np.cumsum(densities)
+        if not self.cdf[-1] > 0:
+            raise ValueError("The pdf is zero everywhere inside the bounds")
+        self.cdf /= self.cdf[-1]
+
+    def sample(self, num_samples, seed=None):
+        """
+            (num_samples, 2) points distributed like the gridded density
+        """
+        rng = make_rng(seed)
+        # First cell whose CDF exceeds u, which skips zero-probability cells
+        cells = np.searchsorted(self.cdf, rng.random(num_samples), side='right')
+        cells = np.minimum(cells, len(self.cdf) - 1)
+        rows, columns = np.divmod(cells, self.resolution)
+        # Uniform jitter within the chosen cell
+        offsets = np.stack([columns, rows], axis=-1) + rng.random((num_samples, 2))
+        return np.array([self.bounds[0], self.bounds[2]]) + offsets * self.cell_size
+
+# Built samplers, keyed by (pdf, bounds, resolution)
+_grid_samplers = {}
+
+def sample_from_pdf(pdf, num_samples=1000, bounds=None, resolution=512, seed=None):
+    """
+        Draws samples from a 2D density with a cached `GridSampler`, so only
+        the first draw for a given pdf, bounds and resolution evaluates it
+    """
+    key = (pdf, tuple(bounds), resolution)
+    if key not in _grid_samplers:
+        _grid_samplers[key] = GridSampler(pdf, bounds, resolution=resolution)
+    return _grid_samplers[key].sample(num_samples, seed=seed)
@@ -2,16 +2,21 @@
     This is a script for training a diffusion model on a simple 
     2D spiral distribution. 
 """
+import os
 import torch
 import torch.nn as nn
 import numpy as np
-import matplotlib.pyplot as plt
 import math
-from tqdm import tqdm
-import itertools
-import torch.nn.functional as F
-import pandas as pd
-import seaborn as sns
+
+from .sampling import DDPMSampler
+from .trajectory import TrajectoryRecorder
+from .score_field import score_field
+from .training import train_fast, plot_losses
+from .schedules import NoiseSchedule
+from .fused_network import FusedScoreNetwork
+# Re-exported, the benchmarks and scripts import the dataset from here
+from .distributions import load_datasaurus
+from . import MODELS_DIR, PLOTS_DIR
 
 # Function for generating spiral data
 def make_spiral_data(num_examples=1000, noise=0.0, rescale_factor=0.3):
@@ -26,26 +31,15 @@ def make_spiral_data(num_examples=1000, noise=0.0, rescale_factor=0.3):
     data = torch.stack([x, y], dim=-1) * rescale_factor
     return data
 
-def load_datasaurus(num=5000):
-    datasaurus_data = pd.read_csv('datasaurus.csv')
-    datasaurus_data = datasaurus_data[datasaurus_data['dataset'] == 'dino']
-    # # Convert x and y to torch tensors
-    x = torch.tensor(datasaurus_data['x'].values, dtype=torch.float32)
-    y = torch.tensor(datasaurus_data['y'].values, dtype=torch.float32)
-    datasaurus_data = torch.stack([x, y], dim=-1)
-    # Center and standardize the data
-    datasaurus_data = (datasaurus_data - datasaurus_data.mean(dim=0)) / datasaurus_data.std(dim=0)
-
-    return datasaurus_data
-
 class SinusoidalPositionalEmbedding(nn.Module):
     def __init__(self, embedding_dim=10, max_length=1000):
         super(SinusoidalPositionalEmbedding, self).__init__()
         self.embedding_dim = embedding_dim
         self.max_length = max_length
         
-        # Compute the positional encodings once in log space
-        self.positional_encodings = self._get_positional_encodings()
+        # Compute the positional encodings once in log space, as a buffer that
+        # follows the model's device but is not saved in the checkpoints
+        self.register_buffer('positional_encodings', self._get_positional_encodings(), persistent=False)
 
     def _get_positional_encodings(self):
         pe = torch.zeros(self.max_length, self.embedding_dim)
@@ -93,6 +87,9 @@ class ScoreNetwork(nn.Module):
         """
         # Map the time through a positional encoding
         time_embedding = self.positional_embedding(time)
+        if time_embedding.dim() == 1:
+            # One timestep shared by the whole batch
+            time_embedding = time_embedding.expand(len(x), -1)
         return self.network(
             torch.cat([x, time_embedding], dim=-1)
         )
@@ -107,6 +104,7 @@ class DiffusionModel(nn.Module):
             time_dim=10,
             beta_start=0.0001,
             beta_end=0.02,
+            schedule='linear',
         ):
         super(DiffusionModel, self).__init__()
 
@@ -116,55 +114,52 @@ class DiffusionModel(nn.Module):
             data_dim=data_dim, 
             time_dim=time_dim
         )
-        # Make alphas and betas
-        self.betas = torch.linspace(beta_start, beta_end, total_timesteps) # Use linear schedule
-        self.alphas = 1 - self.betas
-        # Make cumulative products
-        self.cumulative_alphas = torch.cumprod(self.alphas, dim=0)
-        self.cumulative_betas = 1 - self.cumulative_alphas
-
-        self.alphas_cumprod = torch.cumprod(self.alphas, axis=0)
-        self.alphas_cumprod_prev = F.pad(
-            self.alphas_cumprod[:-1], (1, 0), value=1.)
-
-        # required for self.add_noise
-        self.sqrt_alphas_cumprod = self.alphas_cumprod ** 0.5
-        self.sqrt_one_minus_alphas_cumprod = (1 - self.alphas_cumprod) ** 0.5
-
-        # required for reconstruct_x0
-        self.sqrt_inv_alphas_cumprod = torch.sqrt(1 / self.alphas_cumprod)
-        self.sqrt_inv_alphas_cumprod_minus_one = torch.sqrt(
-            1 / self.alphas_cumprod - 1)
-
-        # required for q_posterior
-        self.posterior_mean_coef1 = self.betas * torch.sqrt(self.alphas_cumprod_prev) / (1. - self.alphas_cumprod)
-        self.posterior_mean_coef2 = (1. - self.alphas_cumprod_prev) * torch.sqrt(self.alphas) / (1. - self.alphas_cumprod)
+        # Inference-only copy of the network, see `fuse`
+        self.fused_network = None
+        # Every table of the noise schedule, as buffers
+        schedule_kwargs = {'beta_start': beta_start, 'beta_end': beta_end} if schedule == 'linear' else {}
+        self.schedule = NoiseSchedule(schedule, total_timesteps, **schedule_kwargs)
 
     def get_variance(self, t):
         if t == 0:
             return 0
-
-        variance = self.betas[t] * (1. - self.alphas_cumprod_prev[t]) / (1. - self.alphas_cumprod[t])
-        variance = variance.clip(1e-20)
-        return variance
+        return self.schedule.posterior_variance[t]
     
     def predict_noise(self, x, t):
         """
             Predicts the noise at a noisy sample and time step
         """
+        if self.fused_network is not None and not torch.is_grad_enabled():
+            return self.fused_network(x, t)
         return self.score_network(x, t)
 
+    def fuse(self, dtype=None):
+        """
+            Switches `predict_noise` to a `FusedScoreNetwork` built from the
+            current weights, used whenever gradients are disabled. Call it
+            again after the weights change.
+        """
+        self.fused_network = FusedScoreNetwork(self.score_network, dtype)
+        return self
+
+    def score_field(self, points, timesteps=None, kind='noise', chunk_size=2 ** 16, cache_dir=None):
+        """
+            Noise prediction (or score) at every point for every timestep in
+            batched forward passes, as a (T, G, 2) array. See `score_field.py`.
+        """
+        return score_field(self, points, timesteps, kind=kind, chunk_size=chunk_size, cache_dir=cache_dir)
+
     def step(self, model_output, timestep, x_t):
         t = timestep
         # Reconstruct the original sample
-        s1 = self.sqrt_inv_alphas_cumprod[t]
-        s2 = self.sqrt_inv_alphas_cumprod_minus_one[t]
+        s1 = self.schedule.sqrt_inv_alphas_cumprod[t]
+        s2 = self.schedule.sqrt_inv_alphas_cumprod_minus_one[t]
         s1 = s1.reshape(-1, 1)
         s2 = s2.reshape(-1, 1)
         pred_original_sample = s1 * x_t - s2 * model_output
         # Predict the previous sample
-        s1 = self.posterior_mean_coef1[t]
-        s2 = self.posterior_mean_coef2[t]
+        s1 = self.schedule.posterior_mean_coef1[t]
+        s2 = self.schedule.posterior_mean_coef2[t]
         s1 = s1.reshape(-1, 1)
         s2 = s2.reshape(-1, 1)
         pred_prev_sample = s1 * pred_original_sample + s2 * x_t
@@ -179,80 +174,37 @@ class DiffusionModel(nn.Module):
         return pred_prev_sample
 
     def add_noise(self, x_start, x_noise, timesteps):
-        s1 = self.sqrt_alphas_cumprod[timesteps]
-        s2 = self.sqrt_one_minus_alphas_cumprod[timesteps]
-
-        s1 = s1.reshape(-1, 1)
-        s2 = s2.reshape(-1, 1)
-
-        return s1 * x_start + s2 * x_noise
+        return self.schedule.add_noise(x_start, x_noise, timesteps)
     
-    def sample(self, num_samples=1000, num_timesteps=1000, device='cpu'):
-        sample = torch.randn(num_samples, 2)
-        timesteps = list(range(self.total_timesteps))[::-1]
-        interemediate_values = torch.empty(num_samples, num_timesteps, 2)
-
-        for i, t in enumerate(timesteps):
-            t = torch.from_numpy(np.repeat(t, num_samples)).long()
-            with torch.no_grad():
-                residual = self.predict_noise(sample, t)
-            sample = self.step(residual, t[0], sample)
-            interemediate_values[:, i, :] = sample
-        
-        return sample, interemediate_values
+    def sample(self, num_samples=1000, num_timesteps=1000, device='cpu', recorder=None):
+        # Run the whole reverse chain with precomputed coefficient tables
+        sampler = DDPMSampler(self)
+        if recorder is not None:
+            return sampler.sample(num_samples, recorder=recorder, device=device)
+        # By default keep every step, viewed as (num_samples, num_timesteps, 2)
+        sample, intermediate_values = sampler.sample(num_samples, recorder=TrajectoryRecorder(), device=device)
+        return sample, intermediate_values.permute(1, 0, 2)
 
 # Train the model
 def train(model, data, num_iterations=1000, batch_size=32, learning_rate=1e-4, device='cpu'):
     """
         Trains the diffusion model at denoising score matching
     """
-    model = model.to(device)
-    # Make the optimizer
-    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
-    # Make the loss function
-    loss_fn = nn.MSELoss()
-    # Make a data loader
-    data_loader = torch.utils.data.DataLoader(data, batch_size=batch_size, shuffle=True)
-    cyclic_data_iterator = itertools.cycle(data_loader)
-    # Save losses
-    losses = []
-    # Train the model
-    for i in tqdm(range(num_iterations)):
-        # Zero the gradients
-        optimizer.zero_grad()
-        # Load data batch
-        noise_free_data = next(cyclic_data_iterator)
-        # Make a batch of noisy data
-        time_steps = torch.randint(0, model.total_timesteps, (noise_free_data.shape[0],)) # Randomly sample time steps uniformly  
-        noise = torch.randn(noise_free_data.shape) # Generate standard gaussian noise 
-        noisy_data = model.add_noise(noise_free_data, noise, time_steps)
-        # Run the score prediction 
-        predicted_noise = model.predict_noise(noisy_data, time_steps)
-        # Compute the loss (i.e. MSE between predicted noise and true noise)
-        loss = loss_fn(predicted_noise, noise)
-        # Append the loss
-        losses.append(loss.item())
-        # Compute the gradients
-        loss.backward()
-        # Update the weights
-        optimizer.step()
-        # Generate some samples every 100 iterations
-        if i % 10000 == 0:
-            # Generate 1000 samples and plot them
-            samples, _ = model.sample(num_samples=500, num_timesteps=1000, device=device)
-            samples = samples.detach().cpu().numpy()
-            plt.figure()
-            # Plot the true data
-            plt.scatter(data[:, 0], data[:, 1], label='True Data', alpha=0.5)
-            plt.scatter(samples[:, 0], samples[:, 1], label='Samples', alpha=0.5)
-            plt.savefig(f'plots/samples_{i}.png')
-
-    # Plot the losses
-    plt.figure()
-    # Smooth the losses
-    losses = np.convolve(losses, np.ones(5000) / 5000, mode='valid')
-    plt.plot(losses)
-    plt.savefig('plots/losses.png')
+    # Batches from the resident data tensor, plots drawn by a separate evaluator process
+    log_every = 5000
+    losses = train_fast(
+        model,
+        data,
+        num_iterations=num_iterations,
+        batch_size=batch_size,
+        learning_rate=learning_rate,
+        device=device,
+        log_every=log_every,
+        eval_every=10000,
+        plot_dir=PLOTS_DIR
+    )
+    # Plot the losses, averaged over windows of 5000 iterations
+    plot_losses(losses, log_every, os.path.join(PLOTS_DIR, 'losses.png'))
 
 if __name__ == "__main__":
     # Make the diffusion model
@@ -263,4 +215,4 @@ if __name__ == "__main__":
     # Run the training loop
     train(model, data, num_iterations=700000, batch_size=200, learning_rate=1e-4, device='cpu')
     # Save the state dict
-    torch.save(model.state_dict(), 'models/dino_model.pth')
\ No newline at end of file
+    torch.save(model.state_dict(), os.path.join(MODELS_DIR, 'dino_model.pth'))
\ No newline at end of file
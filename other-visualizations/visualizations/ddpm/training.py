@@ -0,0 +1,178 @@
+"""
+    High-throughput denoising score matching loop shared by the training
+    scripts.
+
+    The dataset stays resident as a single tensor and each batch is a slice
+    of a fresh index permutation per epoch, instead of a `DataLoader` that
+    collates individual rows. The loss is summed on-tensor and only read
+    back once every `log_every` iterations, so the loop never waits on a
+    `.item()` sync, and Adam runs fused where PyTorch supports it. Sample
+    plots are drawn from a snapshot of the weights by a separate evaluator
+    process while training carries on.
+"""
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+import torch
+import torch.nn.functional as F
+from tqdm import tqdm
+
+from .sampling import DDPMSampler
+from . import PLOTS_DIR
+
+# Copy of the model, the data and the plot directory owned by the evaluator process
+_evaluator_state = None
+
+def _init_evaluator(model, data, plot_dir, num_samples, num_threads=1):
+    global _evaluator_state
+    # The evaluator should not compete with the training loop for cores
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    _evaluator_state = (model, data, plot_dir, num_samples)
+
+def _evaluate(task):
+    """
+        Samples from a snapshot of the weights and plots them over the data
+    """
+    import matplotlib.pyplot as plt
+
+    iteration, state_dict = task
+    model, data, plot_dir, num_samples = _evaluator_state
+    model.load_state_dict(state_dict)
+    samples, _ = DDPMSampler(model).sample(num_samples)
+    samples = samples.numpy()
+    fig = plt.figure()
+    # Plot the true data
+    plt.scatter(data[:, 0], data[:, 1], label='True Data', alpha=0.5)
+    plt.scatter(samples[:, 0], samples[:, 1], label='Samples', alpha=0.5)
+    path = os.path.join(plot_dir, f'samples_{iteration}.png')
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+def _snapshot(model):
+    return {name: tensor.detach().cpu().clone() for name, tensor in model.state_dict().items()}
+
+def train_fast(
+        model,
+        data,
+        num_iterations=1000,
+        batch_size=32,
+        learning_rate=1e-4,
+        device='cpu',
+        log_every=1000,
+        eval_every=None,
+        eval_samples=500,
+        plot_dir=PLOTS_DIR,
+        async_eval=True,
+        seed=None,
+        progress=True,
+    ):
+    """
+        Trains the diffusion model at denoising score matching.
+
+        Args:
+            data: (N, D) tensor of training examples
+            log_every: number of iterations averaged into one logged loss
+            eval_every: plot samples every this many iterations (never
+                when None)
+            async_eval: draw the plots in a separate process instead of
+                pausing training
+            seed: seed of the batch, timestep and noise draws
+
+        Returns:
+            The mean loss of each window of `log_every` iterations, the
+            last window covering whatever iterations are left over
+    """
+    model = model.to(device)
+    data = torch.as_tensor(data, dtype=torch.float32).to(device)
+    num_examples = len(data)
+    batch_size = min(batch_size, num_examples)
+    generator = torch.Generator(device=device)
+    if seed is not None:
+        generator.manual_seed(seed)
+    else:
+        generator.seed()
+    try:
+        # One fused kernel for all parameters instead of a loop over them
+        optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate, fused=True)
+    except (RuntimeError, TypeError):
+        # Older PyTorch has no fused Adam on the CPU
+        optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+
+    evaluator = None
+    pending = []
+    if eval_every is not None:
+        os.makedirs(plot_dir, exist_ok=True)
+        evaluator_args = (copy.deepcopy(model).cpu(), data.cpu(), plot_dir, eval_samples)
+        if async_eval:
+            # Forked so the evaluator starts from this process' modules and model class
+            evaluator = ProcessPoolExecutor(
+                1,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_evaluator,
+                initargs=evaluator_args,
+            )
+        else:
+            _init_evaluator(*evaluator_args, num_threads=None)
+
+    losses = []
+    running_loss = torch.zeros((), device=device)
+    permutation = torch.randperm(num_examples, generator=generator, device=device)
+    position = 0
+    bar = tqdm(total=num_iterations, disable=not progress)
+    for i in range(num_iterations):
+        # Slice the next batch out of this epoch's permutation
+        if position + batch_size > num_examples:
+            permutation = torch.randperm(num_examples, generator=generator, device=device)
+            position = 0
+        noise_free_data = data[permutation[position:position + batch_size]]
+        position += batch_size
+        # Make a batch of noisy data
+        time_steps = torch.randint(0, model.total_timesteps, (batch_size,), generator=generator, device=device)
+        noise = torch.randn(noise_free_data.shape, generator=generator, device=device)
+        noisy_data = model.add_noise(noise_free_data, noise, time_steps)
+        # MSE between predicted noise and true noise
+        loss = F.mse_loss(model.predict_noise(noisy_data, time_steps), noise)
+        optimizer.zero_grad(set_to_none=True)
+        loss.backward()
+        optimizer.step()
+        running_loss += loss.detach()
+        # Only sync with the device once per logging window
+        if (i + 1) % log_every == 0:
+            losses.append(running_loss.item() / log_every)
+            running_loss.zero_()
+            bar.update(log_every)
+            bar.set_postfix(loss=f"{losses[-1]:.4f}")
+        if eval_every is not None and i % eval_every == 0:
+            task = (i, _snapshot(model))
+            if evaluator is not None:
+                pending.append(evaluator.submit(_evaluate, task))
+            else:
+                _evaluate(task)
+    # Flush the final partial window
+    if num_iterations % log_every:
+        losses.append(running_loss.item() / (num_iterations % log_every))
+    bar.update(num_iterations - bar.n)
+    bar.close()
+    if evaluator is not None:
+        # Wait for the outstanding plots
+        for future in pending:
+            future.result()
+        evaluator.shutdown()
+    return np.array(losses)
+
+def plot_losses(losses, log_every, path=os.path.join(PLOTS_DIR, 'losses.png')):
+    """
+        Plots the windowed mean losses returned by `train_fast`
+    """
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure()
+    plt.plot(np.arange(1, len(losses) + 1) * log_every, losses)
+    plt.xlabel('Iteration')
+    plt.ylabel(f'Mean loss over {log_every} iterations')
+    fig.savefig(path)
+    plt.close(fig)
@@ -0,0 +1,112 @@
+"""
+    Recorders that the samplers stream each step of the reverse chain into.
+
+    Recorded trajectories are stored frame-major, i.e. with shape
+    (num_recorded_steps, num_recorded_samples, data_dim), so that pulling
+    out a single frame for a video is a contiguous read.
+"""
+import numpy as np
+import torch
+
+class TrajectoryRecorder():
+    """
+        Keeps intermediate samples of the reverse chain in memory.
+
+        Args:
+            every: keep every k-th step of the chain
+            steps: explicit step indices to keep (overrides every), each in
+                range(num_steps), otherwise `start` raises a ValueError
+            indices: subset of sample indices to keep (default all of them)
+    """
+
+    def __init__(self, every=1, steps=None, indices=None):
+        self.every = every
+        self.requested_steps = steps
+        self.indices = indices
+        self.steps = []
+        self.values = None
+
+    def start(self, num_samples, num_steps, data_dim):
+        """
+            Called by the sampler before the first step
+        """
+        if self.requested_steps is None:
+            self.steps = list(range(0, num_steps, self.every))
+        else:
+            self.steps = sorted({int(step) for step in self.requested_steps})
+            # Slots for steps the chain never reaches would stay uninitialised
+            invalid = [step for step in self.steps if not 0 <= step < num_steps]
+            if invalid:
+                raise ValueError(f"Requested steps {invalid} are outside the {num_steps} steps of the chain")
+        # Map step index -> slot in the recorded array
+        self._slots = {step: slot for slot, step in enumerate(self.steps)}
+        if self.indices is not None:
+            self.indices = torch.as_tensor(self.indices, dtype=torch.long)
+            num_samples = len(self.indices)
+        self.values = self._allocate((len(self.steps), num_samples, data_dim))
+
+    def record(self, step, sample):
+        """
+            Called by the sampler with the sample after each step
+        """
+        slot = self._slots.get(step)
+        if slot is None:
+            return
+        if self.indices is not None:
+            sample = sample[self.indices.to(sample.device)]
+        self._write(slot, sample)
+
+    def finish(self):
+        """
+            Called by the sampler after the last step, returns the recording
+        """
+        return self.values
+
+    def frames(self):
+        """
+            Lazily yields each recorded frame as a numpy array
+        """
+        for slot in range(len(self.steps)):
+            yield np.asarray(self.values[slot])
+
+    def _allocate(self, shape):
+        return torch.empty(shape)
+
+    def _write(self, slot, sample):
+        self.values[slot].copy_(sample)
+
+class NullRecorder(TrajectoryRecorder):
+    """
+        Keeps nothing, for when only the final samples are needed
+    """
+
+    def __init__(self):
+        super(NullRecorder, self).__init__(steps=[])
+
+class MemmapTrajectoryRecorder(TrajectoryRecorder):
+    """
+        Writes the recorded steps straight to a memory-mapped .npy file,
+        which can be reopened later with `load_trajectory`.
+    """
+
+    def __init__(self, path, every=1, steps=None, indices=None, dtype=np.float32):
+        super(MemmapTrajectoryRecorder, self).__init__(every=every, steps=steps, indices=indices)
+        self.path = path
+        self.dtype = dtype
+
+    def finish(self):
+        self.values.flush()
+        return self.values
+
+    def _allocate(self, shape):
+        return np.lib.format.open_memmap(self.path, mode='w+', dtype=self.dtype, shape=shape)
+
+    def _write(self, slot, sample):
+        self.values[slot] = sample.cpu().numpy()
+
+def load_trajectory(path):
+    """
+        Opens a trajectory written by `MemmapTrajectoryRecorder` without
+        reading it into memory
+    """
+    return np.load(path, mmap_mode='r')
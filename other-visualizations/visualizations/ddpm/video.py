@@ -0,0 +1,170 @@
+"""
+    Parallel frame rendering for the long matplotlib videos.
+
+    `FuncAnimation.save` draws and encodes every frame in one process.
+    `render_video` instead splits the frame range over forked worker
+    processes. Each worker owns a copy of the figure, renders frames with
+    the Agg canvas to raw RGBA buffers, and either
+
+        - encodes its own contiguous segment with ffmpeg; the segments are
+          concatenated without re-encoding afterwards (`mode='segments'`,
+          the default, which also parallelises the encoding), or
+        - hands the buffers back to the parent, which streams them in order
+          into the stdin of a single ffmpeg process (`mode='pipe'`).
+
+    The workers are forked, so the figure and update function built by a
+    script (including closures over its data) are inherited as they are.
+    `update(frame)` must only depend on the frame it is given, since every
+    worker starts at a different point of the range.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Figure, update function and dpi inherited by the forked workers
+_render_state = None
+
+def _init_worker():
+    # One intra-op thread per process if the update function uses torch
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(1)
+
+def _ffmpeg_command(width, height, fps, path, codec, output_args):
+    return [
+        matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+        # yuv420p needs even dimensions
+        '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec', codec, '-pix_fmt', 'yuv420p',
+        *output_args, path,
+    ]
+
+def _render_frame(frame):
+    """
+        Raw RGBA bytes of a single frame
+    """
+    fig, update, dpi = _render_state
+    update(frame)
+    # savefig draws animated artists too and honours the figure facecolor
+    buffer = BytesIO()
+    fig.savefig(buffer, format='raw', dpi=dpi)
+    return buffer.getvalue()
+
+def _frame_size(fig, dpi):
+    # Agg truncates the pixel size
+    width, height = fig.get_size_inches() * dpi
+    return int(width), int(height)
+
+def _render_frames(frames):
+    return [_render_frame(frame) for frame in frames]
+
+def _render_segment(task):
+    """
+        Renders and encodes a contiguous run of frames into its own file
+    """
+    frames, path, fps, codec, output_args = task
+    fig, _, dpi = _render_state
+    width, height = _frame_size(fig, dpi)
+    encoder = subprocess.Popen(_ffmpeg_command(width, height, fps, path, codec, output_args), stdin=subprocess.PIPE)
+    for frame in frames:
+        encoder.stdin.write(_render_frame(frame))
+    encoder.stdin.close()
+    if encoder.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed while encoding {path}")
+    return path
+
+def render_video(
+        fig,
+        update,
+        frames,
+        path,
+        fps=30,
+        dpi=100,
+        num_workers=None,
+        mode='segments',
+        codec='libx264',
+        output_args=(),
+        frames_per_task=4,
+    ):
+    """
+        Renders `update(frame)` for every frame into a video file.
+
+        Args:
+            fig: the figure that `update` draws into
+            update: function of the frame index that updates the figure
+            frames: sequence of frame indices, rendered in this order
+            path: output video file
+            fps: frame rate of the video
+            dpi: resolution the frames are rendered at
+            num_workers: number of processes (defaults to all CPU cores)
+            mode: `segments` to encode per worker and concatenate, or
+                `pipe` to stream every frame into one ffmpeg process
+            codec / output_args: ffmpeg video codec and extra output options
+            frames_per_task: frames rendered per round trip in `pipe` mode
+    """
+    global _render_state
+    frames = list(frames)
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    num_workers = max(1, min(num_workers, len(frames)))
+    FigureCanvasAgg(fig)
+    _render_state = (fig, update, dpi)
+    context = get_context('fork')
+    with ProcessPoolExecutor(num_workers, mp_context=context, initializer=_init_worker) as executor:
+        if mode == 'segments':
+            _render_segments(executor, frames, path, fps, codec, output_args, num_workers)
+        elif mode == 'pipe':
+            _render_pipe(executor, frames, path, fps, dpi, codec, output_args, num_workers, frames_per_task)
+        else:
+            raise ValueError(f"Unknown render mode: {mode}")
+    _render_state = None
+    return path
+
+def _render_segments(executor, frames, path, fps, codec, output_args, num_segments):
+    directory = tempfile.mkdtemp(prefix='segments_', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        # Contiguous, near-equal runs of frames
+        bounds = [len(frames) * i // num_segments for i in range(num_segments + 1)]
+        extension = os.path.splitext(path)[1] or '.mp4'
+        tasks = [
+            (frames[start:stop], os.path.join(directory, f'segment_{i:04d}{extension}'), fps, codec, output_args)
+            for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:]))
+        ]
+        segments = list(executor.map(_render_segment, tasks))
+        listing = os.path.join(directory, 'segments.txt')
+        with open(listing, 'w') as f:
+            f.writelines(f"file '{segment}'\n" for segment in segments)
+        subprocess.run([
+            matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+            '-f', 'concat', '-safe', '0', '-i', listing, '-c', 'copy', path,
+        ], check=True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def _render_pipe(executor, frames, path, fps, dpi, codec, output_args, num_workers, frames_per_task):
+    fig = _render_state[0]
+    width, height = _frame_size(fig, dpi)
+    # Fork the workers before starting ffmpeg, otherwise they inherit its
+    # stdin and it never sees the end of the stream
+    executor.submit(int).result()
+    encoder = subprocess.Popen(_ffmpeg_command(width, height, fps, path, codec, output_args), stdin=subprocess.PIPE)
+    tasks = iter([frames[i:i + frames_per_task] for i in range(0, len(frames), frames_per_task)])
+    # Bounded window of in-flight tasks, written strictly in submission order
+    pending = deque(executor.submit(_render_frames, task) for _, task in zip(range(2 * num_workers), tasks))
+    while pending:
+        for buffer in pending.popleft().result():
+            encoder.stdin.write(buffer)
+        task = next(tasks, None)
+        if task is not None:
+            pending.append(executor.submit(_render_frames, task))
+    encoder.stdin.close()
+    if encoder.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed while encoding {path}")
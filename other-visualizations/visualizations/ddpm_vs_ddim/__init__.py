@@ -0,0 +1,9 @@
+"""
+    DDPM and DDIM sampling compared on the spiral, reusing the samplers
+    in `visualizations.ddpm`.
+"""
+import os
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(PACKAGE_DIR, 'models')
+PLOTS_DIR = os.path.join(PACKAGE_DIR, 'plots')
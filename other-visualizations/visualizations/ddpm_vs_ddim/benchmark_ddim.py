@@ -0,0 +1,49 @@
+"""
+    Compares wall time and sample quality of strided DDIM sampling against
+    the full 1000-step DDPM chain on the spiral model.
+"""
+import os
+import argparse
+import time
+import torch
+
+from .train import DDPMDiffusionModel, DDIMDiffusionModel
+from ..ddpm.distributions import make_spiral_data
+from ..ddpm.sampling import DDPMSampler, DDIMSampler
+from ..ddpm.metrics import sliced_wasserstein, mmd
+from . import MODELS_DIR
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-samples', type=int, default=5000)
+    parser.add_argument('--steps', type=int, nargs='+', default=[50, 20, 10])
+    parser.add_argument('--etas', type=float, nargs='+', default=[0.0, 1.0])
+    parser.add_argument('--checkpoint', default=os.path.join(MODELS_DIR, 'spiral_model.pth'))
+    args = parser.parse_args()
+    # Both models share the same trained network
+    state_dict = torch.load(args.checkpoint)
+    ddpm_model = DDPMDiffusionModel()
+    ddpm_model.load_state_dict(state_dict)
+    ddim_model = DDIMDiffusionModel()
+    ddim_model.load_state_dict(state_dict)
+    # Ground truth samples of the spiral the model was trained on
+    reference = make_spiral_data(num_examples=args.num_samples, std=0.0, rescale_factor=0.3)
+
+    samplers = [('DDPM', DDPMSampler(ddpm_model))]
+    for eta in args.etas:
+        for num_steps in args.steps:
+            samplers.append((f'DDIM eta={eta}', DDIMSampler(ddim_model, num_inference_timesteps=num_steps, eta=eta)))
+
+    print(f"{'sampler':>14} {'NFE':>5} {'time (s)':>9} {'speedup':>8} {'SWD':>7} {'MMD':>8}")
+    baseline_time = None
+    for name, sampler in samplers:
+        generator = torch.Generator().manual_seed(0)
+        start = time.perf_counter()
+        samples, _ = sampler.sample(args.num_samples, generator=generator)
+        elapsed = time.perf_counter() - start
+        if baseline_time is None:
+            baseline_time = elapsed
+        print(
+            f"{name:>14} {sampler.num_function_evaluations:>5} {elapsed:>9.3f} {baseline_time / elapsed:>7.1f}x "
+            f"{sliced_wasserstein(samples, reference):>7.4f} {mmd(samples, reference):>8.5f}"
+        )
@@ -0,0 +1,42 @@
+import os
+from .train import DDIMDiffusionModel
+from ..ddpm.distributions import make_spiral_data
+from matplotlib.animation import FuncAnimation
+import matplotlib.pyplot as plt
+import torch
+from . import MODELS_DIR, PLOTS_DIR
+
+if __name__ == "__main__":
+    # Load the diffusion model (DDIM reuses the DDPM trained network)
+    diffusion_model = DDIMDiffusionModel(eta=0.0)
+    diffusion_model.load_state_dict(torch.load(os.path.join(MODELS_DIR, 'spiral_model.pth')))
+    # Load the data
+    spiral_data = make_spiral_data(num_examples=500, std=0.05, rescale_factor=0.3)
+    spiral_data = spiral_data.detach().numpy()
+    # Generate N samples with only 50 network evaluations each, saving the intermediate paths
+    num_samples = 100
+    num_inference_steps = 50
+    samples, intermediate_values = diffusion_model.sample(num_samples=num_samples, num_timesteps=num_inference_steps)
+    # Intermediate values has shape (num_samples, num_inference_steps, 2)
+    intermediate_values = intermediate_values.detach().numpy()
+    # Make the figure
+    fig, ax = plt.subplots(figsize=(5, 5))
+    ax.set_ylim(-4, 4)
+    ax.set_xlim(-4, 4.5)
+    ax.axis('off')
+    ax.scatter(spiral_data[:, 0], spiral_data[:, 1], alpha=0.4, color="#67a9cf", label="Ground Truth Data")
+    # One trail per sample and a scatter of the current positions
+    trails = [ax.plot([], [], color='#ef8a62', alpha=0.3, linewidth=1)[0] for _ in range(num_samples)]
+    current = ax.scatter(intermediate_values[:, 0, 0], intermediate_values[:, 0, 1], color='#ef8a62', label="Generated Samples", alpha=0.9)
+    ax.legend(loc='lower center', bbox_to_anchor=(0.5, 1), ncol=2)
+
+    def animate(i):
+        for sample_index, trail in enumerate(trails):
+            trail.set_data(intermediate_values[sample_index, :i + 1, 0], intermediate_values[sample_index, :i + 1, 1])
+        current.set_offsets(intermediate_values[:, i, :])
+        return trails + [current]
+
+    # Make the animation
+    anim = FuncAnimation(fig, animate, frames=num_inference_steps, interval=20)
+    # Save the animation
+    anim.save(os.path.join(PLOTS_DIR, 'ddim_sample_animation.mp4'), writer='ffmpeg', fps=30, dpi=500)
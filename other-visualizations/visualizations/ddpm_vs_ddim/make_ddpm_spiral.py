@@ -1,17 +1,20 @@
+import os
 from matplotlib.collections import LineCollection
-from train import DDPMDiffusionModel
-from distributions import make_spiral_data
+from .train import DDPMDiffusionModel
+from ..ddpm.parallel_sampling import cached_sample
+from ..ddpm.distributions import make_spiral_data
 from matplotlib.animation import FuncAnimation
 import matplotlib.pyplot as plt
 import numpy as np
 import torch
 import seaborn as sns
 import pandas as pd
+from . import MODELS_DIR, PLOTS_DIR
 
 if __name__ == "__main__":
     # Load the diffusion model
     diffusion_model = DDPMDiffusionModel()
-    diffusion_model.load_state_dict(torch.load('models/spiral_model.pth'))
+    diffusion_model.load_state_dict(torch.load(os.path.join(MODELS_DIR, 'spiral_model.pth')))
     # Load the data
     spiral_data = make_spiral_data(num_examples=500, std=0.05, rescale_factor=0.3)
     # Show generation of samples from it using the trained diffusion model
@@ -28,8 +31,10 @@ if __name__ == "__main__":
     num_samples = 1
     num_inference_steps = 50
     plot_every_n_steps = 1
-    samples, intermediate_values = diffusion_model.sample(num_samples=num_samples, num_timesteps=num_inference_steps)
+    # Sampled once per checkpoint and seed, then read back from the artifact cache
+    samples, intermediate_values = cached_sample(diffusion_model, num_samples, every=1, seed=0)
     # Intermediate values has shape (num_samples, num_inference_steps, 2)
+    intermediate_values = intermediate_values.transpose(1, 0, 2)
     # Pull out only every 50 samples
     intermediate_values = intermediate_values[:, ::plot_every_n_steps, :]
     # Now plot the intermediate values
@@ -81,4 +86,4 @@ if __name__ == "__main__":
     # Make the animation
     anim = FuncAnimation(plt.gcf(), animate, frames=num_inference_steps // plot_every_n_steps, interval=20)
     # Save the animation
-    anim.save('plots/sample_animation.mp4', writer='ffmpeg', fps=30, dpi=500)
\ No newline at end of file
+    anim.save(os.path.join(PLOTS_DIR, 'sample_animation.mp4'), writer='ffmpeg', fps=30, dpi=500)
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""
+    Langevin Monte Carlo on the smiley face density.
+"""
+import os
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
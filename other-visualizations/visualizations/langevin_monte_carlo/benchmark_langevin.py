@@ -0,0 +1,53 @@
+"""
+    Samples per second of the original single-chain autograd loop vs. the
+    batched analytic-score sampler, with and without the MALA correction.
+"""
+import argparse
+import time
+import numpy as np
+import torch
+
+from .langevin import LangevinSampler, autograd_score, smiley_face_score
+from .smiley_face_sampling import smiley_face_pdf
+
+def legacy_langevin(step_size=0.1, num_samples=1000, burn_in=200):
+    """
+        The original loop: one chain, one autograd call on a single point per step
+    """
+    x_current = torch.rand(2) * 6 - 3
+    samples = []
+    for i in range(burn_in + num_samples):
+        x_current.requires_grad = True
+        u = torch.log(smiley_face_pdf(x_current.unsqueeze(0)))
+        grad = torch.autograd.grad(u, x_current)[0]
+        x_current = x_current + step_size * grad + np.sqrt(2 * step_size) * torch.randn(2)
+        x_current = x_current.detach()
+        if i >= burn_in:
+            samples.append(x_current.numpy())
+    return np.stack(samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num-chains', type=int, default=10000)
+    parser.add_argument('--num-samples', type=int, default=100)
+    parser.add_argument('--burn-in', type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    legacy_langevin(num_samples=1000, burn_in=args.burn_in)
+    elapsed = time.perf_counter() - start
+    print(f"{'legacy (1 chain, autograd)':>32}: {1000 / elapsed:>12.0f} samples/s")
+
+    generator = torch.Generator().manual_seed(0)
+    runs = [
+        ('batched autograd', autograd_score(lambda x: torch.log(smiley_face_pdf(x))), False),
+        ('batched analytic', smiley_face_score, False),
+        ('batched analytic MALA', smiley_face_score, True),
+    ]
+    for name, score_function, metropolis in runs:
+        sampler = LangevinSampler(score_function, dim=2, step_size=0.05, metropolis=metropolis)
+        start = time.perf_counter()
+        sampler.sample(args.num_chains, args.num_samples, burn_in=args.burn_in, generator=generator)
+        elapsed = time.perf_counter() - start
+        total = args.num_chains * args.num_samples
+        print(f"{name:>32}: {total / elapsed:>12.0f} samples/s")
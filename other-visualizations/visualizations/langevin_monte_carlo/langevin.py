@@ -0,0 +1,162 @@
+"""
+    Batched Langevin Monte Carlo.
+
+    Thousands of independent chains are advanced together as one (C, D)
+    tensor, driven by a score function that maps points to their log
+    density and its gradient in a single call
+
+        log_prob, score = score_function(x)    # (C,), (C, D)
+
+    Analytic score functions are provided for the smiley face and star
+    densities, and `autograd_score` builds one from any differentiable
+    log density.
+"""
+import math
+import torch
+
+from ..ddpm.densities import star_mixture
+
+def autograd_score(log_pdf):
+    """
+        Score function of a differentiable log density of (C, D) points.
+        The chains are independent, so one backward pass of the summed
+        log density gives every chain's gradient.
+    """
+    def score_function(x):
+        with torch.enable_grad():
+            x = x.detach().requires_grad_(True)
+            log_prob = log_pdf(x)
+            score, = torch.autograd.grad(log_prob.sum(), x)
+        return log_prob.detach(), score
+    return score_function
+
+def _mixture_score(log_terms, gradients):
+    """
+        Log density and score of a sum of terms from the per-term log values
+        (C, K) and gradients (C, K, D)
+    """
+    log_prob = torch.logsumexp(log_terms, dim=1)
+    responsibilities = torch.exp(log_terms - log_prob[:, None])
+    return log_prob, torch.sum(responsibilities[..., None] * gradients, dim=1)
+
+# Eyes and nose of the smiley face, each 0.5 * N(mean, 0.1 I)
+_smiley_means = torch.tensor([[1.0, 1.0], [-1.0, 1.0], [0.0, -0.4]])
+_smiley_variance = 0.1
+
+def smiley_face_score(x):
+    """
+        Analytic log density and score of `smiley_face_pdf`
+    """
+    radius = torch.sqrt(torch.sum(x ** 2, dim=1)).clamp_min(1e-12)
+    # Mouth, exp(-0.5 ((r - 2) / 0.4)^2 - 0.5 ((y + 2) / 0.6)^2)
+    mouth_log = -0.5 * ((radius - 2) / 0.4) ** 2 - 0.5 * ((x[:, 1] + 2) / 0.6) ** 2
+    mouth_gradient = -((radius - 2) / 0.4 ** 2 / radius)[:, None] * x
+    mouth_gradient[:, 1] -= (x[:, 1] + 2) / 0.6 ** 2
+    # Eyes and nose
+    differences = x[:, None, :] - _smiley_means.to(x)[None]
+    gaussian_log = (
+        math.log(0.5) - math.log(2 * math.pi * _smiley_variance)
+        - 0.5 * torch.sum(differences ** 2, dim=2) / _smiley_variance
+    )
+    gaussian_gradient = -differences / _smiley_variance
+    log_terms = torch.cat([mouth_log[:, None], gaussian_log], dim=1)
+    gradients = torch.cat([mouth_gradient[:, None], gaussian_gradient], dim=1)
+    return _mixture_score(log_terms, gradients)
+
+_star = star_mixture()
+_star_precisions = torch.from_numpy(_star.precisions).float()
+_star_log_constants = torch.from_numpy(_star.log_constants).float()
+
+def star_score(x):
+    """
+        Analytic log density and score of the star mixture that
+        `generate_star_samples` draws from
+    """
+    # Zero-mean components, so the direction is just -P_k x
+    gradients = -torch.einsum('kde,ce->ckd', _star_precisions.to(x), x)
+    log_terms = _star_log_constants.to(x)[None] + 0.5 * torch.sum(x[:, None, :] * gradients, dim=2)
+    return _mixture_score(log_terms, gradients)
+
+class LangevinSampler():
+    """
+        Unadjusted Langevin dynamics, or MALA when `metropolis` is set
+
+            x' = x + step_size * score(x) + sqrt(2 * step_size) * z
+
+        With the Metropolis adjustment each chain accepts its proposal with
+        probability min(1, p(x') q(x | x') / (p(x) q(x' | x))), which makes
+        the chains exact for any step size.
+
+        Args:
+            score_function: maps (C, D) points to log density (C,) and
+                score (C, D), see `autograd_score`
+            dim: dimension D of the points
+            step_size: Langevin step size
+            metropolis: whether to apply the Metropolis adjustment
+    """
+
+    def __init__(self, score_function, dim, step_size=0.1, metropolis=False):
+        self.score_function = score_function
+        self.dim = dim
+        self.step_size = step_size
+        self.metropolis = metropolis
+        self.acceptance_rate = None
+
+    def _log_proposal(self, x_to, x_from, score_from):
+        """
+            log q(x_to | x_from) up to a constant
+        """
+        mean = x_from + self.step_size * score_from
+        return -torch.sum((x_to - mean) ** 2, dim=1) / (4 * self.step_size)
+
+    @torch.no_grad()
+    def sample(self, num_chains=1000, num_samples=1000, burn_in=0, thin=1, x_init=None, generator=None, out=None):
+        """
+            Runs all chains for burn_in + num_samples * thin steps.
+
+            Args:
+                x_init: (num_chains, D) starting points. Defaults to
+                    uniform in [-3, 3]^D.
+                out: optional preallocated (num_samples, num_chains, D)
+                    tensor to write the samples into
+
+            Returns:
+                A (num_samples, num_chains, D) tensor with every chain's
+                state after each `thin` steps following the burn-in.
+        """
+        if x_init is None:
+            x_init = torch.rand(num_chains, self.dim, generator=generator) * 6 - 3
+        elif x_init.shape[1] != self.dim:
+            raise ValueError(f"x_init has dimension {x_init.shape[1]}, the sampler {self.dim}")
+        x = x_init.clone()
+        if out is None:
+            out = torch.empty((num_samples,) + tuple(x.shape), dtype=x.dtype)
+        noise = torch.empty_like(x)
+        noise_scale = math.sqrt(2 * self.step_size)
+        log_prob, score = self.score_function(x)
+        # Counted on-tensor, read back once after the last step
+        accepted = torch.zeros((), dtype=torch.long)
+        for step in range(burn_in + num_samples * thin):
+            proposal = x + self.step_size * score + noise_scale * noise.normal_(generator=generator)
+            proposal_log_prob, proposal_score = self.score_function(proposal)
+            if self.metropolis:
+                log_ratio = (
+                    proposal_log_prob - log_prob
+                    + self._log_proposal(x, proposal, proposal_score)
+                    - self._log_proposal(proposal, x, score)
+                )
+                uniform = torch.rand(log_ratio.shape, generator=generator)
+                accept = torch.log(uniform) < log_ratio
+                accepted += accept.sum()
+                x = torch.where(accept[:, None], proposal, x)
+                score = torch.where(accept[:, None], proposal_score, score)
+                log_prob = torch.where(accept, proposal_log_prob, log_prob)
+            else:
+                x, log_prob, score = proposal, proposal_log_prob, proposal_score
+            recorded = step - burn_in
+            if recorded >= 0 and (recorded + 1) % thin == 0:
+                out[recorded // thin].copy_(x)
+
+        num_steps = burn_in + num_samples * thin
+        self.acceptance_rate = accepted.item() / (num_steps * len(x)) if self.metropolis else None
+        return out
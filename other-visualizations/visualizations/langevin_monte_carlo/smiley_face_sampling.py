@@ -0,0 +1,150 @@
+import os
+import torch
+import math
+import numpy as np
+from torch.distributions import MultivariateNormal
+
+from ..ddpm import toy_datasets
+from .langevin import LangevinSampler, smiley_face_score
+from . import PACKAGE_DIR
+
+def generate_star_samples(num_samples=5000, seed=None):
+    """
+        This is used to generate samples from the star distribution
+    """
+    return torch.from_numpy(toy_datasets.star(num_samples, seed=seed)).float()
+
+def star_log_pdf(x):
+    """
+        This is the log probability density function of the star distribution
+        NOTE: This must be differentiable with torch. 
+    """
+    # Make the covariances
+    cov_1 = torch.Tensor([
+        [1.0, 0.0],
+        [0.0, 0.1]
+    ])
+    # Rotate 60 degrees
+    angle = torch.pi / 3
+    rotation_matrix = torch.Tensor([
+        [math.cos(angle), -math.sin(angle)],
+        [math.sin(angle), math.cos(angle)]
+    ])
+    cov_2 = rotation_matrix @ cov_1 @ rotation_matrix.T
+    # Rotate 60 degrees
+    angle = 2 * torch.pi / 3
+    rotation_matrix = torch.Tensor([
+        [math.cos(angle), -math.sin(angle)],
+        [math.sin(angle), math.cos(angle)]
+    ])
+    cov_3 = rotation_matrix @ cov_1 @ rotation_matrix.T
+    # Return the sum of the log probabilities
+    sum = 0.0
+    for cov in [cov_1, cov_2, cov_3]:
+        sum += MultivariateNormal(torch.Tensor([0.0, 0.0]), cov).log_prob(x)
+
+    return sum
+
+def smiley_face_pdf(z):
+    # z = np.reshape(z, [z.shape[0], 2])
+    # Make the mouth
+    norm = torch.sqrt(z[:, 0] ** 2 + z[:, 1] ** 2)
+    exp1 = torch.exp(-0.5 * ((z[:, 1] + 2) / 0.6) ** 2)
+    # exp2 = np.exp(-0.5 * ((z1 + 2) / 0.6) ** 2)
+    u = 0.5 * ((norm - 2) / 0.4) ** 2 - torch.log(exp1)
+    sum_pdf = torch.exp(-u)
+    # Make the eyes
+    # Make gaussian pdfs for the eyes
+    eye1 = MultivariateNormal(torch.tensor([1.0, 1.0]), torch.eye(2) * 0.1)
+    eye2 = MultivariateNormal(torch.tensor([-1.0, 1.0]), torch.eye(2) * 0.1)
+    # Compute the pdfs
+    eye1_pdf = eye1.log_prob(z)
+    eye2_pdf = eye2.log_prob(z)
+    # Add the pdfs
+    sum_pdf = sum_pdf + 0.5 * torch.exp(eye1_pdf) + 0.5 * torch.exp(eye2_pdf)
+    # Draw the nose
+    nose = MultivariateNormal(torch.tensor([0.0, -0.4]), torch.eye(2) * 0.1)
+    nose_pdf = nose.log_prob(z)
+    sum_pdf = sum_pdf + 0.5 * torch.exp(nose_pdf)
+
+    return sum_pdf
+
+def generate_langevin_samples(step_size=0.1, num_samples=5000, burn_in=2000, num_chains=1, metropolis=False, seed=None):
+    """
+        Runs langevin dynamics using the gradient of the smiley face distribution
+        and renders an animation of it. 
+
+        Returns:
+            A (num_samples, num_chains, 2) array of the points traversed by each 
+            chain after the burn in, where the final point is the sample
+    """
+    generator = None if seed is None else torch.Generator().manual_seed(seed)
+    sampler = LangevinSampler(smiley_face_score, dim=2, step_size=step_size, metropolis=metropolis)
+    samples = sampler.sample(num_chains=num_chains, num_samples=num_samples, burn_in=burn_in, generator=generator)
+    return samples.numpy()
+
+def make_animation():
+    """
+        Closure for making the entire animation
+    """
+    # Matplotlib is only needed here, the densities above are also imported by the benchmarks
+    import matplotlib.pyplot as plt
+    from ..ddpm.animation import RunningHistogram, clean_axes, make_animation as make_artist_animation
+
+    plt.style.use('dark_background')
+    # Make the matplotlib axis with two square subplots side by side
+    fig, axs = plt.subplots(1, 2, figsize=(10, 5))
+    # Plot the density of the heart
+    r = np.linspace(-5, 5, 200)
+    x, y = np.meshgrid(r, r)
+    z = np.vstack([x.flatten(), y.flatten()]).T
+    z = torch.Tensor(z)
+    # q0 = npdensity2(z)
+    q0 = smiley_face_pdf(z)
+    # Generate samples using langevin dynamics and animate the path on the left plot and show the final samples on the right.
+    num_samples = 5000
+    # Generate the samples using langevin dynamics
+    # Animate the path of a single chain
+    samples = generate_langevin_samples(num_samples=num_samples)[:, 0]
+    # The density on the left is static, everything else is created once and updated in place
+    axs[0].pcolormesh(x, y, q0.reshape(x.shape), cmap='viridis', vmin=0)
+    # Running density of the chain, each frame only bins the newest samples
+    histogram = RunningHistogram(bins=100, range=[[-3, 3], [-3.5, 2.5]])
+    histogram_image = axs[1].imshow(
+        np.zeros((100, 100)), 
+        cmap='viridis', 
+        origin='lower', 
+        extent=[-3, 3, -3.5, 2.5], 
+        interpolation='nearest',
+        animated=True
+    )
+    path, = axs[0].plot([], [], color='white', alpha=0.8, linewidth=2, animated=True)
+    step_arrow = axs[0].quiver([0.0], [0.0], [0.0], [0.0], color='white', linewidth=2, animated=True)
+    for ax in axs:
+        ax.set_xlim([-3, 3])
+        ax.set_ylim([-3.5, 2.5])
+        ax.set_aspect('equal', adjustable='box')
+        clean_axes(ax)
+    artists = [histogram_image, path, step_arrow]
+
+    # Make an animation of the markov chain
+    # Show only the 50 most recent samples
+    def animate(i):
+        print(i)
+        # Plot all of the samples up to i on the right plot
+        histogram.advance_to(samples, i)
+        histogram.update_image(histogram_image)
+        # Plot the path of the markov chain on the left plot, but only the last 50 samples
+        path.set_data(samples[max(0, i - 50):i, 0], samples[max(0, i - 50):i, 1])
+        # Show the last one as a quiver
+        step_arrow.set_offsets(samples[max(i - 1, 0)])
+        step_arrow.set_UVC(*(samples[i] - samples[max(i - 1, 0)]))
+        return artists
+
+    # Make the animation
+    anim = make_artist_animation(fig, animate, frames=num_samples, artists=artists, interval=60)
+    # Save as a video
+    anim.save(os.path.join(PACKAGE_DIR, 'langevin_dynamics.mp4'), writer='ffmpeg', fps=30)
+
+if __name__ == "__main__":
+    make_animation()
\ No newline at end of file
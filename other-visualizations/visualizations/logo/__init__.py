@@ -0,0 +1,6 @@
+"""
+    The animated logo, points diffused onto the shape in mask.png.
+"""
+import os
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
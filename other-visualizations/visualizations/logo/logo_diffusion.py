@@ -1,10 +1,14 @@
+import functools
+import os
 import numpy as np
-import pandas as pd
 from PIL import Image
-import math
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 
+from ..ddpm.video import render_video
+from ..ddpm.schedules import linear_betas, make_betas
+from . import PACKAGE_DIR
+
 def sample_points_in_mask(mask, num_points):
     # Find all the indices where the mask is True
     mask_indices = np.argwhere(mask)
@@ -16,20 +20,17 @@ def sample_points_in_mask(mask, num_points):
     
     return interpolated_points
 
-def compute_linear_noise_schedule(min, max, num):
-    return np.linspace(min, max, num)
-
-def compute_cosine_noise_schedule(start, end, num, tau=1, clip_min=1e-9):
-    # A gamma function based on cosine function.
-    def cosine_schedule(t):
-        v_start = math.cos(start * math.pi / 2) ** (2 * tau)
-        v_end = math.cos(end * math.pi / 2) ** (2 * tau)
-        output = math.cos((t * (end - start) + start) * math.pi / 2) ** (2 * tau)
-        output = (v_end - output) / (v_end - v_start)
-        return np.clip(output, clip_min, 1.0)
-    # Linearly sample timesteps
-    timesteps = np.linspace(0, 1, num)
-    return np.array([cosine_schedule(t) for t in timesteps])
+@functools.lru_cache(maxsize=None)
+def linear_alphas_cumprod(num_timesteps=1000):
+    """
+        Cumulative alphas of the linear 1e-4 to 1e-3 schedule, starting at 1
+        for t = 0. Cached per number of timesteps and read-only, since every
+        caller shares the same array.
+    """
+    betas = linear_betas(num_timesteps, 1e-4, 1e-3)
+    alphas_cumprod = np.concatenate([[1.0], np.cumprod(1 - betas)[:-1]])
+    alphas_cumprod.setflags(write=False)
+    return alphas_cumprod
 
 def add_noise(x_init, time):
     """
@@ -39,24 +40,69 @@ def add_noise(x_init, time):
             x_init: np.array of shape (N, 2)
             time: int, the time step
     """
-    T = 1000
-    betas = compute_linear_noise_schedule(1e-4, 1e-3, T)
-    # print(betas[:10])
-    # betas = compute_cosine_noise_schedule(0, 1, 1000)
-    alphas = 1 - betas
+    alphas_cumprod = linear_alphas_cumprod()
     # Sample standard gaussian noise
     noise = np.random.randn(*x_init.shape)
-    # Compute variance
-    standard_deviation = (1 - np.prod(alphas[:time])) ** 0.5 # From the DDPM paper, the variance is one minus the product of the alphas up to t
-    assert np.all(np.prod(alphas[:time]) >= 0), np.prod(alphas[:time])
-    assert not np.isnan(np.prod(alphas[:time]) ** 0.5)
-    mean = np.prod(alphas[:time]) ** 0.5 * x_init
-    # Ensure none are nan
-    assert not np.isnan(standard_deviation)
-    assert not np.isnan(mean).any()
+    # From the DDPM paper, the variance is one minus the product of the alphas up to t
+    standard_deviation = (1 - alphas_cumprod[time]) ** 0.5
+    mean = alphas_cumprod[time] ** 0.5 * x_init
 
     return mean + standard_deviation * noise
 
+class ForwardProcess():
+    """
+        Closed-form forward noising q(x_t | x_0) of a fixed set of points.
+
+        The cumulative alphas are computed once, alphas_cumprod[t] being the
+        product of the first t alphas (so t = 0 is noise free, like
+        `add_noise`). Each timestep draws its noise from its own seed, so a
+        frame noised lazily with `process[t]` matches the same frame of the
+        (T, N, 2) array noised all at once by `all()`.
+
+        Args:
+            x_init: (N, 2) noise free points
+            betas: (T,) noise schedule or the name of one in `schedules.py`
+                (the linear 1e-4 to 1e-3 one by default)
+            seed: base seed of the per-timestep noise
+    """
+    def __init__(self, x_init, betas=None, seed=0):
+        self.x_init = np.asarray(x_init, dtype=np.float32)
+        if betas is None:
+            self.alphas_cumprod = linear_alphas_cumprod()
+        else:
+            self.alphas_cumprod = np.concatenate([[1.0], np.cumprod(1 - make_betas(betas))[:-1]])
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.alphas_cumprod)
+
+    def _noise(self, time, out=None):
+        rng = np.random.default_rng([self.seed, time])
+        return rng.standard_normal(self.x_init.shape, dtype=np.float32, out=out)
+
+    def __getitem__(self, time):
+        """
+            The points noised to a single timestep
+        """
+        alpha_cumprod = np.float32(self.alphas_cumprod[time])
+        return alpha_cumprod ** 0.5 * self.x_init + (1 - alpha_cumprod) ** 0.5 * self._noise(time)
+
+    def all(self, clip=None, out=None):
+        """
+            The points noised to every timestep, as a (T, N, 2) float32 array
+        """
+        if out is None:
+            out = np.empty((len(self),) + self.x_init.shape, dtype=np.float32)
+        # Fill in the noise, then scale and shift every timestep in one broadcast
+        for time in range(len(self)):
+            self._noise(time, out=out[time])
+        alphas_cumprod = self.alphas_cumprod.astype(np.float32)[:, None, None]
+        out *= np.sqrt(1 - alphas_cumprod)
+        out += np.sqrt(alphas_cumprod) * self.x_init
+        if clip is not None:
+            np.clip(out, clip[0], clip[1], out=out)
+        return out
+
 def make_scatter_plot_animation():
     # Generate random data points
     np.random.seed(0)
@@ -82,13 +128,13 @@ def make_scatter_plot_animation():
     # Create animation
     ani = FuncAnimation(fig, update, frames=range(100), interval=200)
     # Save the animation as a video file
-    ani.save('scatter_animation.mp4', writer='ffmpeg')
+    ani.save(os.path.join(PACKAGE_DIR, 'scatter_animation.mp4'), writer='ffmpeg')
 
     plt.show()
 
 if __name__ == "__main__":
     # Import the mask image
-    image = Image.open("mask.png").convert("L")
+    image = Image.open(os.path.join(PACKAGE_DIR, "mask.png")).convert("L")
     # Convert it to a binary mask
     mask = 1 - (np.array(image) > 128).astype(np.float32)
     # Flip horizontally and transpose
@@ -98,23 +144,13 @@ if __name__ == "__main__":
     noise_free_data = sample_points_in_mask(mask, num_points)
     # Rescale the points to be between -4 and 4
     noise_free_data = (noise_free_data - noise_free_data.min(axis=0)) / (noise_free_data.max(axis=0) - noise_free_data.min(axis=0)) * 6 - 3
-    # Create a pandas data frame containing samples of the spiral function data over different time scales
-    for time in range(0, 1000):
-        noisy_data = add_noise(noise_free_data, time)
-        # CLip to a range of -3 to 3
-        noisy_data = np.clip(noisy_data, -4, 4)
-        # Add the time column
-        noisy_data = np.append(noisy_data, np.ones((noisy_data.shape[0], 1)) * time, axis=1)
-        # Add the noisy data to the data frame
-        if time == 0:
-            df = pd.DataFrame(noisy_data, columns=['x', 'y', 'time'])
-        else:
-            df = pd.concat([df, pd.DataFrame(noisy_data, columns=['x', 'y', 'time'])], axis=0)
+    # Noise the points to every timestep at once, frames are slices of the (T, N, 2) array
+    trajectory = ForwardProcess(noise_free_data).all(clip=(-4, 4))
 
     fig, ax = plt.subplots(figsize=(15, 3))
     sc = ax.scatter(
-        df.loc[df['time'] == 999, 'x'], 
-        df.loc[df['time'] == 999, 'y'],
+        trajectory[999, :, 0], 
+        trajectory[999, :, 1],
         cmap='viridis', 
         s=5, 
         alpha=0.8,
@@ -125,17 +161,11 @@ if __name__ == "__main__":
     ax.set_ylim(-4, 4)
 
     def update(frame):
-        # Update data points
-        x_data = df.loc[df['time'] == 1000 - frame, 'x']
-        y_data = df.loc[df['time'] == 1000 - frame, 'y']
-        # Update scatter plot
-        sc.set_offsets(np.column_stack((x_data, y_data)))
+        # Play the forward process backwards, from time 999 down to 0
+        sc.set_offsets(trajectory[999 - frame])
         
         return sc,
 
-    # Create animation
-    ani = FuncAnimation(fig, update, frames=range(1000), interval=100)
-    # Reverse the animation 
-    # Save the animation as a video file
-    ani.save('scatter_animation.mp4', writer='ffmpeg', dpi=500)
+    # Render the frames in parallel and save them as a video file
+    render_video(fig, update, frames=range(1000), path=os.path.join(PACKAGE_DIR, 'scatter_animation.mp4'), fps=10, dpi=500)
     # Convert the video to a gif
@@ -1,11 +1,13 @@
 import os
 import imageio
 
+from . import PACKAGE_DIR
+
 # Directory containing the frames
-frames_directory = 'LogoVideoFrames'
+frames_directory = os.path.join(PACKAGE_DIR, 'LogoVideoFrames')
 
 # Output GIF file path
-output_gif_path = 'output.gif'
+output_gif_path = os.path.join(PACKAGE_DIR, 'output.gif')
 
 # Get list of image files in the directory
 frame_files = sorted([os.path.join(frames_directory, f) for f in os.listdir(frames_directory) if f.endswith('.png')])